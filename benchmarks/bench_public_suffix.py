@@ -0,0 +1,51 @@
+"""Benchmark for Public Suffix List loading and registrable-domain lookups.
+
+Usage:
+    python benchmarks/bench_public_suffix.py [--count N]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from url_analyzer.utils.public_suffix import PublicSuffixList
+
+
+def generate_hosts(count: int, seed: int = 0) -> list:
+    """Generate a reproducible mix of host names across many suffixes."""
+    rng = random.Random(seed)
+    suffixes = ["com", "org", "net", "co.uk", "com.au", "de", "co.jp", "io",
+                "github.io", "kawasaki.jp", "gov.br", "example"]
+    prefixes = ["", "www.", "api.", "a.b.", "cdn.eu-west.", "x.y.z."]
+    return [f"{rng.choice(prefixes)}site{rng.randrange(100000)}.{rng.choice(suffixes)}"
+            for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1000000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    suffix_list = PublicSuffixList.from_file()
+    print(f"{'compile bundled list':<28} {(time.perf_counter() - start) * 1000:>10.1f} ms")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "psl.snapshot")
+        suffix_list.save_snapshot(path)
+        start = time.perf_counter()
+        PublicSuffixList.load_snapshot(path)
+        print(f"{'load snapshot':<28} {(time.perf_counter() - start) * 1000:>10.1f} ms")
+
+    hosts = generate_hosts(args.count)
+    lookup = suffix_list.registrable_domain
+    start = time.perf_counter()
+    for host in hosts:
+        lookup(host)
+    elapsed = time.perf_counter() - start
+    print(f"{'registrable_domain()':<28} {len(hosts) / elapsed:>10,.0f} hosts/s "
+          f"({len(hosts):,} hosts)")
+
+
+if __name__ == "__main__":
+    main()
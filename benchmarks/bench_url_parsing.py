@@ -0,0 +1,98 @@
+"""Micro-benchmark for URLAnalyzer parsing throughput.
+
+Each case also runs against a baseline reproducing the parsing before
+URLs were parsed once: a urlparse() call to validate and another to parse,
+eager normalization and parse_qs() on every get_info() call.
+
+Usage:
+    python benchmarks/bench_url_parsing.py [--count N] [--repeat R]
+"""
+import argparse
+import random
+import time
+from functools import partial
+from urllib.parse import parse_qs, urlparse
+from url_analyzer.core.url_analyzer import URLAnalyzer
+from url_analyzer.utils.exceptions import InvalidURLError
+
+
+class BaselineURLAnalyzer(URLAnalyzer):
+    """URLAnalyzer parsing the way it did before parsing once."""
+
+    def __init__(self, url: str):
+        if not self.is_valid_url(url):
+            raise InvalidURLError(f"Invalid URL: {url}")
+        super().__init__(url)
+        self.parsed_url = urlparse(url)
+        self._normalized_url = self._normalize_url()
+
+    def get_info(self):
+        info = super().get_info()
+        info["query_params"] = parse_qs(self.parsed_url.query)
+        return info
+
+
+def generate_urls(count: int, seed: int = 0) -> list:
+    """Generate a reproducible mix of realistic URLs."""
+    rng = random.Random(seed)
+    tlds = ["com", "org", "net", "co.uk", "de", "io"]
+    urls = []
+    for i in range(count):
+        host = f"{rng.choice(['www', 'api', 'cdn', 'shop'])}.site{i % 5000}.{rng.choice(tlds)}"
+        port = f":{rng.choice([8080, 8443])}" if i % 10 == 0 else ""
+        path = "/".join(f"seg{rng.randrange(100)}" for _ in range(rng.randrange(4)))
+        query = "&".join(f"k{j}=v{rng.randrange(1000)}" for j in range(rng.randrange(4)))
+        url = f"{rng.choice(['http', 'https', 'HTTPS'])}://{host}{port}/{path}"
+        if query:
+            url += f"?{query}"
+        if i % 7 == 0:
+            url += "#frag"
+        urls.append(url)
+    return urls
+
+
+def analyze_twice(cls, url: str) -> dict:
+    """Analyze a URL twice on one analyzer, as get_info() then analyze() do."""
+    analyzer = cls(url)
+    analyzer.analyze()
+    return analyzer.analyze()
+
+
+def bench(name: str, func, urls: list, repeat: int) -> float:
+    """Run func over urls, returning the best throughput in URLs/second."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for url in urls:
+            func(url)
+        best = min(best, time.perf_counter() - start)
+    rate = len(urls) / best
+    print(f"{name:<28} {rate:>12,.0f} URLs/s")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    urls = generate_urls(args.count)
+    for label, cls in (("baseline", BaselineURLAnalyzer), ("current", URLAnalyzer)):
+        print(f"{label}:")
+        bench("construct", cls, urls, args.repeat)
+        bench("construct + normalized_url",
+              lambda url: cls(url).normalized_url, urls, args.repeat)
+        bench("analyze()", lambda url: cls(url).analyze(), urls, args.repeat)
+        bench("analyze() twice", partial(analyze_twice, cls), urls, args.repeat)
+
+    best = float("inf")
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        URLAnalyzer.analyze_many(urls)
+        best = min(best, time.perf_counter() - start)
+    print(f"{'analyze_many()':<28} {len(urls) / best:>12,.0f} URLs/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Fixtures shared by the benchmarks.
+
+The benchmarks run offline: DNS queries go to an in-process nameserver on
+localhost that answers every name under bench.test, optionally after an
+injected delay standing in for network latency.
+"""
+import pytest
+from url_analyzer.testing.dns_server import DNSServer, Zone
+
+# Records of every name under bench.test; CNAME gets an empty answer
+RECORDS = {
+    "A": ["192.0.2.10"],
+    "AAAA": ["2001:db8::10"],
+    "MX": ["10 mail.bench.test."],
+    "TXT": ["v=spf1 -all"],
+    "NS": ["ns1.bench.test.", "ns2.bench.test."],
+    "SOA": ["ns1.bench.test. admin.bench.test. 1 7200 3600 1209600 300"],
+}
+ZONE = Zone({"bench.test": RECORDS, "*.bench.test": RECORDS})
+
+
+@pytest.fixture(scope="session")
+def nameserver():
+    """Nameserver answering at once."""
+    with DNSServer(ZONE) as server:
+        yield server
+
+
+@pytest.fixture(scope="session")
+def slow_nameserver():
+    """Nameserver answering after 20 ms."""
+    with DNSServer(ZONE, latency=0.02) as server:
+        yield server
+
+
+@pytest.fixture
+def dns_options(nameserver):
+    """Analyzer options pointing at the nameserver, without a cache."""
+    return {**nameserver.analyzer_options(), "timeout": 2.0, "lifetime": 2.0,
+            "cache": None}
+
+
+@pytest.fixture(scope="session")
+def urls():
+    """A thousand URLs spread over 50 hosts under bench.test."""
+    return [f"https://www{index % 50}.bench.test/path/{index}?page={index}"
+            for index in range(1000)]
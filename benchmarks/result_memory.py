@@ -0,0 +1,59 @@
+"""Compare the memory held by analysis results as dicts and as objects.
+
+Usage: python benchmarks/result_memory.py [COUNT]
+
+Builds COUNT complete analysis results (with one A record each) both as the
+nested dicts returned by analyze() and as the result objects returned by
+analyze_result(), and prints the bytes held per result.
+"""
+import sys
+import tracemalloc
+from typing import Any, Callable, List
+from url_analyzer.core.main_analyzer import MainAnalyzer
+from url_analyzer.core.results import DNSResult, FullResult
+from url_analyzer.core.url_analyzer import URLAnalyzer
+
+
+def dns_result(index: int) -> DNSResult:
+    return DNSResult(f"www{index}.example.com", ["192.0.2.1"],
+                     a_records=[f"198.51.100.{index % 250}"], aaaa_records=[],
+                     cname_records=[], mx_records=[], txt_records=[],
+                     ns_records=[], soa_record={})
+
+
+def held_per_result(build: Callable[[URLAnalyzer, int], Any],
+                    analyzers: List[URLAnalyzer]) -> float:
+    """Get the bytes allocated per result by build, while held."""
+    tracemalloc.start()
+    try:
+        held = [build(analyzer, index) for index, analyzer in enumerate(analyzers)]
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return current / len(held)
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    analyzers = [URLAnalyzer(f"https://www{index}.example.com/path/{index}?q={index}")
+                 for index in range(count)]
+    # Compute the analyzers' cached values outside the measurements
+    for analyzer in analyzers:
+        analyzer.analyze_result()
+
+    as_dicts = held_per_result(
+        lambda analyzer, index: MainAnalyzer.combine(
+            analyzer, dns_result(index).to_dict()),
+        analyzers)
+    as_objects = held_per_result(
+        lambda analyzer, index: FullResult(analyzer.analyze_result(),
+                                           dns_result(index)),
+        analyzers)
+    print(f"{count} complete results")
+    print(f"  dicts:   {as_dicts:8.0f} bytes per result")
+    print(f"  objects: {as_objects:8.0f} bytes per result "
+          f"({1 - as_objects / as_dicts:.0%} less)")
+
+
+if __name__ == '__main__':
+    main()
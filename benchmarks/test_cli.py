@@ -0,0 +1,36 @@
+"""End to end CLI throughput, writing results to a file."""
+import pytest
+from unittest.mock import patch
+from url_analyzer.cli.main import main
+
+
+def run_cli(*args):
+    with patch('sys.argv', ['url-analyzer', *args]):
+        main()
+
+
+@pytest.fixture
+def url_file(tmp_path, urls):
+    path = tmp_path / "urls.txt"
+    path.write_text("\n".join(urls))
+    return path
+
+
+@pytest.mark.parametrize("output_format", ["ndjson", "csv"])
+def test_batch_url_mode(benchmark, url_file, tmp_path, output_format):
+    output = tmp_path / f"results.{output_format}"
+    benchmark(run_cli, '--input', str(url_file), '--format', output_format,
+              '--output', str(output))
+    assert output.stat().st_size > 0
+
+
+def test_batch_dns_mode(benchmark, nameserver, url_file, tmp_path):
+    output = tmp_path / "results.ndjson"
+    benchmark.pedantic(
+        run_cli,
+        args=('--input', str(url_file), '--mode', 'dns', '--no-cache',
+              '--nameservers', nameserver.host, '--dns-port', str(nameserver.port),
+              '--workers', '16', '--output', str(output)),
+        rounds=3, iterations=1
+    )
+    assert output.stat().st_size > 0
@@ -0,0 +1,81 @@
+"""DNS analysis against the local nameserver.
+
+With the slow nameserver every query takes 20 ms, so these show how much
+of the per-query latency each fan-out strategy hides.
+"""
+import pytest
+from conftest import ZONE
+from url_analyzer.analyzers.dns_analyzer import DNSAnalyzer
+from url_analyzer.analyzers.dns_cache import DNSCache
+from url_analyzer.analyzers.dns_transport import DNSTransport
+from url_analyzer.analyzers.retry import RetryPolicy
+from url_analyzer.core.batch import BatchAnalyzer
+from url_analyzer.testing.dns_server import DNSServer
+
+DOMAIN = "www.bench.test"
+
+
+def test_sequential(benchmark, dns_options):
+    result = benchmark(lambda: DNSAnalyzer(DOMAIN, **dns_options).analyze())
+    assert result["records"]["a_records"] == ["192.0.2.10"]
+
+
+@pytest.mark.parametrize("concurrent", [False, True], ids=["sequential", "concurrent"])
+def test_fan_out_with_latency(benchmark, slow_nameserver, concurrent):
+    analyzer_options = {**slow_nameserver.analyzer_options(), "timeout": 2.0,
+                        "cache": None, "concurrent": concurrent}
+    result = benchmark.pedantic(
+        lambda: DNSAnalyzer(DOMAIN, **analyzer_options).analyze(),
+        rounds=5, iterations=1
+    )
+    assert result["records"]["mx_records"]
+
+
+def test_pipelined_with_latency(benchmark, slow_nameserver):
+    transport = DNSTransport("127.0.0.1", slow_nameserver.port, timeout=2.0)
+    try:
+        result = benchmark.pedantic(
+            lambda: DNSAnalyzer(DOMAIN, cache=None, transport=transport).analyze(),
+            rounds=5, iterations=1
+        )
+    finally:
+        transport.close()
+    assert result["records"]["ns_records"]
+
+
+def test_cache_hits(benchmark, dns_options):
+    cache = DNSCache()
+    dns_options["cache"] = cache
+    DNSAnalyzer(DOMAIN, **dns_options).analyze()
+    result = benchmark(lambda: DNSAnalyzer(DOMAIN, **dns_options).analyze())
+    assert result["records"]["a_records"] == ["192.0.2.10"]
+    assert cache.stats()["hits"] > 0
+
+
+def test_batch_dns_mode(benchmark, slow_nameserver, urls):
+    analyzer_options = {**slow_nameserver.analyzer_options(), "timeout": 2.0,
+                        "cache": None}
+
+    def run():
+        batch = BatchAnalyzer('dns', workers=16, record_types=["A", "MX"],
+                              **analyzer_options)
+        return list(batch.run(urls))
+
+    results = benchmark.pedantic(run, rounds=3, iterations=1)
+    assert len(results) == len(urls)
+
+
+def test_batch_with_dropped_queries(benchmark, urls):
+    """5% of queries are lost and retried after a 100 ms attempt timeout."""
+    with DNSServer(ZONE, latency=0.005, drop_rate=0.05, seed=1) as server:
+        analyzer_options = {**server.analyzer_options(), "cache": None,
+                            "retry": RetryPolicy(attempts=3, backoff=0.01,
+                                                 timeout=0.1)}
+
+        def run():
+            batch = BatchAnalyzer('dns', workers=16, record_types=["A"],
+                                  **analyzer_options)
+            return list(batch.run(urls))
+
+        results = benchmark.pedantic(run, rounds=3, iterations=1)
+    assert len(results) == len(urls)
@@ -0,0 +1,36 @@
+"""Memory held per complete analysis result, as dicts and as objects.
+
+The bytes per result are reported in the benchmark's extra info.
+"""
+import pytest
+from result_memory import dns_result, held_per_result
+from url_analyzer.core.main_analyzer import MainAnalyzer
+from url_analyzer.core.results import FullResult
+from url_analyzer.core.url_analyzer import URLAnalyzer
+
+BUILDERS = {
+    "dicts": lambda analyzer, index: MainAnalyzer.combine(
+        analyzer, dns_result(index).to_dict()),
+    "objects": lambda analyzer, index: FullResult(analyzer.analyze_result(),
+                                                  dns_result(index)),
+}
+
+
+@pytest.fixture(scope="module")
+def analyzers():
+    analyzers = [URLAnalyzer(f"https://www{index}.example.com/path/{index}")
+                 for index in range(10000)]
+    for analyzer in analyzers:
+        analyzer.analyze_result()
+    return analyzers
+
+
+@pytest.mark.parametrize("layout", list(BUILDERS))
+def test_memory_per_result(benchmark, analyzers, layout):
+    build = BUILDERS[layout]
+    benchmark.extra_info["bytes_per_result"] = round(
+        held_per_result(build, analyzers))
+    benchmark.pedantic(
+        lambda: [build(analyzer, index) for index, analyzer in enumerate(analyzers)],
+        rounds=3, iterations=1
+    )
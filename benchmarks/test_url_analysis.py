@@ -0,0 +1,28 @@
+"""URL parsing: single URL latency and batch throughput."""
+from url_analyzer.core.batch import BatchAnalyzer
+from url_analyzer.core.url_analyzer import URLAnalyzer
+
+URL = "https://user@www.example.co.uk:8443/a/b/../c?x=1&y=2#top"
+
+
+def test_single_url_analyze(benchmark):
+    result = benchmark(lambda: URLAnalyzer(URL).analyze())
+    assert result["domain"] == "example.co.uk"
+
+
+def test_single_url_analyze_result(benchmark):
+    result = benchmark(lambda: URLAnalyzer(URL).analyze_result())
+    assert result.domain == "example.co.uk"
+
+
+def test_analyze_many(benchmark, urls):
+    columns = benchmark(URLAnalyzer.analyze_many, urls)
+    assert len(columns["url"]) == len(urls)
+
+
+def test_batch_url_mode(benchmark, urls):
+    def run():
+        return list(BatchAnalyzer('url', workers=4).run(urls))
+
+    results = benchmark(run)
+    assert len(results) == len(urls)
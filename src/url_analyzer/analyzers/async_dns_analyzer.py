@@ -0,0 +1,255 @@
+import asyncio
+from functools import partial
+import dns.asyncresolver
+from typing import Iterable, List, Dict, Any, Optional
+from url_analyzer.core.base_analyzer_interface import BaseAnalyzer
+from url_analyzer.core.results import DNSResult
+from url_analyzer.analyzers.dns_cache import (
+    DNSCache, NEGATIVE_ERRORS, PersistentDNSCache, answer_ttl, negative_ttl
+)
+from url_analyzer.analyzers.rate_limit import QueryGovernor
+from url_analyzer.analyzers.resolver_pool import configure_resolver
+from url_analyzer.analyzers.retry import RetryPolicy
+from url_analyzer.analyzers.dns_analyzer import (
+    DNSAnalyzer, deadline_message, empty_record, parse_addresses, parse_targets,
+    parse_mx, parse_txt, parse_soa
+)
+from url_analyzer.utils.exceptions import DNSAnalyzerError
+
+class AsyncDNSAnalyzer(BaseAnalyzer):
+    """DNS record analyzer running on an asyncio event loop.
+
+    Mirrors the DNSAnalyzer record API with coroutines, so many domains can
+    be analyzed concurrently on one loop without a thread per lookup. Use
+    analyze_async() on a running loop; analyze() runs it on a loop of its
+    own.
+    """
+
+    RECORD_METHODS = DNSAnalyzer.RECORD_METHODS
+
+    def __init__(self, domain: str, deadline: Optional[float] = None,
+                 resolver: Optional[dns.asyncresolver.Resolver] = None,
+                 cache: Optional[DNSCache] = None,
+                 governor: Optional[QueryGovernor] = None,
+                 retry: Optional[RetryPolicy] = None):
+        """Initialize the analyzer.
+
+        Args:
+            domain: Domain name to query
+            deadline: Maximum seconds an analysis may take; records still
+                pending when it expires are reported as empty
+            resolver: Resolver to share between analyzers; a new one from
+                create_resolver() is used when omitted
+            cache: Response cache consulted before querying, usually the
+                process-wide one from dns_cache.get_default_cache(); a
+                persistent cache is read and written off the event loop
+            governor: Rate and concurrency limits every query waits for
+            retry: Policy for retrying and timing out queries; hedging
+                needs a ResolverPool and is not done here
+        """
+        self.domain = domain
+        self.deadline = deadline
+        self.cache = cache
+        self.governor = governor
+        self.retry = retry
+        # Smallest TTL of the answers of the current analysis
+        self.min_ttl: Optional[int] = None
+        # Messages of the current analysis's failed queries, by record type
+        self.errors: Dict[str, str] = {}
+        if resolver is None:
+            resolver = self.create_resolver()
+        self.resolver = resolver
+
+    @staticmethod
+    def create_resolver(nameservers: Optional[List[str]] = None,
+                        timeout: Optional[float] = None,
+                        lifetime: Optional[float] = None,
+                        port: Optional[int] = None
+                        ) -> dns.asyncresolver.Resolver:
+        """Create a resolver configured like the synchronous analyzer's.
+
+        Settings default to the environment and then the system
+        configuration, see resolver_pool.configure_resolver().
+        """
+        try:
+            resolver = dns.asyncresolver.Resolver()
+        except Exception:
+            # Handle Termux case where /etc/resolv.conf doesn't exist
+            resolver = dns.asyncresolver.Resolver(configure=False)
+        return configure_resolver(resolver, nameservers, timeout, lifetime, port)
+
+    def get_info(self) -> Dict[str, Any]:
+        """Get basic DNS information."""
+        return {
+            "domain": self.domain,
+            "nameservers": self.resolver.nameservers
+        }
+
+    async def _query_once(self, record_type: str,
+                          lifetime: Optional[float] = None) -> Any:
+        """Send one attempt of a query, within the governor's limits."""
+        kwargs = {} if lifetime is None else {"lifetime": lifetime}
+        if self.governor is None:
+            return await self.resolver.resolve(self.domain, record_type, **kwargs)
+        async with self.governor.limit_async(self.resolver.nameservers[0]):
+            return await self.resolver.resolve(self.domain, record_type, **kwargs)
+
+    async def _query(self, record_type: str) -> Any:
+        """Send a query, retrying it as the retry policy says."""
+        if self.retry is None:
+            return await self._query_once(record_type)
+        return await self.retry.call_async(partial(self._query_once, record_type),
+                                           record_type)
+
+    async def _call_cache(self, method: str, *args: Any) -> Any:
+        """Call a cache method, in a worker thread for a persistent cache so
+        its disk access doesn't block the event loop."""
+        call = partial(getattr(self.cache, method), *args)
+        if isinstance(self.cache, PersistentDNSCache):
+            return await asyncio.to_thread(call)
+        return call()
+
+    def _note_ttl(self, ttl: int) -> None:
+        if self.min_ttl is None or ttl < self.min_ttl:
+            self.min_ttl = ttl
+
+    async def _resolve(self, record_type: str) -> List[Any]:
+        """Internal method to resolve DNS records.
+
+        Args:
+            record_type: Type of DNS record (A, AAAA, MX, etc.)
+
+        Returns:
+            List of DNS answers
+
+        Raises:
+            DNSAnalyzerError: If DNS query fails
+        """
+        if self.cache is not None:
+            entry = await self._call_cache("get", self.domain, record_type)
+            if entry is not None:
+                self._note_ttl(self.cache.remaining_ttl(entry))
+                return entry.unwrap()
+
+        try:
+            answers = await self._query(record_type)
+        except Exception as e:
+            message = f"Failed to get {record_type} records: {str(e)}"
+            if isinstance(e, NEGATIVE_ERRORS):
+                ttl = negative_ttl(e)
+                self._note_ttl(ttl)
+                if self.cache is not None:
+                    await self._call_cache("put_negative", self.domain,
+                                           record_type, message, ttl)
+            else:
+                # Unlike a negative answer, says nothing about the records
+                self.errors[record_type] = message
+            raise DNSAnalyzerError(message)
+
+        ttl = answer_ttl(answers)
+        self._note_ttl(ttl)
+        if self.cache is not None:
+            await self._call_cache("put", self.domain, record_type, answers, ttl)
+        return answers
+
+    async def get_a_records(self) -> List[str]:
+        """Get IPv4 address records."""
+        try:
+            return parse_addresses(await self._resolve("A"))
+        except DNSAnalyzerError:
+            return []
+
+    async def get_aaaa_records(self) -> List[str]:
+        """Get IPv6 address records."""
+        try:
+            return parse_addresses(await self._resolve("AAAA"))
+        except DNSAnalyzerError:
+            return []
+
+    async def get_cname_records(self) -> List[str]:
+        """Get canonical name records."""
+        try:
+            return parse_targets(await self._resolve("CNAME"))
+        except DNSAnalyzerError:
+            return []
+
+    async def get_mx_records(self) -> List[Dict[str, Any]]:
+        """Get mail exchange records."""
+        try:
+            return parse_mx(await self._resolve("MX"))
+        except DNSAnalyzerError:
+            return []
+
+    async def get_txt_records(self) -> List[str]:
+        """Get text records."""
+        try:
+            return parse_txt(await self._resolve("TXT"))
+        except DNSAnalyzerError:
+            return []
+
+    async def get_ns_records(self) -> List[str]:
+        """Get name server records."""
+        try:
+            return parse_targets(await self._resolve("NS"))
+        except DNSAnalyzerError:
+            return []
+
+    async def get_soa_record(self) -> Dict[str, Any]:
+        """Get start of authority record."""
+        try:
+            return parse_soa(await self._resolve("SOA"))
+        except DNSAnalyzerError:
+            return {}
+
+    def analyze(self, record_types: Optional[Iterable[str]] = None
+                ) -> Dict[str, Any]:
+        """Perform DNS analysis on a new event loop; from a coroutine, await
+        analyze_async() instead.
+
+        Args:
+            record_types: Record types to query (default: all types)
+
+        Raises:
+            ValueError: If a record type is not supported
+        """
+        return asyncio.run(self.analyze_async(record_types))
+
+    async def analyze_async(self, record_types: Optional[Iterable[str]] = None
+                            ) -> Dict[str, Any]:
+        """Perform DNS analysis with all queries in flight at once.
+
+        Args:
+            record_types: Record types to query (default: all types)
+
+        Raises:
+            ValueError: If a record type is not supported
+        """
+        return (await self.analyze_result(record_types)).to_dict()
+
+    async def analyze_result(self, record_types: Optional[Iterable[str]] = None
+                             ) -> DNSResult:
+        """Like analyze_async(), into a compact result object."""
+        self.min_ttl = None
+        self.errors = {}
+        tasks = [(key, record_type, asyncio.ensure_future(getattr(self, method)()))
+                 for key, method, record_type
+                 in DNSAnalyzer.select_records(record_types)]
+        info = self.get_info()
+        if not tasks:
+            return DNSResult(info["domain"], info["nameservers"])
+        done, pending = await asyncio.wait([task for _, _, task in tasks],
+                                           timeout=self.deadline)
+        for task in pending:
+            task.cancel()
+
+        results = {}
+        for key, record_type, task in tasks:
+            if task in done:
+                results[key] = task.result()
+            else:
+                results[key] = empty_record(key)
+                self.errors[record_type] = deadline_message(record_type,
+                                                            self.deadline)
+        return DNSResult(info["domain"], info["nameservers"],
+                         min_ttl=self.min_ttl, errors=dict(self.errors) or None,
+                         **results)
@@ -1,29 +1,310 @@
+import copy
+import threading
+import time
 import dns.resolver
 import dns.reversename
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Iterable, List, Dict, Any, Optional, Tuple
 from url_analyzer.core.base_analyzer_interface import BaseAnalyzer
+from url_analyzer.core.results import DNSResult
+from url_analyzer.analyzers.dns_cache import (
+    DNSCache, NEGATIVE_ERRORS, answer_ttl, negative_ttl
+)
+from url_analyzer.analyzers.dns_transport import DNSTransport
+from url_analyzer.analyzers.rate_limit import QueryGovernor
+from url_analyzer.analyzers.records import RECORD_TYPES
+from url_analyzer.analyzers.resolver_pool import ResolverPool, configure_resolver
+from url_analyzer.analyzers.retry import RetryPolicy
 from url_analyzer.utils.exceptions import DNSAnalyzerError
+from url_analyzer.utils.instrumentation import Instrumentation, timer
+
+
+def parse_addresses(answers) -> List[str]:
+    """Extract addresses from A/AAAA answers."""
+    return [answer.address for answer in answers]
+
+
+def parse_targets(answers) -> List[str]:
+    """Extract target names from CNAME/NS answers."""
+    return [str(answer.target) for answer in answers]
+
+
+def parse_mx(answers) -> List[Dict[str, Any]]:
+    """Extract exchange and preference from MX answers."""
+    return [{
+        "exchange": str(answer.exchange),
+        "preference": answer.preference
+    } for answer in answers]
+
+
+def parse_txt(answers) -> List[str]:
+    """Decode the strings of TXT answers."""
+    return [str(string.decode()) for answer in answers
+            for string in answer.strings]
+
+
+def parse_soa(answers) -> Dict[str, Any]:
+    """Extract the fields of the first SOA answer."""
+    soa = answers[0]
+    return {
+        "mname": str(soa.mname),
+        "rname": str(soa.rname),
+        "serial": soa.serial,
+        "refresh": soa.refresh,
+        "retry": soa.retry,
+        "expire": soa.expire,
+        "minimum": soa.minimum
+    }
+
+
+def empty_record(key: str) -> Any:
+    """Value reported for a record type that yielded no answer."""
+    return {} if key == "soa_record" else []
+
+
+def deadline_message(record_type: str, deadline: Optional[float]) -> str:
+    """Error reported for a query still pending at the deadline."""
+    return f"Failed to get {record_type} records: deadline of {deadline}s passed"
+
 
 class DNSAnalyzer(BaseAnalyzer):
     """DNS record analyzer."""
 
-    def __init__(self, domain: str):
+    # Result key and getter for every record type, in output order
+    RECORD_METHODS = (
+        ("a_records", "get_a_records"),
+        ("aaaa_records", "get_aaaa_records"),
+        ("cname_records", "get_cname_records"),
+        ("mx_records", "get_mx_records"),
+        ("txt_records", "get_txt_records"),
+        ("ns_records", "get_ns_records"),
+        ("soa_record", "get_soa_record"),
+    )
+    # Record type queried by each getter, in the same order
+    RECORD_TYPES = RECORD_TYPES
+
+    def __init__(self, domain: str, concurrent: bool = False,
+                 deadline: Optional[float] = None,
+                 cache: Optional[DNSCache] = None,
+                 nameservers: Optional[List[str]] = None,
+                 timeout: Optional[float] = None,
+                 lifetime: Optional[float] = None,
+                 port: Optional[int] = None,
+                 pool: Optional[ResolverPool] = None,
+                 resolver: Optional[dns.resolver.Resolver] = None,
+                 transport: Optional[DNSTransport] = None,
+                 governor: Optional[QueryGovernor] = None,
+                 retry: Optional[RetryPolicy] = None,
+                 instrumentation: Optional[Instrumentation] = None):
+        """Initialize the analyzer.
+
+        Args:
+            domain: Domain name to query
+            concurrent: Issue all record queries in parallel in analyze()
+            deadline: Maximum seconds a concurrent analysis may take; records
+                still pending when it expires are reported as empty, and no
+                query or retry through the resolver or pool starts after it
+            cache: Response cache consulted before querying, usually the
+                process-wide one from dns_cache.get_default_cache()
+            nameservers: Nameservers to query instead of the system ones
+                (default: $URL_ANALYZER_NAMESERVERS, else /etc/resolv.conf)
+            timeout: Seconds to wait for each nameserver
+                (default: $URL_ANALYZER_DNS_TIMEOUT)
+            lifetime: Seconds a query may take across nameservers
+                (default: $URL_ANALYZER_DNS_LIFETIME)
+            port: Port the nameservers listen on
+                (default: $URL_ANALYZER_DNS_PORT, else 53)
+            pool: Resolver pool to send queries through instead, routing
+                them to the fastest healthy of its nameservers
+            resolver: Resolver to share between analyzers, from
+                create_resolver(); nameservers, timeout, lifetime and port
+                are then ignored
+            transport: Transport to send all queries through at once
+                instead, on the first cache miss of analyze()
+            governor: Rate and concurrency limits every query waits for,
+                usually shared by all analyzers of a job
+            retry: Policy for retrying, timing out and hedging queries
+            instrumentation: Recorder timing each record query and the
+                whole analysis
+        """
         self.domain = domain
+        self.concurrent = concurrent
+        self.deadline = deadline
+        self.cache = cache
+        self.pool = pool
+        self.transport = transport
+        self.governor = governor
+        self.retry = retry
+        self.instrumentation = instrumentation
+        # Record types sent together through the transport
+        self._pipelined_types: Tuple[str, ...] = self.RECORD_TYPES
+        # Results of the last pipelined round trip not yet consumed
+        self._pipelined: Dict[str, Any] = {}
+        self._pipelined_sent = False
+        # Smallest TTL of the answers of the last analysis
+        self.min_ttl: Optional[int] = None
+        # Messages of the last analysis's failed queries, by record type
+        self.errors: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        # State of the analysis a thread queries for; queries that outlive
+        # their deadline keep writing to their own analysis's state
+        self._local = threading.local()
+        bounded = concurrent and deadline is not None
+        if resolver is None:
+            resolver = self.create_resolver(nameservers, timeout, lifetime, port)
+        elif bounded:
+            # The deadline below must not leak into the shared resolver
+            resolver = copy.copy(resolver)
+        self.resolver = resolver
+        if bounded:
+            # Stop stragglers from outliving the analysis they belong to,
+            # without lengthening a shorter lifetime
+            self.resolver.lifetime = min(self.resolver.lifetime, deadline)
+
+    @staticmethod
+    def create_resolver(nameservers: Optional[List[str]] = None,
+                        timeout: Optional[float] = None,
+                        lifetime: Optional[float] = None,
+                        port: Optional[int] = None) -> dns.resolver.Resolver:
+        """Create a resolver, reading the system configuration once.
+
+        Settings default to the environment and then the system
+        configuration, see resolver_pool.configure_resolver().
+        """
         try:
-            self.resolver = dns.resolver.Resolver()
+            resolver = dns.resolver.Resolver()
         except:
             # Handle Termux case where /etc/resolv.conf doesn't exist
-            self.resolver = dns.resolver.Resolver(configure=False)
-        # Use Google's public DNS servers
-        self.resolver.nameservers = ['8.8.8.8', '8.8.4.4']
+            resolver = dns.resolver.Resolver(configure=False)
+        return configure_resolver(resolver, nameservers, timeout, lifetime, port)
 
     def get_info(self) -> Dict[str, Any]:
         """Get basic DNS information."""
+        if self.transport is not None:
+            nameservers = [self.transport.nameserver]
+        elif self.pool is not None:
+            nameservers = self.pool.ordered()
+        else:
+            nameservers = self.resolver.nameservers
         return {
             "domain": self.domain,
-            "nameservers": self.resolver.nameservers
+            "nameservers": nameservers
         }
 
+    def _pipelined_timeout(self, types: Tuple[str, ...]) -> Optional[float]:
+        """Get how long to wait for a pipelined round trip."""
+        timeout = self.deadline
+        if self.retry is not None:
+            lifetimes = [self.retry.lifetime(record_type) for record_type in types]
+            if None not in lifetimes:
+                timeout = min(max(lifetimes), timeout or float("inf"))
+        return timeout
+
+    def _query_pipelined(self, record_type: str) -> Any:
+        """Take a query's result from one round trip for all record types.
+
+        Queries sent again after a failure go out on their own.
+        """
+        if record_type not in self._pipelined:
+            types = (record_type,) if self._pipelined_sent else self._pipelined_types
+            self._pipelined_sent = True
+            timeout = self._pipelined_timeout(types)
+            if self.governor is None:
+                results = self.transport.query_many(self.domain, types,
+                                                    timeout=timeout)
+            else:
+                with self.governor.limit(self.transport.nameserver, len(types)):
+                    results = self.transport.query_many(self.domain, types,
+                                                        timeout=timeout)
+            self._pipelined.update(results)
+        result = self._pipelined.pop(record_type)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def _query_once(self, record_type: str, lifetime: Optional[float] = None) -> Any:
+        """Send one attempt of a query through the transport, the pool or
+        the resolver.
+
+        Args:
+            record_type: Record type to query
+            lifetime: Seconds the attempt may take (default: the resolver's)
+        """
+        if self.transport is not None:
+            return self._query_pipelined(record_type)
+        # Only pass options that are set, keeping plain calls unchanged
+        kwargs = {} if lifetime is None else {"lifetime": lifetime}
+        if self.pool is not None:
+            if self.governor is not None:
+                kwargs["governor"] = self.governor
+            if self.retry is not None and self.retry.hedge:
+                return self.pool.resolve_hedged(
+                    self.domain, record_type, self.retry.hedge_after,
+                    self.retry.hedge_quantile, **kwargs)
+            return self.pool.resolve(self.domain, record_type, **kwargs)
+        if self.governor is not None:
+            # The resolver tries its first nameserver first
+            with self.governor.limit(self.resolver.nameservers[0]):
+                return self.resolver.resolve(self.domain, record_type, **kwargs)
+        return self.resolver.resolve(self.domain, record_type, **kwargs)
+
+    def _query(self, record_type: str) -> Any:
+        """Send a query, retrying it as the retry policy says, within the
+        deadline of a concurrent analysis."""
+        state = self._state()
+        expires = None if state is None else state["expires"]
+        if self.retry is None:
+            if expires is None or self.pool is None:
+                # The resolver's lifetime is bounded by the deadline already
+                return self._query_once(record_type)
+            return self._query_once(record_type, self._remaining(expires, None))
+
+        def attempt(lifetime: Optional[float]) -> Any:
+            if expires is not None:
+                lifetime = self._remaining(expires, lifetime)
+            return self._query_once(record_type, lifetime)
+
+        return self.retry.call(attempt, record_type)
+
+    def _remaining(self, expires: float, lifetime: Optional[float]) -> float:
+        """Bound an attempt's lifetime by the time left before the deadline.
+
+        Raises:
+            DNSAnalyzerError: If the deadline has passed; it is not
+                retried
+        """
+        remaining = expires - time.monotonic()
+        if remaining <= 0:
+            raise DNSAnalyzerError(f"deadline of {self.deadline}s passed")
+        return remaining if lifetime is None else min(lifetime, remaining)
+
+    def _state(self) -> Optional[Dict[str, Any]]:
+        return getattr(self._local, "analysis", None)
+
+    def _collect(self, state: Dict[str, Any], method: str) -> Any:
+        """Call a record getter, noting TTLs and errors in an analysis's state."""
+        self._local.analysis = state
+        try:
+            return getattr(self, method)()
+        finally:
+            self._local.analysis = None
+
+    def _note_ttl(self, ttl: int) -> None:
+        state = self._state()
+        if state is None:
+            return
+        with self._lock:
+            if state["min_ttl"] is None or ttl < state["min_ttl"]:
+                state["min_ttl"] = ttl
+
+    def _note_error(self, record_type: str, message: str,
+                    state: Optional[Dict[str, Any]] = None) -> None:
+        state = state or self._state()
+        if state is None:
+            return
+        with self._lock:
+            state["errors"][record_type] = message
+
     def _resolve(self, record_type: str) -> List[Any]:
         """Internal method to resolve DNS records.
         
@@ -36,92 +317,174 @@ class DNSAnalyzer(BaseAnalyzer):
         Raises:
             DNSAnalyzerError: If DNS query fails
         """
-        try:
-            return self.resolver.resolve(self.domain, record_type)
-        except Exception as e:
-            raise DNSAnalyzerError(f"Failed to get {record_type} records: {str(e)}")
+        with timer(self.instrumentation, f"dns.query.{record_type}") as span:
+            if self.cache is not None:
+                entry = self.cache.get(self.domain, record_type)
+                if entry is not None:
+                    span.outcome = "cache_hit"
+                    self._note_ttl(self.cache.remaining_ttl(entry))
+                    return entry.unwrap()
+
+            try:
+                answers = self._query(record_type)
+            except Exception as e:
+                span.outcome = type(e).__name__
+                message = f"Failed to get {record_type} records: {str(e)}"
+                if isinstance(e, NEGATIVE_ERRORS):
+                    ttl = negative_ttl(e)
+                    self._note_ttl(ttl)
+                    if self.cache is not None:
+                        self.cache.put_negative(self.domain, record_type,
+                                                message, ttl)
+                else:
+                    # Unlike a negative answer, says nothing about the records
+                    self._note_error(record_type, message)
+                raise DNSAnalyzerError(message)
+
+            ttl = answer_ttl(answers)
+            self._note_ttl(ttl)
+            if self.cache is not None:
+                self.cache.put(self.domain, record_type, answers, ttl)
+            return answers
 
     def get_a_records(self) -> List[str]:
         """Get IPv4 address records."""
         try:
-            answers = self._resolve("A")
-            return [answer.address for answer in answers]
+            return parse_addresses(self._resolve("A"))
         except DNSAnalyzerError:
             return []
 
     def get_aaaa_records(self) -> List[str]:
         """Get IPv6 address records."""
         try:
-            answers = self._resolve("AAAA")
-            return [answer.address for answer in answers]
+            return parse_addresses(self._resolve("AAAA"))
         except DNSAnalyzerError:
             return []
 
     def get_cname_records(self) -> List[str]:
         """Get canonical name records."""
         try:
-            answers = self._resolve("CNAME")
-            return [str(answer.target) for answer in answers]
+            return parse_targets(self._resolve("CNAME"))
         except DNSAnalyzerError:
             return []
 
     def get_mx_records(self) -> List[Dict[str, Any]]:
         """Get mail exchange records."""
         try:
-            answers = self._resolve("MX")
-            return [{
-                "exchange": str(answer.exchange),
-                "preference": answer.preference
-            } for answer in answers]
+            return parse_mx(self._resolve("MX"))
         except DNSAnalyzerError:
             return []
 
     def get_txt_records(self) -> List[str]:
         """Get text records."""
         try:
-            answers = self._resolve("TXT")
-            return [str(string.decode()) for answer in answers 
-                   for string in answer.strings]
+            return parse_txt(self._resolve("TXT"))
         except DNSAnalyzerError:
             return []
 
     def get_ns_records(self) -> List[str]:
         """Get name server records."""
         try:
-            answers = self._resolve("NS")
-            return [str(answer.target) for answer in answers]
+            return parse_targets(self._resolve("NS"))
         except DNSAnalyzerError:
             return []
 
     def get_soa_record(self) -> Dict[str, Any]:
         """Get start of authority record."""
         try:
-            answers = self._resolve("SOA")
-            soa = answers[0]
-            return {
-                "mname": str(soa.mname),
-                "rname": str(soa.rname),
-                "serial": soa.serial,
-                "refresh": soa.refresh,
-                "retry": soa.retry,
-                "expire": soa.expire,
-                "minimum": soa.minimum
-            }
+            return parse_soa(self._resolve("SOA"))
         except DNSAnalyzerError:
             return {}
 
-    def analyze(self) -> Dict[str, Any]:
-        """Perform complete DNS analysis."""
-        result = {
-            "info": self.get_info(),
-            "records": {
-                "a_records": self.get_a_records(),
-                "aaaa_records": self.get_aaaa_records(),
-                "cname_records": self.get_cname_records(),
-                "mx_records": self.get_mx_records(),
-                "txt_records": self.get_txt_records(),
-                "ns_records": self.get_ns_records(),
-                "soa_record": self.get_soa_record()
-            }
-        }
-        return result
+    @classmethod
+    def select_records(cls, record_types: Optional[Iterable[str]] = None
+                       ) -> List[Tuple[str, str, str]]:
+        """Get the result key, getter and type of the requested records.
+
+        Args:
+            record_types: Record types such as "A" or "mx" (default: all)
+
+        Returns:
+            List of (key, getter name, record type) tuples in output order
+
+        Raises:
+            ValueError: If a record type is not supported
+        """
+        records = [(key, method, record_type) for (key, method), record_type
+                   in zip(cls.RECORD_METHODS, cls.RECORD_TYPES)]
+        if record_types is None:
+            return records
+        wanted = {record_type.upper() for record_type in record_types}
+        unknown = wanted.difference(cls.RECORD_TYPES)
+        if unknown:
+            raise ValueError(
+                f"Unsupported record types: {', '.join(sorted(unknown))}"
+            )
+        return [record for record in records if record[2] in wanted]
+
+    def _get_records(self, records: List[Tuple[str, str, str]],
+                     state: Dict[str, Any]) -> Dict[str, Any]:
+        """Query the selected record types one after another."""
+        return {key: self._collect(state, method) for key, method, _ in records}
+
+    def _get_records_concurrent(self, records: List[Tuple[str, str, str]],
+                                state: Dict[str, Any]) -> Dict[str, Any]:
+        """Query the selected record types in parallel, bounded by the deadline."""
+        executor = ThreadPoolExecutor(max_workers=max(len(records), 1))
+        try:
+            futures = [(key, record_type,
+                        executor.submit(self._collect, state, method))
+                       for key, method, record_type in records]
+            done, _ = wait([future for _, _, future in futures],
+                           timeout=self.deadline)
+        finally:
+            # Do not block on queries that missed the deadline
+            executor.shutdown(wait=False)
+
+        results = {}
+        for key, record_type, future in futures:
+            if future in done:
+                results[key] = future.result()
+            else:
+                results[key] = empty_record(key)
+                self._note_error(record_type, deadline_message(record_type,
+                                                               self.deadline),
+                                 state)
+        return results
+
+    def analyze(self, record_types: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Perform DNS analysis.
+
+        Args:
+            record_types: Record types to query, e.g. ["A", "AAAA"]; only
+                their keys appear in the records (default: all types)
+
+        Raises:
+            ValueError: If a record type is not supported
+        """
+        return self.analyze_result(record_types).to_dict()
+
+    def analyze_result(self, record_types: Optional[Iterable[str]] = None
+                       ) -> DNSResult:
+        """Like analyze(), into a compact result object."""
+        records = self.select_records(record_types)
+        self._pipelined_types = tuple(record_type for _, _, record_type in records)
+        self._pipelined = {}
+        self._pipelined_sent = False
+        # With a transport all queries are in flight together already
+        concurrent = self.concurrent and self.transport is None
+        state = {"min_ttl": None, "errors": {}, "expires": None}
+        if concurrent and self.deadline is not None:
+            state["expires"] = time.monotonic() + self.deadline
+        with timer(self.instrumentation, "dns.analyze"):
+            if concurrent:
+                results = self._get_records_concurrent(records, state)
+            else:
+                results = self._get_records(records, state)
+        with self._lock:
+            self.min_ttl = state["min_ttl"]
+            self.errors = dict(state["errors"])
+        info = self.get_info()
+        return DNSResult(info["domain"], info["nameservers"],
+                         min_ttl=self.min_ttl, errors=self.errors or None,
+                         **results)
@@ -0,0 +1,323 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import dns.rdata
+import dns.rdataclass
+import dns.rdatatype
+import dns.resolver
+from url_analyzer.utils.exceptions import DNSAnalyzerError
+
+# Errors that are authoritative answers and may be cached
+NEGATIVE_ERRORS = (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer)
+# TTL used when an answer carries none (e.g. answers from a stub resolver)
+DEFAULT_TTL = 300
+# TTL used for negative answers whose response carries no SOA record
+DEFAULT_NEGATIVE_TTL = 60
+
+
+class CacheEntry:
+    """A cached DNS answer or negative answer."""
+
+    __slots__ = ("answers", "error", "expires")
+
+    def __init__(self, answers: Any, error: Optional[str], expires: float):
+        self.answers = answers
+        self.error = error
+        self.expires = expires
+
+    def unwrap(self) -> Any:
+        """Return the cached answers.
+
+        Raises:
+            DNSAnalyzerError: If the entry caches a negative answer
+        """
+        if self.error is not None:
+            raise DNSAnalyzerError(self.error)
+        return self.answers
+
+
+def answer_ttl(answers: Any, default: int = DEFAULT_TTL) -> int:
+    """Get the TTL of a dnspython Answer, or default if it carries none."""
+    rrset = getattr(answers, "rrset", None)
+    ttl = getattr(rrset, "ttl", None)
+    return ttl if isinstance(ttl, int) else default
+
+
+def negative_ttl(error: Exception, default: int = DEFAULT_NEGATIVE_TTL) -> int:
+    """Get how long a NXDOMAIN/NoAnswer error may be cached.
+
+    Following RFC 2308 this is the smaller of the SOA record's TTL and its
+    minimum field, taken from the authority section of the response.
+    """
+    kwargs = getattr(error, "kwargs", {})
+    responses = list(kwargs.get("responses", {}).values())
+    if kwargs.get("response") is not None:
+        responses.append(kwargs["response"])
+
+    ttls = [
+        min(rrset.ttl, rrset[0].minimum)
+        for response in responses
+        for rrset in response.authority
+        if rrset.rdtype == dns.rdatatype.SOA and len(rrset)
+    ]
+    return min(ttls) if ttls else default
+
+
+class DNSCache:
+    """Thread-safe DNS response cache keyed by (name, record type).
+
+    Entries expire according to the TTL of the answer they hold, negative
+    answers included. When full, the least recently used entry is evicted.
+    """
+
+    def __init__(self, max_size: int = 10000,
+                 clock: Callable[[], float] = time.monotonic):
+        """Initialize the cache.
+
+        Args:
+            max_size: Maximum number of entries kept
+            clock: Monotonic time source, in seconds
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Tuple[str, str], CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __reduce__(self):
+        # Caches hold locks and are not copied between processes: the
+        # process-wide cache maps to the receiving process's own, and
+        # other caches arrive empty.
+        if self is _default_cache:
+            return get_default_cache, ()
+        return type(self), (self.max_size,)
+
+    @staticmethod
+    def _key(name: str, record_type: str) -> Tuple[str, str]:
+        return name.lower().rstrip('.'), record_type.upper()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, name: str, record_type: str) -> Optional[CacheEntry]:
+        """Get the live entry for a query, or None on a miss."""
+        key = self._key(name, record_type)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires <= self.clock():
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        entry = self._load(key)
+        if entry is not None:
+            self._store(key, entry)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def remaining_ttl(self, entry: CacheEntry) -> int:
+        """Get the seconds an entry has left to live."""
+        return max(0, int(entry.expires - self.clock()))
+
+    def _load(self, key: Tuple[str, str]) -> Optional[CacheEntry]:
+        """Load an entry missing from memory; overridden by persistent caches."""
+        return None
+
+    def _store(self, key: Tuple[str, str], entry: CacheEntry) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def put(self, name: str, record_type: str, answers: Any,
+            ttl: Optional[int] = None) -> None:
+        """Cache answers for their TTL (or the given one)."""
+        if ttl is None:
+            ttl = answer_ttl(answers)
+        if ttl > 0:
+            self._store(self._key(name, record_type),
+                        CacheEntry(answers, None, self.clock() + ttl))
+
+    def put_negative(self, name: str, record_type: str, error: str,
+                     ttl: int) -> None:
+        """Cache a negative answer (NXDOMAIN/NoAnswer) with its message."""
+        if ttl > 0:
+            self._store(self._key(name, record_type),
+                        CacheEntry(None, error, self.clock() + ttl))
+
+    def clear(self) -> None:
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Get hit/miss counters and the current size."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+        }
+
+
+def serialize_answers(answers: Any) -> Optional[List[str]]:
+    """Convert answers to their text form, or None if they have none."""
+    try:
+        return [rdata.to_text() for rdata in answers]
+    except AttributeError:
+        return None
+
+
+def deserialize_answers(record_type: str, texts: List[str]) -> List[Any]:
+    """Rebuild rdata objects from their text form."""
+    rdtype = dns.rdatatype.from_text(record_type)
+    return [dns.rdata.from_text(dns.rdataclass.IN, rdtype, text)
+            for text in texts]
+
+
+class PersistentDNSCache(DNSCache):
+    """DNS cache backed by a SQLite database that survives between runs.
+
+    Lookups are served from memory first, then from the database. Expiry
+    times are stored as wall-clock timestamps so they stay meaningful
+    across processes; expired rows are pruned when the cache is opened.
+    """
+
+    FILENAME = "dns_cache.sqlite3"
+
+    def __init__(self, directory: str, max_size: int = 10000,
+                 clock: Callable[[], float] = time.monotonic,
+                 wall_clock: Callable[[], float] = time.time):
+        """Initialize the cache.
+
+        Args:
+            directory: Directory holding the database, created if missing
+            max_size: Maximum number of entries kept in memory
+            clock: Monotonic time source, in seconds
+            wall_clock: Wall-clock time source used for stored expiry times
+        """
+        super().__init__(max_size, clock)
+        self.directory = directory
+        self.wall_clock = wall_clock
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, self.FILENAME)
+        self._db = sqlite3.connect(self.path, timeout=30,
+                                   check_same_thread=False)
+        self._db_lock = threading.Lock()
+        with self._db_lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS records ("
+                " name TEXT NOT NULL,"
+                " record_type TEXT NOT NULL,"
+                " expires REAL NOT NULL,"
+                " error TEXT,"
+                " answers TEXT,"
+                " PRIMARY KEY (name, record_type))"
+            )
+            self._db.execute("DELETE FROM records WHERE expires <= ?",
+                             (self.wall_clock(),))
+
+    def __reduce__(self):
+        # Each process opens its own connection to the shared database
+        return open_persistent_cache, (self.directory, self.max_size)
+
+    def _load(self, key: Tuple[str, str]) -> Optional[CacheEntry]:
+        """Load a live entry from the database."""
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT expires, error, answers FROM records"
+                " WHERE name = ? AND record_type = ?", key
+            ).fetchone()
+        if row is None:
+            return None
+
+        expires, error, answers = row
+        remaining = expires - self.wall_clock()
+        if remaining <= 0:
+            return None
+        if error is None:
+            answers = deserialize_answers(key[1], json.loads(answers))
+        return CacheEntry(answers, error, self.clock() + remaining)
+
+    def _persist(self, name: str, record_type: str, ttl: int,
+                 error: Optional[str], answers: Optional[List[str]]) -> None:
+        with self._db_lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?)",
+                self._key(name, record_type)
+                + (self.wall_clock() + ttl, error,
+                   None if answers is None else json.dumps(answers))
+            )
+
+    def put(self, name: str, record_type: str, answers: Any,
+            ttl: Optional[int] = None) -> None:
+        """Cache answers for their TTL in memory and on disk."""
+        if ttl is None:
+            ttl = answer_ttl(answers)
+        super().put(name, record_type, answers, ttl)
+        texts = serialize_answers(answers)
+        if ttl > 0 and texts is not None:
+            self._persist(name, record_type, ttl, None, texts)
+
+    def put_negative(self, name: str, record_type: str, error: str,
+                     ttl: int) -> None:
+        """Cache a negative answer in memory and on disk."""
+        super().put_negative(name, record_type, error, ttl)
+        if ttl > 0:
+            self._persist(name, record_type, ttl, error, None)
+
+    def clear(self) -> None:
+        """Remove all entries, on disk too, and reset the counters."""
+        super().clear()
+        with self._db_lock, self._db:
+            self._db.execute("DELETE FROM records")
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._db_lock:
+            self._db.close()
+
+
+_default_cache: Optional[DNSCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> DNSCache:
+    """Get the process-wide cache shared by analyzers."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = DNSCache()
+        return _default_cache
+
+
+_persistent_caches: Dict[str, PersistentDNSCache] = {}
+
+
+def open_persistent_cache(directory: str, max_size: int = 10000) -> PersistentDNSCache:
+    """Get this process's persistent cache for a directory, opening it once."""
+    with _default_cache_lock:
+        cache = _persistent_caches.get(directory)
+        if cache is None:
+            cache = _persistent_caches[directory] = PersistentDNSCache(
+                directory, max_size)
+        return cache
@@ -0,0 +1,211 @@
+import socket
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+import dns.entropy
+import dns.flags
+import dns.inet
+import dns.message
+import dns.name
+import dns.query
+import dns.rcode
+import dns.rdataclass
+import dns.rdatatype
+import dns.resolver
+from url_analyzer.analyzers.resolver_pool import configure_resolver
+
+# EDNS buffer size advertised in queries; large enough for most answers
+# while staying clear of IP fragmentation
+EDNS_PAYLOAD = 1232
+
+
+def make_answer(qname: dns.name.Name, record_type: str,
+                query: dns.message.Message, response: dns.message.Message,
+                nameserver: Optional[str] = None) -> dns.resolver.Answer:
+    """Turn a response into an Answer, as Resolver.resolve() would.
+
+    Raises:
+        dns.resolver.NXDOMAIN: If the name does not exist
+        dns.resolver.NoAnswer: If it has no records of the type
+        dns.resolver.YXDOMAIN: If the name is too long after DNAME substitution
+        dns.resolver.NoNameservers: If the server answered with another error
+    """
+    rcode = response.rcode()
+    if rcode == dns.rcode.NXDOMAIN:
+        raise dns.resolver.NXDOMAIN(qnames=[qname], responses={qname: response})
+    if rcode == dns.rcode.YXDOMAIN:
+        raise dns.resolver.YXDOMAIN()
+    if rcode != dns.rcode.NOERROR:
+        raise dns.resolver.NoNameservers(
+            request=query,
+            errors=[(nameserver, False, None, dns.rcode.to_text(rcode), response)]
+        )
+    answer = dns.resolver.Answer(qname, dns.rdatatype.from_text(record_type),
+                                 dns.rdataclass.IN, response, nameserver)
+    if answer.rrset is None:
+        raise dns.resolver.NoAnswer(response=response)
+    return answer
+
+
+class DNSTransport:
+    """Send all queries for a name at once over reused UDP sockets.
+
+    Resolver.resolve() opens a socket per query and sends queries one
+    after another. query_many() instead writes every query for a name to
+    one socket from a small pool, then reads responses as they arrive,
+    matching them to queries by ID; truncated responses are retried over
+    TCP. Names are queried as given, without search-list qualification.
+
+    Transports are thread-safe: each call borrows a socket of its own.
+    """
+
+    def __init__(self, nameserver: Optional[str] = None,
+                 port: Optional[int] = None,
+                 timeout: Optional[float] = None, max_sockets: int = 8):
+        """Initialize the transport.
+
+        Args:
+            nameserver: Nameserver address (default: the first one
+                configure_resolver() picks)
+            port: Nameserver port (default: 53, or as configure_resolver())
+            timeout: Seconds to wait for all responses of a name (default:
+                the resolver timeout, see configure_resolver())
+            max_sockets: Number of idle sockets kept for reuse
+        """
+        if nameserver is None or port is None or timeout is None:
+            try:
+                template = dns.resolver.Resolver()
+            except Exception:
+                template = dns.resolver.Resolver(configure=False)
+            configure_resolver(template)
+            if nameserver is None:
+                nameserver = template.nameservers[0]
+            if port is None:
+                port = template.port
+            if timeout is None:
+                timeout = template.timeout
+        self.nameserver = nameserver
+        self.port = port
+        self.timeout = timeout
+        self.max_sockets = max_sockets
+        self._family = dns.inet.af_for_address(nameserver)
+        self._idle: List[socket.socket] = []
+        self._lock = threading.Lock()
+
+    def __reduce__(self):
+        # Sockets stay with each process; only the settings are copied
+        return type(self), (self.nameserver, self.port, self.timeout,
+                            self.max_sockets)
+
+    def _acquire(self) -> socket.socket:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        sock = socket.socket(self._family, socket.SOCK_DGRAM)
+        # A connected socket only receives datagrams from the nameserver
+        sock.connect((self.nameserver, self.port))
+        return sock
+
+    def _release(self, sock: socket.socket) -> None:
+        with self._lock:
+            if len(self._idle) < self.max_sockets:
+                self._idle.append(sock)
+                return
+        sock.close()
+
+    def close(self) -> None:
+        """Close the idle sockets."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for sock in idle:
+            sock.close()
+
+    def query_many(self, name: str, record_types: Iterable[str],
+                   timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Query several record types of a name in one round trip.
+
+        Args:
+            name: Domain name, queried as an absolute name
+            record_types: Record types to query
+            timeout: Seconds to wait for all responses (default: the
+                transport timeout)
+
+        Returns:
+            Dict mapping each record type to its dns.resolver.Answer, or to
+            the exception Resolver.resolve() would have raised for it
+        """
+        qname = dns.name.from_text(name)
+        if timeout is None:
+            timeout = self.timeout
+        queries: Dict[int, Any] = {}
+        for record_type in record_types:
+            query = dns.message.make_query(qname, record_type, use_edns=0,
+                                           payload=EDNS_PAYLOAD)
+            # Responses are matched by ID, so IDs must differ within a call
+            while query.id in queries:
+                query.id = dns.entropy.random_16()
+            queries[query.id] = (record_type, query)
+
+        results: Dict[str, Any] = {}
+        sock = self._acquire()
+        try:
+            for _, query in queries.values():
+                sock.send(query.to_wire())
+            self._receive(sock, queries, results, time.monotonic() + timeout)
+        except OSError as e:
+            sock.close()
+            sock = None
+            for record_type, _ in queries.values():
+                results.setdefault(record_type, e)
+        finally:
+            if sock is not None:
+                self._release(sock)
+
+        for record_type, query in queries.values():
+            response = results.get(record_type)
+            if isinstance(response, dns.message.Message):
+                results[record_type] = self._answer(qname, record_type,
+                                                    query, response)
+            elif response is None:
+                results[record_type] = dns.resolver.LifetimeTimeout(
+                    timeout=timeout, errors=[])
+        return results
+
+    def _receive(self, sock: socket.socket, queries: Dict[int, Any],
+                 results: Dict[str, Any], expiration: float) -> None:
+        """Read responses until every query is answered or time is up."""
+        remaining = len(queries)
+        while remaining:
+            wait = expiration - time.monotonic()
+            if wait <= 0:
+                return
+            sock.settimeout(wait)
+            try:
+                wire = sock.recv(65535)
+            except socket.timeout:
+                return
+            try:
+                response = dns.message.from_wire(wire)
+            except Exception:
+                # Garbage or a late reply from an earlier call
+                continue
+            match = queries.get(response.id)
+            if match is None or match[0] in results:
+                continue
+            record_type, query = match
+            if not query.is_response(response):
+                continue
+            results[record_type] = response
+            remaining -= 1
+
+    def _answer(self, qname: dns.name.Name, record_type: str,
+                query: dns.message.Message, response: dns.message.Message) -> Any:
+        """Build the result for one response, retrying truncated ones over TCP."""
+        try:
+            if response.flags & dns.flags.TC:
+                response = dns.query.tcp(query, self.nameserver,
+                                         timeout=self.timeout, port=self.port)
+            return make_answer(qname, record_type, query, response,
+                               self.nameserver)
+        except Exception as e:
+            return e
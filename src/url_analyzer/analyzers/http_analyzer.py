@@ -0,0 +1,230 @@
+"""HTTP analysis: fetch a URL and report how it answered.
+
+Fetches go through an HTTPClient, a pooled keep-alive requests.Session
+that reuses connections per host, limits how many requests run against
+each host at once, and fetches many URLs concurrently. Analyzers share the
+process-wide client from get_default_client() unless given one:
+
+    client = HTTPClient(max_per_host=4)
+    HTTPAnalyzer("https://example.com", client=client).analyze()
+    for result in client.fetch_many(urls, workers=32):
+        ...
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from url_analyzer.core.base_analyzer_interface import BaseAnalyzer
+from url_analyzer.utils.exceptions import (
+    ConnectionError, SSLError, TimeoutError, URLAnalyzerError
+)
+
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_MAX_PER_HOST = 6
+DEFAULT_MAX_REDIRECTS = 10
+# Largest body read per fetch; the rest is not downloaded
+DEFAULT_MAX_BODY = 1 << 20
+# Hosts whose connection pools are kept
+POOL_HOSTS = 100
+USER_AGENT = "url-analyzer"
+CHUNK_SIZE = 1 << 16
+
+
+class HTTPClient:
+    """Thread-safe pooled HTTP client with per-host concurrency limits.
+
+    A limit counts requests by the host of the URL asked for: redirects to
+    other hosts are followed within the first host's slot, not counted
+    against theirs. Limits are only kept for hosts with requests in flight
+    or waiting, so memory stays flat however many hosts are fetched.
+    """
+
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT,
+                 max_per_host: int = DEFAULT_MAX_PER_HOST,
+                 max_redirects: int = DEFAULT_MAX_REDIRECTS,
+                 max_body: int = DEFAULT_MAX_BODY,
+                 verify: bool = True):
+        """Initialize the client.
+
+        Args:
+            timeout: Seconds to wait to connect and between bytes received
+            max_per_host: Requests in flight to one host at a time, and
+                connections kept open to it
+            max_redirects: Redirects followed before giving up
+            max_body: Bytes of each body read to measure its size
+            verify: Verify TLS certificates
+        """
+        if max_per_host < 1:
+            raise ValueError("max_per_host must be at least 1")
+        self.timeout = timeout
+        self.max_per_host = max_per_host
+        self.max_body = max_body
+        self.session = requests.Session()
+        self.session.max_redirects = max_redirects
+        self.session.verify = verify
+        self.session.headers["User-Agent"] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=max_per_host)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # Semaphore and number of requests holding or waiting for it, by host
+        self._host_limits: Dict[str, List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "HTTPClient":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the pooled connections."""
+        self.session.close()
+
+    @contextmanager
+    def _host_limit(self, url: str) -> Iterator[None]:
+        """Hold one of the slots of the URL's host."""
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            entry = self._host_limits.get(host)
+            if entry is None:
+                entry = self._host_limits[host] = [
+                    threading.BoundedSemaphore(self.max_per_host), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    # Nobody holds or waits for it any more
+                    del self._host_limits[host]
+
+    def fetch(self, url: str) -> Dict[str, Any]:
+        """Fetch a URL, following redirects, within its host's limit.
+
+        Returns:
+            Dict with the URL, final URL, status, reason, redirect chain,
+            latency in seconds, headers, body size in bytes and whether
+            the body was cut at max_body
+
+        Raises:
+            SSLError: If the TLS handshake fails
+            TimeoutError: If the server does not answer in time
+            ConnectionError: If the request fails otherwise
+        """
+        with self._host_limit(url):
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, timeout=self.timeout, stream=True)
+                try:
+                    size, truncated = 0, False
+                    # One byte past max_body tells a cut body from one that fits
+                    for chunk in response.iter_content(min(CHUNK_SIZE, self.max_body + 1)):
+                        size += len(chunk)
+                        if size > self.max_body:
+                            size, truncated = self.max_body, True
+                            break
+                finally:
+                    # A fully read body hands its connection back to the pool
+                    response.close()
+            except requests.exceptions.SSLError as e:
+                raise SSLError(f"TLS error fetching {url}: {str(e)}")
+            except requests.exceptions.Timeout as e:
+                raise TimeoutError(f"Timed out fetching {url}: {str(e)}")
+            except requests.exceptions.RequestException as e:
+                raise ConnectionError(f"Failed to fetch {url}: {str(e)}")
+            latency = time.perf_counter() - start
+
+        return {
+            "url": url,
+            "final_url": response.url,
+            "status": response.status_code,
+            "reason": response.reason,
+            "redirects": [{
+                "url": hop.url,
+                "status": hop.status_code,
+                "location": hop.headers.get("Location")
+            } for hop in response.history],
+            "latency": latency,
+            "headers": dict(response.headers),
+            "content_size": size,
+            "truncated": truncated
+        }
+
+    def fetch_many(self, urls: Iterable[str], workers: int = 16
+                   ) -> Iterator[Dict[str, Any]]:
+        """Fetch URLs concurrently, yielding results in input order.
+
+        At most twice as many URLs as workers are in flight, so memory
+        stays flat however many URLs there are. Failed fetches are
+        reported as {"url": ..., "error": ...} instead of raised.
+        """
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending: Deque[Future] = deque()
+            for url in urls:
+                if len(pending) >= workers * 2:
+                    yield pending.popleft().result()
+                pending.append(executor.submit(self.fetch_or_error, url))
+            while pending:
+                yield pending.popleft().result()
+
+    def fetch_or_error(self, url: str) -> Dict[str, Any]:
+        """Like fetch(), reporting a failure as {"url": ..., "error": ...}."""
+        try:
+            return self.fetch(url)
+        except URLAnalyzerError as e:
+            return {"url": url, "error": str(e)}
+
+
+_default_client: Optional[HTTPClient] = None
+_default_client_lock = threading.Lock()
+
+
+def get_default_client() -> HTTPClient:
+    """Get the process-wide client shared by analyzers."""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = HTTPClient()
+        return _default_client
+
+
+class HTTPAnalyzer(BaseAnalyzer):
+    """HTTP response analyzer."""
+
+    def __init__(self, url: str, client: Optional[HTTPClient] = None):
+        """Initialize the analyzer.
+
+        Args:
+            url: URL to fetch
+            client: Client to fetch through, usually shared (default: the
+                process-wide one from get_default_client())
+        """
+        self.url = url
+        self.client = client or get_default_client()
+
+    def get_info(self) -> Dict[str, Any]:
+        """Get basic HTTP information."""
+        return {"url": self.url, "max_per_host": self.client.max_per_host}
+
+    def fetch(self) -> Dict[str, Any]:
+        """Fetch the URL; see HTTPClient.fetch().
+
+        Raises:
+            URLAnalyzerError: If the fetch fails
+        """
+        return self.client.fetch(self.url)
+
+    def analyze(self) -> Dict[str, Any]:
+        """Perform HTTP analysis.
+
+        A failed fetch is reported with an "error" message rather than
+        raised, so it does not abort the other analyses of a URL.
+        """
+        return self.client.fetch_or_error(self.url)
@@ -0,0 +1,169 @@
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional
+
+# Seconds between checks for a free slot while waiting on the event loop
+ASYNC_POLL_INTERVAL = 0.005
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at a fixed rate.
+
+    Callers reserve tokens and are told how long to wait before using
+    them, so waiting can happen outside the lock, with time.sleep() or
+    asyncio.sleep().
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """Initialize a full bucket.
+
+        Args:
+            rate: Tokens added per second
+            burst: Bucket capacity (default: one second of tokens, at least 1)
+            clock: Monotonic time source, in seconds
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = max(rate, 1.0) if burst is None else burst
+        self.clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: float = 1) -> float:
+        """Take tokens, going into debt if needed.
+
+        Returns:
+            Seconds to wait before the tokens may be used
+        """
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self.burst,
+                               self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            return max(0.0, -self._tokens / self.rate)
+
+
+class QueryGovernor:
+    """Bound the rate and concurrency of outbound DNS queries.
+
+    Queries wait for a token from a global bucket and from a bucket of
+    the nameserver they go to, then for one of a limited number of
+    in-flight slots. Share one governor between all analyzers of a job.
+    """
+
+    def __init__(self, qps: Optional[float] = None,
+                 qps_per_server: Optional[float] = None,
+                 max_in_flight: Optional[int] = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], Any] = time.sleep):
+        """Initialize the governor; limits left as None are not enforced.
+
+        Args:
+            qps: Queries per second across all nameservers
+            qps_per_server: Queries per second to each nameserver
+            max_in_flight: Requests awaiting a response at any time
+            clock: Monotonic time source, in seconds
+            sleep: Function waiting for a number of seconds
+        """
+        if max_in_flight is not None and max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        self.qps = qps
+        self.qps_per_server = qps_per_server
+        self.max_in_flight = max_in_flight
+        self.clock = clock
+        self.sleep = sleep
+        self._bucket = TokenBucket(qps, clock=clock) if qps else None
+        self._server_buckets: Dict[Optional[str], TokenBucket] = {}
+        self._slots = (threading.BoundedSemaphore(max_in_flight)
+                       if max_in_flight else None)
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.delayed = 0
+        self.wait_time = 0.0
+
+    def __reduce__(self):
+        # Buckets and slots stay with each process; see split()
+        return type(self), (self.qps, self.qps_per_server, self.max_in_flight)
+
+    def split(self, parts: int) -> "QueryGovernor":
+        """Get a governor enforcing an equal share of these limits.
+
+        Used to spread limits across worker processes, which each enforce
+        their own.
+        """
+        return type(self)(
+            self.qps / parts if self.qps else None,
+            self.qps_per_server / parts if self.qps_per_server else None,
+            max(1, self.max_in_flight // parts) if self.max_in_flight else None,
+            self.clock, self.sleep
+        )
+
+    def _reserve(self, server: Optional[str], queries: int) -> float:
+        """Take rate tokens for queries and get the time to wait for them."""
+        delay = 0.0
+        if self._bucket is not None:
+            delay = self._bucket.reserve(queries)
+        if self.qps_per_server:
+            with self._lock:
+                bucket = self._server_buckets.get(server)
+                if bucket is None:
+                    bucket = self._server_buckets[server] = TokenBucket(
+                        self.qps_per_server, clock=self.clock)
+            delay = max(delay, bucket.reserve(queries))
+        with self._lock:
+            self.queries += queries
+            if delay > 0:
+                self.delayed += queries
+                self.wait_time += delay
+        return delay
+
+    @contextmanager
+    def limit(self, server: Optional[str] = None, queries: int = 1) -> Iterator[None]:
+        """Wait until a request may be sent, holding a slot while it runs.
+
+        Args:
+            server: Nameserver the request goes to
+            queries: Number of queries sent together in the request
+        """
+        delay = self._reserve(server, queries)
+        if delay > 0:
+            self.sleep(delay)
+        if self._slots is not None:
+            self._slots.acquire()
+        try:
+            yield
+        finally:
+            if self._slots is not None:
+                self._slots.release()
+
+    @asynccontextmanager
+    async def limit_async(self, server: Optional[str] = None,
+                          queries: int = 1) -> AsyncIterator[None]:
+        """Like limit(), waiting on the event loop instead of blocking it."""
+        delay = self._reserve(server, queries)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self._slots is not None:
+            # Slots are shared with threads, so they cannot be awaited
+            while not self._slots.acquire(blocking=False):
+                await asyncio.sleep(ASYNC_POLL_INTERVAL)
+        try:
+            yield
+        finally:
+            if self._slots is not None:
+                self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the number of queries, how many were delayed and for how long."""
+        with self._lock:
+            return {
+                "queries": self.queries,
+                "delayed": self.delayed,
+                "wait_time": self.wait_time,
+            }
@@ -0,0 +1,11 @@
+"""DNS record types supported by the analyzers.
+
+This module does not import dnspython, so code that only needs the names
+of the record types (such as the CLI's argument parser) stays fast to load.
+"""
+
+# Record types in output order
+RECORD_TYPES = ("A", "AAAA", "CNAME", "MX", "TXT", "NS", "SOA")
+# Result key of each record type, in the same order
+RECORD_KEYS = ("a_records", "aaaa_records", "cname_records", "mx_records",
+               "txt_records", "ns_records", "soa_record")
@@ -0,0 +1,328 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, List, Optional
+import dns.resolver
+from url_analyzer.analyzers.dns_cache import NEGATIVE_ERRORS
+
+# Environment variables read when a setting is not given explicitly
+NAMESERVERS_ENV = "URL_ANALYZER_NAMESERVERS"
+TIMEOUT_ENV = "URL_ANALYZER_DNS_TIMEOUT"
+LIFETIME_ENV = "URL_ANALYZER_DNS_LIFETIME"
+PORT_ENV = "URL_ANALYZER_DNS_PORT"
+
+# Used when neither the caller nor the system configures any nameserver
+FALLBACK_NAMESERVERS = ['8.8.8.8', '8.8.4.4']
+# Number of recent latencies kept per nameserver for quantiles
+LATENCY_SAMPLES = 200
+
+
+def parse_nameservers(value: Optional[str]) -> Optional[List[str]]:
+    """Split a comma-separated nameserver list, or None if empty."""
+    if not value:
+        return None
+    nameservers = [server.strip() for server in value.split(',') if server.strip()]
+    return nameservers or None
+
+
+def _env_float(name: str) -> Optional[float]:
+    value = os.environ.get(name)
+    return float(value) if value else None
+
+
+def configure_resolver(resolver: Any, nameservers: Optional[List[str]] = None,
+                       timeout: Optional[float] = None,
+                       lifetime: Optional[float] = None,
+                       port: Optional[int] = None) -> Any:
+    """Apply resolver settings, falling back to the environment.
+
+    Settings not given explicitly are read from $URL_ANALYZER_NAMESERVERS
+    (comma-separated), $URL_ANALYZER_DNS_TIMEOUT, $URL_ANALYZER_DNS_LIFETIME
+    and $URL_ANALYZER_DNS_PORT; otherwise the system configuration is kept.
+
+    Args:
+        resolver: dns.resolver.Resolver or dns.asyncresolver.Resolver
+        nameservers: Nameserver addresses to query
+        timeout: Seconds to wait for each nameserver
+        lifetime: Seconds a whole query may take, across nameservers
+        port: Port the nameservers listen on, e.g. for a local test server
+
+    Returns:
+        The resolver
+    """
+    if nameservers is None:
+        nameservers = parse_nameservers(os.environ.get(NAMESERVERS_ENV))
+    if timeout is None:
+        timeout = _env_float(TIMEOUT_ENV)
+    if lifetime is None:
+        lifetime = _env_float(LIFETIME_ENV)
+    if port is None and os.environ.get(PORT_ENV):
+        port = int(os.environ[PORT_ENV])
+
+    if nameservers:
+        resolver.nameservers = list(nameservers)
+    elif not resolver.nameservers:
+        resolver.nameservers = list(FALLBACK_NAMESERVERS)
+    if timeout is not None:
+        resolver.timeout = timeout
+    if lifetime is not None:
+        resolver.lifetime = lifetime
+    if port is not None:
+        resolver.port = port
+    return resolver
+
+
+class NameserverStats:
+    """Health and latency statistics of one nameserver."""
+
+    __slots__ = ("latency", "error_rate", "queries", "failures", "last_failure")
+
+    def __init__(self):
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.queries = 0
+        self.failures = 0
+        self.last_failure: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class ResolverPool:
+    """Route queries to the fastest healthy nameserver, failing over.
+
+    Each nameserver is queried on its own, with its latency and error rate
+    tracked as exponentially weighted moving averages. Queries go to
+    healthy servers in order of latency (servers not yet measured first, so
+    every server gets probed), then to unhealthy ones as a last resort. A
+    server is unhealthy while its error rate is at or above a threshold,
+    until a cooldown since its last failure has passed.
+
+    Negative answers (NXDOMAIN/NoAnswer) are authoritative: they count as
+    successes and are not retried on other servers.
+    """
+
+    def __init__(self, nameservers: Optional[List[str]] = None,
+                 timeout: Optional[float] = None, port: Optional[int] = None,
+                 smoothing: float = 0.2,
+                 unhealthy_error_rate: float = 0.5, cooldown: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """Initialize the pool.
+
+        Args:
+            nameservers: Nameserver addresses (default: as configure_resolver)
+            timeout: Seconds to wait for one server before failing over
+            port: Port the nameservers listen on (default: as
+                configure_resolver)
+            smoothing: Weight of the newest sample in the moving averages
+            unhealthy_error_rate: Error rate at which a server is avoided
+            cooldown: Seconds after its last failure an unhealthy server is
+                tried again in latency order
+            clock: Monotonic time source, in seconds
+        """
+        template = self._create_resolver()
+        configure_resolver(template, nameservers, timeout, port=port)
+        self.nameservers = list(template.nameservers)
+        self.timeout = template.timeout
+        self.port = template.port
+        self.smoothing = smoothing
+        self.unhealthy_error_rate = unhealthy_error_rate
+        self.cooldown = cooldown
+        self.clock = clock
+        self._stats = {server: NameserverStats() for server in self.nameservers}
+        self._latencies: Dict[str, Deque[float]] = {
+            server: deque(maxlen=LATENCY_SAMPLES) for server in self.nameservers
+        }
+        # Runs hedged requests, created on first use
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._resolvers = {}
+        for server in self.nameservers:
+            resolver = dns.resolver.Resolver(configure=False)
+            resolver.nameservers = [server]
+            resolver.timeout = resolver.lifetime = self.timeout
+            resolver.port = self.port
+            self._resolvers[server] = resolver
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _create_resolver() -> dns.resolver.Resolver:
+        try:
+            return dns.resolver.Resolver()
+        except Exception:
+            return dns.resolver.Resolver(configure=False)
+
+    def __reduce__(self):
+        # Statistics stay with each process; only the settings are copied
+        return type(self), (self.nameservers, self.timeout, self.port,
+                            self.smoothing,
+                            self.unhealthy_error_rate, self.cooldown)
+
+    def __enter__(self) -> "ResolverPool":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Shut down the threads running hedged requests.
+
+        Attempts in flight are left to finish; a later hedged request
+        starts new threads.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def is_healthy(self, server: str) -> bool:
+        """Check whether a server is currently preferred for queries."""
+        stats = self._stats[server]
+        return (stats.error_rate < self.unhealthy_error_rate
+                or stats.last_failure is None
+                or self.clock() - stats.last_failure >= self.cooldown)
+
+    def ordered(self) -> List[str]:
+        """Get the nameservers in the order they would be tried."""
+        with self._lock:
+            def key(server: str):
+                stats = self._stats[server]
+                latency = -1.0 if stats.latency is None else stats.latency
+                return (not self.is_healthy(server), latency)
+
+            return sorted(self.nameservers, key=key)
+
+    def record(self, server: str, latency: float, ok: bool) -> None:
+        """Record the outcome of a query to a server."""
+        alpha = self.smoothing
+        with self._lock:
+            stats = self._stats[server]
+            stats.queries += 1
+            stats.error_rate = (1 - alpha) * stats.error_rate + alpha * (not ok)
+            if ok:
+                self._latencies[server].append(latency)
+                if stats.latency is None:
+                    stats.latency = latency
+                else:
+                    stats.latency = (1 - alpha) * stats.latency + alpha * latency
+            else:
+                stats.failures += 1
+                stats.last_failure = self.clock()
+
+    def latency_quantile(self, server: str, quantile: float) -> Optional[float]:
+        """Get a quantile of a server's recent latencies, or None if unmeasured."""
+        with self._lock:
+            samples = sorted(self._latencies[server])
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(quantile * len(samples)))]
+
+    def _attempt(self, server: str, name: str, record_type: str,
+                 governor: Optional[Any], kwargs: Dict[str, Any]) -> Any:
+        """Query one server, recording the outcome."""
+        resolver = self._resolvers[server]
+        start = self.clock()
+        try:
+            if governor is None:
+                answers = resolver.resolve(name, record_type, **kwargs)
+            else:
+                with governor.limit(server):
+                    start = self.clock()
+                    answers = resolver.resolve(name, record_type, **kwargs)
+        except NEGATIVE_ERRORS:
+            self.record(server, self.clock() - start, True)
+            raise
+        except Exception:
+            self.record(server, self.clock() - start, False)
+            raise
+        self.record(server, self.clock() - start, True)
+        return answers
+
+    def _resolve_on(self, servers: List[str], name: str, record_type: str,
+                    governor: Optional[Any], kwargs: Dict[str, Any],
+                    error: Optional[Exception] = None) -> Any:
+        """Try servers in turn until one answers."""
+        for server in servers:
+            try:
+                return self._attempt(server, name, record_type, governor, kwargs)
+            except NEGATIVE_ERRORS:
+                raise
+            except Exception as e:
+                error = e
+        raise error
+
+    def resolve(self, name: str, record_type: str,
+                governor: Optional[Any] = None, **kwargs: Any) -> Any:
+        """Resolve a query on the best server, failing over on errors.
+
+        Args:
+            name: Domain name
+            record_type: Record type
+            governor: QueryGovernor every attempt waits for
+            **kwargs: Keyword arguments passed to Resolver.resolve()
+
+        Raises:
+            The error of the last server tried if none answered
+        """
+        return self._resolve_on(self.ordered(), name, record_type, governor,
+                                kwargs)
+
+    def resolve_hedged(self, name: str, record_type: str,
+                       hedge_after: Optional[float] = None,
+                       quantile: float = 0.95,
+                       governor: Optional[Any] = None, **kwargs: Any) -> Any:
+        """Resolve a query, also asking the next server if the best is slow.
+
+        The first answer wins; the slower request runs to completion in the
+        background and only updates the statistics. If both fail, the
+        remaining servers are tried in turn as in resolve().
+
+        Args:
+            name: Domain name
+            record_type: Record type
+            hedge_after: Seconds to wait before hedging (default: the given
+                latency quantile of the best server; no hedging while it is
+                unmeasured)
+            quantile: Latency quantile used when hedge_after is not given
+            governor: QueryGovernor every attempt waits for
+            **kwargs: Keyword arguments passed to Resolver.resolve()
+        """
+        servers = self.ordered()
+        if hedge_after is None:
+            hedge_after = self.latency_quantile(servers[0], quantile)
+        if len(servers) < 2 or hedge_after is None:
+            return self._resolve_on(servers, name, record_type, governor, kwargs)
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    thread_name_prefix="dns-hedge")
+            executor = self._executor
+        pending = {executor.submit(self._attempt, servers[0], name,
+                                   record_type, governor, kwargs)}
+        done, _ = wait(pending, timeout=hedge_after)
+        if not done:
+            pending.add(executor.submit(self._attempt, servers[1], name,
+                                        record_type, governor, kwargs))
+            tried = 2
+        else:
+            tried = 1
+
+        error: Optional[Exception] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return future.result()
+                except NEGATIVE_ERRORS:
+                    raise
+                except Exception as e:
+                    error = e
+        return self._resolve_on(servers[tried:], name, record_type, governor,
+                                kwargs, error)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get the statistics of every nameserver."""
+        with self._lock:
+            return {server: stats.to_dict() for server, stats in self._stats.items()}
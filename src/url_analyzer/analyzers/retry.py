@@ -0,0 +1,135 @@
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+import dns.exception
+import dns.resolver
+
+# Errors worth another attempt: the server did not answer or failed
+RETRYABLE_ERRORS = (dns.exception.Timeout, dns.resolver.NoNameservers, OSError)
+
+
+def parse_timeouts(value: str) -> Dict[str, float]:
+    """Parse per record type timeouts such as "A=0.5,TXT=2".
+
+    Raises:
+        ValueError: If an entry is not TYPE=SECONDS with positive seconds
+    """
+    timeouts = {}
+    for entry in value.split(','):
+        if not entry.strip():
+            continue
+        record_type, sep, seconds = entry.partition('=')
+        if not sep or not record_type.strip():
+            raise ValueError(f"Expected TYPE=SECONDS, got: {entry.strip()}")
+        timeout = float(seconds)
+        if timeout <= 0:
+            raise ValueError(f"Timeout must be positive: {entry.strip()}")
+        timeouts[record_type.strip().upper()] = timeout
+    return timeouts
+
+
+class RetryPolicy:
+    """How DNS queries are retried, timed out and hedged.
+
+    Failed attempts are retried with exponential backoff and full jitter:
+    before retry n the caller sleeps a random time of up to
+    backoff * 2 ** (n - 1) seconds, capped at max_backoff. Only timeouts
+    and server failures are retried; negative answers are final.
+
+    Each attempt may be bounded by a lifetime per record type, so a slow
+    TXT lookup cannot hold up a whole analysis. With hedging, queries
+    through a ResolverPool also go to the second best nameserver when the
+    best one has not answered within its recent p95 latency.
+    """
+
+    def __init__(self, attempts: int = 3, backoff: float = 0.1,
+                 max_backoff: float = 2.0, timeout: Optional[float] = None,
+                 timeouts: Optional[Dict[str, float]] = None,
+                 hedge: bool = False, hedge_after: Optional[float] = None,
+                 hedge_quantile: float = 0.95,
+                 uniform: Callable[[], float] = random.random,
+                 sleep: Callable[[float], Any] = time.sleep):
+        """Initialize the policy.
+
+        Args:
+            attempts: Maximum attempts per query, the first one included
+            backoff: Maximum delay in seconds before the first retry
+            max_backoff: Cap on the maximum delay before any retry
+            timeout: Lifetime of each attempt in seconds (default: the
+                resolver's)
+            timeouts: Lifetimes by record type, overriding timeout
+            hedge: Send a second request when the first is slow
+            hedge_after: Seconds before hedging (default: the
+                hedge_quantile latency of the nameserver)
+            hedge_quantile: Latency quantile used when hedge_after is not set
+            uniform: Source of uniform numbers in [0, 1) for the jitter
+            sleep: Function waiting for a number of seconds
+        """
+        if attempts < 1:
+            raise ValueError("attempts must be at least 1")
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.timeouts = {record_type.upper(): value
+                         for record_type, value in (timeouts or {}).items()}
+        self.hedge = hedge
+        self.hedge_after = hedge_after
+        self.hedge_quantile = hedge_quantile
+        self.uniform = uniform
+        self.sleep = sleep
+
+    def __reduce__(self):
+        # Each process draws its own jitter
+        return type(self), (self.attempts, self.backoff, self.max_backoff,
+                            self.timeout, self.timeouts, self.hedge,
+                            self.hedge_after, self.hedge_quantile)
+
+    def lifetime(self, record_type: str) -> Optional[float]:
+        """Get the lifetime of one attempt to query a record type."""
+        return self.timeouts.get(record_type.upper(), self.timeout)
+
+    def delay(self, retry: int) -> float:
+        """Get the time to wait before a retry, counting from 1."""
+        return self.uniform() * min(self.max_backoff,
+                                    self.backoff * 2 ** (retry - 1))
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        """Check whether a failed query is worth another attempt."""
+        return isinstance(error, RETRYABLE_ERRORS)
+
+    def call(self, query: Callable[[Optional[float]], Any],
+             record_type: str) -> Any:
+        """Run a query with retries.
+
+        Args:
+            query: Function sending one attempt, given its lifetime
+            record_type: Record type queried
+
+        Raises:
+            The error of the last attempt
+        """
+        lifetime = self.lifetime(record_type)
+        for retry in range(self.attempts):
+            if retry:
+                self.sleep(self.delay(retry))
+            try:
+                return query(lifetime)
+            except Exception as e:
+                if retry + 1 == self.attempts or not self.is_retryable(e):
+                    raise
+
+    async def call_async(self, query: Callable[[Optional[float]], Awaitable[Any]],
+                         record_type: str) -> Any:
+        """Like call(), for coroutine queries, waiting on the event loop."""
+        lifetime = self.lifetime(record_type)
+        for retry in range(self.attempts):
+            if retry:
+                await asyncio.sleep(self.delay(retry))
+            try:
+                return await query(lifetime)
+            except Exception as e:
+                if retry + 1 == self.attempts or not self.is_retryable(e):
+                    raise
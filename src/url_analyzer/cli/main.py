@@ -1,101 +1,427 @@
 import argparse
 import json
-from url_analyzer.core.main_analyzer import MainAnalyzer
+import os
+import sys
+from typing import Optional
+# dnspython and the batch executors are slow to import, so the analyzers
+# built on them are imported only when the selected mode needs them
 from url_analyzer.core.url_analyzer import URLAnalyzer
-from url_analyzer.analyzers.dns_analyzer import DNSAnalyzer
-from urllib.parse import urlparse
+from url_analyzer.analyzers.records import RECORD_TYPES
+from url_analyzer.utils.instrumentation import Instrumentation, timer
+from url_analyzer.cli.output import (
+    ResultWriter, dns_text_lines, full_text_lines, open_output, url_text_lines
+)
 from url_analyzer.utils.exceptions import URLAnalyzerError, DNSAnalyzerError
 
 def format_url_output(results: dict, text_format: bool = True) -> str:
     """Format URL analysis results."""
     if not text_format:
         return json.dumps(results, indent=2)
-    
-    output = []
-    output.append("\nURL Analysis:")
-    output.append("-" * 50)
-    
-    components = results["components"]
-    for key, value in components.items():
-        output.append(f"{key.replace('_', ' ').title()}: {value}")
-    
-    return "\n".join(output)
+    return "\n".join(url_text_lines(results))
 
 def format_dns_output(results: dict, text_format: bool = True) -> str:
     """Format DNS analysis results."""
     if not text_format:
         return json.dumps(results, indent=2)
-    
-    output = []
-    output.append("\nDNS Records:")
-    output.append("-" * 50)
-    
-    records = results["records"]
-    
-    if records["a_records"]:
-        output.append("\nA Records:")
-        for record in records["a_records"]:
-            output.append(f"  {record}")
-    
-    if records["aaaa_records"]:
-        output.append("\nAAAA Records:")
-        for record in records["aaaa_records"]:
-            output.append(f"  {record}")
-    
-    if records["cname_records"]:
-        output.append("\nCNAME Records:")
-        for record in records["cname_records"]:
-            output.append(f"  {record}")
-    
-    if records["mx_records"]:
-        output.append("\nMX Records:")
-        for record in records["mx_records"]:
-            output.append(f"  Priority: {record['preference']}")
-            output.append(f"  Exchange: {record['exchange']}")
-    
-    if records["txt_records"]:
-        output.append("\nTXT Records:")
-        for record in records["txt_records"]:
-            output.append(f"  {record}")
-    
-    if records["ns_records"]:
-        output.append("\nNS Records:")
-        for record in records["ns_records"]:
-            output.append(f"  {record}")
-    
-    if records["soa_record"]:
-        output.append("\nSOA Record:")
-        for key, value in records["soa_record"].items():
-            output.append(f"  {key}: {value}")
-    
-    return "\n".join(output)
+    return "\n".join(dns_text_lines(results))
 
 def format_full_output(results: dict, text_format: bool = True) -> str:
     """Format complete analysis results."""
     if not text_format:
         return json.dumps(results, indent=2)
-    
-    output = []
-    
-    # Basic info
-    output.append("\nBasic Information:")
-    output.append("-" * 50)
-    for key, value in results["info"].items():
-        output.append(f"{key.replace('_', ' ').title()}: {value}")
-    
-    # URL analysis
-    output.append(format_url_output(results["url_analysis"], True))
-    
-    # DNS analysis
-    output.append(format_dns_output(results["dns_analysis"], True))
-    
-    return "\n".join(output)
+    return "\n".join(full_text_lines(results))
+
+def run_batch(args: argparse.Namespace, dns_options: dict, out) -> None:
+    """Analyze URLs read from a file (or '-' for stdin), streaming results."""
+    from url_analyzer.core.batch import BatchAnalyzer, ProcessBatchAnalyzer, read_urls
+
+    if args.mode != 'url':
+        from url_analyzer.analyzers.dns_cache import get_default_cache
+        # URLs in a batch share a few domains, so DNS answers are worth caching
+        dns_options.setdefault("cache", get_default_cache())
+    # Batches are written as JSON lines unless another format is asked for
+    output_format = 'ndjson' if args.format in (None, 'json') else args.format
+    writer = ResultWriter(out, output_format, args.mode)
+    ordered = args.order == 'input'
+    if args.executor == 'process':
+        processes = args.workers or os.cpu_count() or 1
+        if dns_options.get("governor") is not None:
+            # Each worker process enforces its share of the limits
+            dns_options["governor"] = dns_options["governor"].split(processes)
+        # Incremental runs compare result dicts, so only they are formatted here
+        batch = ProcessBatchAnalyzer(
+            args.mode, processes, args.threads_per_worker, args.chunk_size,
+            ordered, None if args.incremental else writer.formatter,
+            args.records, **dns_options
+        )
+        write_result = writer.write if args.incremental else writer.write_formatted
+    else:
+        batch = BatchAnalyzer(args.mode, args.workers or 8, ordered=ordered,
+                              record_types=args.records, **dns_options)
+        write_result = writer.write
+    instrumentation = dns_options.get("instrumentation")
+
+    incremental = store = None
+    if args.incremental:
+        import sqlite3
+        from url_analyzer.core.store import IncrementalAnalyzer, ResultStore
+        try:
+            store = ResultStore(os.path.join(args.cache_dir, ResultStore.FILENAME))
+        except sqlite3.Error as e:
+            raise OSError(f"Cannot open result store: {str(e)}")
+        incremental = IncrementalAnalyzer(batch, store, args.mode, args.records)
+
+    source = args.input
+    stream = sys.stdin if source == '-' else open(source, encoding='utf-8')
+    try:
+        urls = read_urls(stream)
+        results = batch.run(urls) if incremental is None else incremental.run(urls)
+        for result in results:
+            with timer(instrumentation, "output"):
+                write_result(result)
+        writer.flush()
+        if args.mode != 'url':
+            stats = batch.stats
+            print(f"Analyzed {stats['urls']} URLs with {stats['dns_lookups']} "
+                  f"DNS lookups ({stats['dns_lookups_saved']} saved by "
+                  f"host deduplication)", file=sys.stderr)
+        if incremental is not None:
+            stats = incremental.stats
+            print(f"Skipped {stats['fresh']} URLs with unexpired records; "
+                  f"{stats['new']} new, {stats['changed']} changed, "
+                  f"{stats['unchanged']} unchanged, {stats['errors']} failed",
+                  file=sys.stderr)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+        if store is not None:
+            store.close()
+
+def run(args: argparse.Namespace, dns_options: dict, out=None) -> None:
+    """Run the analysis selected on the command line."""
+    if out is None:
+        out = sys.stdout
+    if args.input is not None:
+        try:
+            run_batch(args, dns_options, out)
+        except OSError as e:
+            print(f"Error: {str(e)}")
+            exit(1)
+        return
+
+    instrumentation = dns_options.get("instrumentation")
+    try:
+        if args.mode == 'url':
+            with timer(instrumentation, "url.parse"):
+                analyzer = URLAnalyzer(args.url)
+            results = analyzer.analyze()
+            format_output = format_url_output
+            
+        elif args.mode == 'dns':
+            from url_analyzer.analyzers.dns_analyzer import DNSAnalyzer
+            with timer(instrumentation, "url.parse"):
+                domain = URLAnalyzer(args.url).get_host()
+            analyzer = DNSAnalyzer(domain, **dns_options)
+            results = analyzer.analyze(args.records)
+            format_output = format_dns_output
+            
+        else:  # full analysis
+            from url_analyzer.core.main_analyzer import MainAnalyzer
+            analyzer = MainAnalyzer(args.url, **dns_options)
+            results = analyzer.analyze(args.records)
+            format_output = format_full_output
+            
+    except (URLAnalyzerError, DNSAnalyzerError) as e:
+        print(f"Error: {str(e)}")
+        exit(1)
+
+    with timer(instrumentation, "output"):
+        if args.format in ('ndjson', 'csv'):
+            if args.mode == 'dns':
+                # Like batch results, name the URL the records are for
+                results = {"url": args.url, **results}
+            ResultWriter(out, args.format, args.mode).write(results)
+        else:
+            print(format_output(results, args.format != 'json'), file=out)
+
+def report_profile(instrumentation: Instrumentation,
+                   path: Optional[str] = None) -> None:
+    """Print the per-stage latency summary, and export it to path if given."""
+    print("\nProfile:", file=sys.stderr)
+    print(instrumentation.format_summary(), file=sys.stderr)
+    if path is not None:
+        try:
+            instrumentation.export(path)
+        except OSError as e:
+            print(f"Error: Cannot write profile: {str(e)}")
+            exit(1)
+
+def get_dns_options(args: argparse.Namespace,
+                    parser: argparse.ArgumentParser) -> dict:
+    """Build the DNS analyzer options selected on the command line."""
+    import sqlite3
+    from url_analyzer.analyzers.dns_analyzer import DNSAnalyzer
+    from url_analyzer.analyzers.dns_cache import PersistentDNSCache
+    from url_analyzer.analyzers.dns_transport import DNSTransport
+    from url_analyzer.analyzers.rate_limit import QueryGovernor
+    from url_analyzer.analyzers.resolver_pool import ResolverPool, parse_nameservers
+    from url_analyzer.analyzers.retry import RetryPolicy, parse_timeouts
+
+    timeouts = {}
+    if args.record_timeout is not None:
+        try:
+            timeouts = parse_timeouts(args.record_timeout)
+        except ValueError as e:
+            parser.error(f"--record-timeout: {str(e)}")
+    if args.records is not None:
+        try:
+            DNSAnalyzer.select_records(args.records)
+        except ValueError as e:
+            parser.error(str(e))
+    dns_options = {
+        "concurrent": args.concurrent,
+        "deadline": args.dns_deadline,
+    }
+    nameservers = parse_nameservers(args.nameservers)
+    if nameservers:
+        dns_options["nameservers"] = nameservers
+        if len(nameservers) > 1:
+            dns_options["pool"] = ResolverPool(nameservers, args.dns_timeout,
+                                               args.dns_port)
+    if args.dns_timeout is not None:
+        dns_options["timeout"] = args.dns_timeout
+    if args.dns_lifetime is not None:
+        dns_options["lifetime"] = args.dns_lifetime
+    if args.dns_port is not None:
+        dns_options["port"] = args.dns_port
+    if args.retries or timeouts or args.hedge or args.hedge_after:
+        dns_options["retry"] = RetryPolicy(
+            attempts=(args.retries or 0) + 1,
+            backoff=args.retry_backoff,
+            timeout=timeouts.pop('*', None),
+            timeouts=timeouts,
+            hedge=args.hedge or args.hedge_after is not None,
+            hedge_after=args.hedge_after
+        )
+    if args.qps or args.qps_per_server or args.max_in_flight:
+        dns_options["governor"] = QueryGovernor(
+            args.qps, args.qps_per_server, args.max_in_flight
+        )
+    if args.pipeline:
+        dns_options["transport"] = DNSTransport(
+            nameservers[0] if nameservers else None, args.dns_port,
+            timeout=args.dns_timeout
+        )
+    if args.no_cache:
+        dns_options["cache"] = None
+    elif args.cache_dir:
+        try:
+            dns_options["cache"] = PersistentDNSCache(args.cache_dir)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Error: Cannot open DNS cache: {str(e)}")
+            exit(1)
+    return dns_options
+
+def add_dns_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the DNS analysis options to a parser."""
+    parser.add_argument(
+        '--records',
+        metavar='TYPE,...',
+        help='Comma-separated DNS record types to query, e.g. A,AAAA,MX '
+             '(default: ' + ','.join(RECORD_TYPES) + ')'
+    )
+    parser.add_argument(
+        '--concurrent',
+        action='store_true',
+        help='Query all DNS record types in parallel (dns and full modes)'
+    )
+    parser.add_argument(
+        '--dns-deadline',
+        type=float,
+        default=None,
+        metavar='SECONDS',
+        help='Maximum time for a concurrent DNS analysis'
+    )
+    parser.add_argument(
+        '--nameservers',
+        metavar='ADDR,...',
+        help='Comma-separated nameservers to query; with several, queries go '
+             'to the fastest healthy one (default: $URL_ANALYZER_NAMESERVERS, '
+             'else the system resolvers)'
+    )
+    parser.add_argument(
+        '--dns-timeout',
+        type=float,
+        default=None,
+        metavar='SECONDS',
+        help='Time to wait for each nameserver (default: $URL_ANALYZER_DNS_TIMEOUT)'
+    )
+    parser.add_argument(
+        '--dns-lifetime',
+        type=float,
+        default=None,
+        metavar='SECONDS',
+        help='Time a DNS query may take across nameservers '
+             '(default: $URL_ANALYZER_DNS_LIFETIME)'
+    )
+    parser.add_argument(
+        '--dns-port',
+        type=int,
+        default=None,
+        metavar='PORT',
+        help='Port the nameservers listen on (default: $URL_ANALYZER_DNS_PORT, '
+             'else 53)'
+    )
+    parser.add_argument(
+        '--pipeline',
+        action='store_true',
+        help="Send all of a domain's DNS queries at once over reused sockets, "
+             'to the first nameserver'
+    )
+    parser.add_argument(
+        '--retries',
+        type=int,
+        default=None,
+        metavar='N',
+        help='Retry DNS queries that time out or fail up to N times, with '
+             'exponential backoff and jitter'
+    )
+    parser.add_argument(
+        '--retry-backoff',
+        type=float,
+        default=0.1,
+        metavar='SECONDS',
+        help='Maximum delay before the first retry, doubling on each '
+             'further retry (default: 0.1)'
+    )
+    parser.add_argument(
+        '--record-timeout',
+        metavar='TYPE=SECONDS,...',
+        help='Time each DNS query attempt may take, per record type, '
+             "e.g. A=0.5,TXT=2 ('*' for all types)"
+    )
+    parser.add_argument(
+        '--hedge',
+        action='store_true',
+        help='With several --nameservers, also ask the next best nameserver '
+             'when the best has not answered within its p95 latency'
+    )
+    parser.add_argument(
+        '--hedge-after',
+        type=float,
+        default=None,
+        metavar='SECONDS',
+        help='Hedge after a fixed delay instead of the p95 latency'
+    )
+    parser.add_argument(
+        '--qps',
+        type=float,
+        default=None,
+        help='Maximum DNS queries per second, across all nameservers'
+    )
+    parser.add_argument(
+        '--qps-per-server',
+        type=float,
+        default=None,
+        help='Maximum DNS queries per second to each nameserver'
+    )
+    parser.add_argument(
+        '--max-in-flight',
+        type=int,
+        default=None,
+        metavar='N',
+        help='Maximum DNS requests awaiting a response at any time'
+    )
+    parser.add_argument(
+        '--cache-dir',
+        default=os.environ.get('URL_ANALYZER_CACHE_DIR'),
+        metavar='DIR',
+        help='Keep DNS answers in a persistent cache under DIR across runs '
+             '(default: $URL_ANALYZER_CACHE_DIR)'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Disable all DNS caching'
+    )
+
+def check_dns_arguments(args: argparse.Namespace,
+                        parser: argparse.ArgumentParser) -> None:
+    """Validate the DNS analysis options, splitting --records into a list."""
+    if args.max_in_flight is not None and args.max_in_flight < 1:
+        parser.error('--max-in-flight must be at least 1')
+    if args.retries is not None and args.retries < 0:
+        parser.error('--retries must not be negative')
+    if args.dns_port is not None and not 0 < args.dns_port < 65536:
+        parser.error('--dns-port must be between 1 and 65535')
+    if args.records is not None:
+        args.records = [record_type.strip().upper()
+                        for record_type in args.records.split(',')
+                        if record_type.strip()]
+        if not args.records:
+            parser.error('--records needs at least one record type')
+    for option in ('qps', 'qps_per_server'):
+        value = getattr(args, option)
+        if value is not None and value <= 0:
+            parser.error(f"--{option.replace('_', '-')} must be positive")
 
 def main():
+    if sys.argv[1:2] == ['serve']:
+        from url_analyzer.cli.serve import main as serve
+        serve(sys.argv[2:])
+        return
     parser = argparse.ArgumentParser(
-        description='Analyze URLs - Get URL components and DNS information'
+        description='Analyze URLs - Get URL components and DNS information',
+        epilog="Run 'url-analyzer serve --help' to serve analyses over a "
+               "local JSON API"
+    )
+    parser.add_argument('url', nargs='?', help='URL to analyze')
+    parser.add_argument(
+        '--input', '-i',
+        metavar='FILE',
+        help="Analyze URLs read from FILE, one per line ('-' for stdin), "
+             "writing one JSON object per line"
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Workers for --input batch mode (default: 8 threads, or one '
+             'process per CPU with --executor process)'
+    )
+    parser.add_argument(
+        '--executor',
+        choices=['thread', 'process'],
+        default='thread',
+        help='Run batch workers as threads or as processes using all cores '
+             '(default: thread)'
+    )
+    parser.add_argument(
+        '--threads-per-worker',
+        type=int,
+        default=4,
+        help='DNS threads in each worker process (default: 4)'
+    )
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        default=256,
+        help='URLs sent to a worker process at a time (default: 256)'
+    )
+    parser.add_argument(
+        '--order',
+        choices=['completion', 'input'],
+        default='completion',
+        help='Write batch results as they complete or in input order '
+             '(default: completion)'
+    )
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='With --input, only analyze URLs that are new or whose DNS '
+             'records have outlived their TTL since the last run, writing '
+             'the records that changed; results are kept under --cache-dir'
     )
-    parser.add_argument('url', help='URL to analyze')
     parser.add_argument(
         '--mode',
         choices=['url', 'dns', 'full'],
@@ -104,33 +430,78 @@ def main():
     )
     parser.add_argument(
         '--format',
-        choices=['json', 'text'],
-        default='text',
-        help='Output format (default: text)'
+        choices=['text', 'json', 'ndjson', 'csv'],
+        default=None,
+        help='Output format: text, indented json, compact ndjson (JSON '
+             'lines) or csv (default: text, or ndjson with --input)'
+    )
+    parser.add_argument(
+        '--output', '-o',
+        metavar='FILE',
+        help='Write results to FILE instead of stdout'
+    )
+    add_dns_arguments(parser)
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Print the count and p50/p95/p99 latency of each analysis stage '
+             'to stderr (with --executor process, only output is timed)'
+    )
+    parser.add_argument(
+        '--profile-output',
+        metavar='FILE',
+        help='Also write the profile to FILE, as JSON if it ends in .json, '
+             'else in the Prometheus text format'
     )
 
     args = parser.parse_args()
+    if (args.url is None) == (args.input is None):
+        parser.error('provide either a URL or --input')
+    for option in ('workers', 'threads_per_worker', 'chunk_size'):
+        value = getattr(args, option)
+        if value is not None and value < 1:
+            parser.error(f"--{option.replace('_', '-')} must be at least 1")
+    check_dns_arguments(args, parser)
+    if args.mode == 'full':
+        from url_analyzer.core.registry import ANALYZERS_ENV, get_default_registry
+        try:
+            analyzers = [spec.name for spec in get_default_registry().plan()]
+        except ValueError as e:
+            parser.error(f"${ANALYZERS_ENV}: {str(e)}")
+        if args.incremental and "dns_analysis" not in analyzers:
+            parser.error(f"--incremental needs the dns_analysis analyzer, "
+                         f"which ${ANALYZERS_ENV} leaves out")
+    if args.incremental:
+        if args.input is None or args.mode == 'url':
+            parser.error('--incremental needs --input and --mode dns or full')
+        if not args.cache_dir:
+            parser.error('--incremental needs --cache-dir or $URL_ANALYZER_CACHE_DIR')
+        if args.format in ('csv', 'text'):
+            parser.error('--incremental writes JSON lines')
+    # URL analysis ignores the DNS options
+    dns_options = {} if args.mode == 'url' else get_dns_options(args, parser)
+    instrumentation = None
+    if args.profile or args.profile_output:
+        instrumentation = dns_options["instrumentation"] = Instrumentation()
 
+    out = sys.stdout
+    if args.output is not None:
+        try:
+            out = open_output(args.output)
+        except OSError as e:
+            print(f"Error: Cannot open output file: {str(e)}")
+            exit(1)
     try:
-        if args.mode == 'url':
-            analyzer = URLAnalyzer(args.url)
-            results = analyzer.analyze()
-            print(format_url_output(results, args.format == 'text'))
-            
-        elif args.mode == 'dns':
-            domain = urlparse(args.url).netloc
-            analyzer = DNSAnalyzer(domain)
-            results = analyzer.analyze()
-            print(format_dns_output(results, args.format == 'text'))
-            
-        else:  # full analysis
-            analyzer = MainAnalyzer(args.url)
-            results = analyzer.analyze()
-            print(format_full_output(results, args.format == 'text'))
-            
-    except (URLAnalyzerError, DNSAnalyzerError) as e:
-        print(f"Error: {str(e)}")
-        exit(1)
+        run(args, dns_options, out)
+        if instrumentation is not None:
+            report_profile(instrumentation, args.profile_output)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if args.cache_dir and dns_options.get("cache") is not None:
+            dns_options["cache"].close()
+        if dns_options.get("pool") is not None:
+            dns_options["pool"].close()
 
 if __name__ == '__main__':
     main()
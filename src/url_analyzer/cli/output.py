@@ -0,0 +1,204 @@
+"""Streaming writers for analysis results.
+
+Results are formatted one at a time and written straight to a (buffered)
+stream, so batch output never accumulates in memory. Formats:
+
+- ndjson: one compact JSON object per line, encoded with orjson when it
+  is installed
+- csv: one row per result, with fixed columns per analysis mode
+- text: the human-readable report
+
+Formatting is separate from writing so worker processes can format
+results and the parent only writes strings; see get_formatter().
+"""
+import csv
+import io
+import json
+from functools import partial
+from typing import Any, Callable, Dict, Iterator, List, TextIO
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+from url_analyzer.analyzers.records import RECORD_KEYS
+
+FORMATS = ('ndjson', 'csv', 'text')
+
+URL_COLUMNS = ('url', 'normalized_url', 'domain', 'scheme', 'netloc', 'path',
+               'params', 'query', 'fragment')
+# CSV columns of each analysis mode
+CSV_COLUMNS = {
+    'url': URL_COLUMNS + ('error',),
+    'dns': ('url', 'domain') + RECORD_KEYS + ('error',),
+    'full': URL_COLUMNS + RECORD_KEYS + ('error',),
+}
+
+
+def dumps(obj: Any) -> str:
+    """Encode an object as compact single-line JSON."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False)
+
+
+def url_text_lines(results: Dict[str, Any]) -> Iterator[str]:
+    """Yield the text report lines of a URL analysis."""
+    yield "\nURL Analysis:"
+    yield "-" * 50
+    for key, value in results["components"].items():
+        yield f"{key.replace('_', ' ').title()}: {value}"
+
+
+def dns_text_lines(results: Dict[str, Any]) -> Iterator[str]:
+    """Yield the text report lines of a DNS analysis.
+
+    Only record types present and non-empty are shown.
+    """
+    yield "\nDNS Records:"
+    yield "-" * 50
+    records = results["records"]
+    for key in RECORD_KEYS:
+        values = records.get(key)
+        if not values:
+            continue
+        if key == "soa_record":
+            yield "\nSOA Record:"
+            for name, value in values.items():
+                yield f"  {name}: {value}"
+        elif key == "mx_records":
+            yield "\nMX Records:"
+            for record in values:
+                yield f"  Priority: {record['preference']}"
+                yield f"  Exchange: {record['exchange']}"
+        else:
+            yield f"\n{key.split('_')[0].upper()} Records:"
+            for record in values:
+                yield f"  {record}"
+
+
+def full_text_lines(results: Dict[str, Any]) -> Iterator[str]:
+    """Yield the text report lines of a complete analysis.
+
+    Only the analyses present are shown; those of analyzers other than
+    URL and DNS analysis are listed field by field.
+    """
+    yield "\nBasic Information:"
+    yield "-" * 50
+    for key, value in results["info"].items():
+        yield f"{key.replace('_', ' ').title()}: {value}"
+    for name, analysis in results.items():
+        if name == "url_analysis":
+            yield from url_text_lines(analysis)
+        elif name == "dns_analysis":
+            yield from dns_text_lines(analysis)
+        elif name not in ("info", "url") and isinstance(analysis, dict):
+            yield f"\n{name.replace('_', ' ').title()}:"
+            yield "-" * 50
+            for key, value in analysis.items():
+                yield f"{key.replace('_', ' ').title()}: {value}"
+
+
+TEXT_LINES = {'url': url_text_lines, 'dns': dns_text_lines, 'full': full_text_lines}
+
+
+def format_text(result: Dict[str, Any], mode: str) -> str:
+    """Format one result as its text report."""
+    if "error" in result:
+        return f"\nError analyzing {result['url']}: {result['error']}\n"
+    lines = TEXT_LINES[mode](result)
+    if mode == 'dns' and "url" in result:
+        # Batch results carry the URL the records were looked up for
+        return f"\nURL: {result['url']}\n" + "\n".join(lines) + "\n"
+    return "\n".join(lines) + "\n"
+
+
+def format_ndjson(result: Dict[str, Any], mode: str) -> str:
+    """Format one result as a line of JSON."""
+    return dumps(result) + "\n"
+
+
+def _cell(value: Any) -> Any:
+    """Flatten a record list or SOA record into one CSV cell."""
+    if isinstance(value, dict):
+        if "exchange" in value:
+            return f"{value['preference']} {value['exchange']}"
+        return " ".join(str(field) for field in value.values())
+    if isinstance(value, list):
+        return ";".join(str(_cell(item)) for item in value)
+    return value
+
+
+def csv_row(result: Dict[str, Any], mode: str) -> List[Any]:
+    """Get the CSV cells of one result, in CSV_COLUMNS order."""
+    if "error" in result:
+        values = {"url": result["url"], "error": result["error"]}
+    else:
+        # Complete analyses may leave out either analysis
+        url_analysis = result.get("url_analysis", {}) if mode == 'full' else result
+        dns_analysis = result.get("dns_analysis", {}) if mode == 'full' else result
+        values = dict(url_analysis.get("components", {}))
+        values.update(dns_analysis.get("records", {}))
+        info = result.get("info", {})
+        values["url"] = result.get("url", info.get("url"))
+        values["normalized_url"] = result.get("normalized_url",
+                                              info.get("normalized_url"))
+        values["domain"] = (result.get("domain") if mode == 'url'
+                            else info.get("domain"))
+    return [_cell(values.get(column)) for column in CSV_COLUMNS[mode]]
+
+
+def format_csv(result: Dict[str, Any], mode: str) -> str:
+    """Format one result as a CSV line."""
+    line = io.StringIO()
+    csv.writer(line, lineterminator="\n").writerow(csv_row(result, mode))
+    return line.getvalue()
+
+
+FORMATTERS = {'ndjson': format_ndjson, 'csv': format_csv, 'text': format_text}
+
+
+def get_formatter(output_format: str, mode: str) -> Callable[[Dict[str, Any]], str]:
+    """Get a picklable function formatting results of a mode as text."""
+    return partial(FORMATTERS[output_format], mode=mode)
+
+
+class ResultWriter:
+    """Write results to a stream as they arrive."""
+
+    def __init__(self, stream: TextIO, output_format: str = 'ndjson',
+                 mode: str = 'url'):
+        """Initialize the writer, writing the CSV header if any.
+
+        Args:
+            stream: Text stream to write to
+            output_format: One of FORMATS
+            mode: Analysis mode of the results, one of 'url', 'dns', 'full'
+        """
+        if output_format not in FORMATS:
+            raise ValueError(f"Unknown format: {output_format}")
+        self.stream = stream
+        self.output_format = output_format
+        self.mode = mode
+        self.formatter = get_formatter(output_format, mode)
+        self.count = 0
+        if output_format == 'csv':
+            csv.writer(stream, lineterminator="\n").writerow(CSV_COLUMNS[mode])
+
+    def write(self, result: Dict[str, Any]) -> None:
+        """Format and write one result."""
+        self.stream.write(self.formatter(result))
+        self.count += 1
+
+    def write_formatted(self, text: str) -> None:
+        """Write one result already formatted by self.formatter."""
+        self.stream.write(text)
+        self.count += 1
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+
+def open_output(path: str, buffer_size: int = 1 << 16) -> TextIO:
+    """Open a file for writing results, with a large buffer."""
+    return open(path, 'w', encoding='utf-8', newline='', buffering=buffer_size)
@@ -0,0 +1,363 @@
+"""Long-running JSON API over the analyzers.
+
+`url-analyzer serve` keeps one resolver (or resolver pool), DNS cache,
+rate limiter and retry policy alive across requests, so callers pay for
+neither process startup nor a cold cache. Requests are handled on a
+thread each, over TCP or a Unix socket.
+
+Endpoints:
+
+- POST /analyze {"url": ..., "mode": ..., "records": [...]}: analyze one
+  URL, answering with the result in the layout of --format json; "mode"
+  defaults to the server's --mode and "records" to its --records.
+  GET /analyze?url=...&mode=...&records=A,MX works too.
+- POST /batch {"urls": [...], "mode": ..., "records": [...]}: analyze many
+  URLs, answering {"results": [...]} in input order; URLs that fail carry
+  an "error" message, like batch output of the CLI.
+- GET /health: {"status": "ok"} with request and DNS cache counts.
+- GET /metrics: per-stage latencies in the Prometheus text format, when
+  started with --profile.
+
+Errors are answered as {"error": message}: 400 for bad requests and URLs,
+502 when every DNS query of an analysis failed (timeouts or server
+failures, not negative answers), 404 and 405 for unknown paths and methods.
+"""
+import argparse
+import json
+import os
+import socketserver
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+from url_analyzer.analyzers.dns_analyzer import DNSAnalyzer
+from url_analyzer.analyzers.dns_cache import get_default_cache
+from url_analyzer.core.batch import MODES, BatchAnalyzer
+from url_analyzer.core.main_analyzer import MainAnalyzer
+from url_analyzer.core.url_analyzer import URLAnalyzer
+from url_analyzer.utils.exceptions import URLAnalyzerError
+from url_analyzer.utils.instrumentation import Instrumentation, timer
+
+DEFAULT_PORT = 8080
+# Largest request body accepted, in bytes
+MAX_BODY = 1 << 20
+
+
+class RequestError(Exception):
+    """Request the server cannot answer, with its HTTP status."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class AnalysisService:
+    """Analyze URLs with DNS state shared by all requests."""
+
+    def __init__(self, dns_options: Optional[Dict[str, Any]] = None,
+                 mode: str = 'url', record_types: Optional[List[str]] = None,
+                 workers: int = 8, max_batch: int = 1000):
+        """Initialize the service.
+
+        Args:
+            dns_options: Keyword arguments passed through to DNSAnalyzer;
+                a shared resolver and the process-wide DNS cache are added
+                unless given (or the cache is set to None)
+            mode: Analysis mode of requests not naming one
+            record_types: DNS record types of requests not naming any
+                (default: all types)
+            workers: Threads analyzing the URLs of each batch request
+            max_batch: Most URLs accepted in one batch request
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode: {mode}")
+        dns_options = dict(dns_options or {})
+        dns_options.setdefault("cache", get_default_cache())
+        if "pool" not in dns_options and "transport" not in dns_options:
+            # Read the system configuration once, not per request
+            dns_options.setdefault("resolver", DNSAnalyzer.create_resolver(
+                dns_options.get("nameservers"), dns_options.get("timeout"),
+                dns_options.get("lifetime"), dns_options.get("port")
+            ))
+        self.dns_options = dns_options
+        self.mode = mode
+        self.record_types = record_types
+        self.workers = workers
+        self.max_batch = max_batch
+        self.instrumentation: Optional[Instrumentation] = \
+            dns_options.get("instrumentation")
+        self._requests = 0
+        self._lock = threading.Lock()
+
+    def _count_request(self) -> None:
+        with self._lock:
+            self._requests += 1
+
+    def _options(self, params: Dict[str, Any]) -> Tuple[str, Optional[List[str]]]:
+        """Get the mode and record types of a request."""
+        mode = params.get("mode") or self.mode
+        if mode not in MODES:
+            raise RequestError(400, f"Unknown mode: {mode}")
+        records = params.get("records", self.record_types)
+        if isinstance(records, str):
+            records = records.split(',')
+        if records is not None:
+            if not isinstance(records, list):
+                raise RequestError(400, "records must be a list of record types")
+            records = [str(record_type).strip().upper() for record_type in records
+                       if str(record_type).strip()]
+            if not records:
+                raise RequestError(400, "records needs at least one record type")
+            try:
+                DNSAnalyzer.select_records(records)
+            except ValueError as e:
+                raise RequestError(400, str(e))
+        return mode, records
+
+    def analyze(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Analyze the URL of a request.
+
+        Raises:
+            RequestError: If the request or its URL is invalid, or every
+                DNS query failed
+        """
+        self._count_request()
+        url = params.get("url")
+        if not isinstance(url, str) or not url:
+            raise RequestError(400, "url is required")
+        mode, records = self._options(params)
+        try:
+            with timer(self.instrumentation, "url.parse"):
+                url_analyzer = URLAnalyzer(url)
+            if mode == 'url':
+                return url_analyzer.analyze()
+            if mode == 'dns':
+                result = DNSAnalyzer(url_analyzer.get_host(),
+                                     **self.dns_options).analyze(records)
+                dns_analysis = result
+            else:
+                result = MainAnalyzer(url, **self.dns_options).analyze(records)
+                dns_analysis = result.get("dns_analysis")
+        except URLAnalyzerError as e:
+            raise RequestError(400, str(e))
+        if dns_analysis is not None:
+            errors = dns_analysis["info"]["errors"]
+            if errors and len(errors) == len(dns_analysis["records"]):
+                raise RequestError(502, "; ".join(errors.values()))
+        return result
+
+    def analyze_batch(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Analyze the URLs of a batch request, in input order.
+
+        Raises:
+            RequestError: If the request is invalid
+        """
+        self._count_request()
+        urls = params.get("urls")
+        if not isinstance(urls, list) or not all(isinstance(url, str) for url in urls):
+            raise RequestError(400, "urls must be a list of URLs")
+        if len(urls) > self.max_batch:
+            raise RequestError(400, f"At most {self.max_batch} URLs per batch")
+        mode, records = self._options(params)
+        batch = BatchAnalyzer(mode, self.workers, ordered=True,
+                              record_types=records, **self.dns_options)
+        return {"results": list(batch.run(urls))}
+
+    def health(self) -> Dict[str, Any]:
+        """Get the service status, request count and DNS cache counts."""
+        with self._lock:
+            health = {"status": "ok", "requests": self._requests}
+        cache = self.dns_options.get("cache")
+        if cache is not None:
+            health["cache"] = cache.stats()
+        return health
+
+    def close(self) -> None:
+        """Close the persistent DNS cache and the resolver pool, if any."""
+        cache = self.dns_options.get("cache")
+        if cache is not None and hasattr(cache, "close"):
+            cache.close()
+        pool = self.dns_options.get("pool")
+        if pool is not None:
+            pool.close()
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """Route API requests to the server's AnalysisService."""
+
+    # Keep connections open between requests
+    protocol_version = "HTTP/1.1"
+    server_version = "url-analyzer"
+
+    def address_string(self) -> str:
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def _send(self, status: int, body: str,
+              content_type: str = "application/json") -> None:
+        data = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_json(self, status: int, obj: Any) -> None:
+        self._send(status, json.dumps(obj))
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = self.headers.get("Content-Length")
+        if length is None:
+            raise RequestError(411, "Content-Length is required")
+        try:
+            length = int(length)
+        except ValueError:
+            raise RequestError(400, "Invalid Content-Length")
+        if not 0 <= length <= MAX_BODY:
+            raise RequestError(413, f"Request body is over {MAX_BODY} bytes")
+        body = self.rfile.read(length)
+        self._body_read = True
+        try:
+            params = json.loads(body or b"{}")
+        except ValueError:
+            raise RequestError(400, "Request body is not valid JSON")
+        if not isinstance(params, dict):
+            raise RequestError(400, "Request body must be a JSON object")
+        return params
+
+    def _handle(self, method: str) -> None:
+        service: AnalysisService = self.server.service
+        self._body_read = False
+        parts = urlsplit(self.path)
+        try:
+            if parts.path == "/analyze" and method in ("GET", "POST"):
+                if method == "GET":
+                    # A blank records= must fail rather than mean the default
+                    query = parse_qs(parts.query, keep_blank_values=True)
+                    params = {key: values[-1] for key, values in query.items()}
+                else:
+                    params = self._read_json()
+                self._send_json(200, service.analyze(params))
+            elif parts.path == "/batch" and method == "POST":
+                self._send_json(200, service.analyze_batch(self._read_json()))
+            elif parts.path == "/health" and method == "GET":
+                self._send_json(200, service.health())
+            elif parts.path == "/metrics" and method == "GET":
+                if service.instrumentation is None:
+                    raise RequestError(404, "Profiling is off, start the "
+                                            "server with --profile")
+                self._send(200, service.instrumentation.to_prometheus(),
+                           "text/plain; version=0.0.4")
+            elif parts.path in ("/analyze", "/batch", "/health", "/metrics"):
+                raise RequestError(405, f"Cannot {method} {parts.path}")
+            else:
+                raise RequestError(404, f"Not found: {parts.path}")
+        except RequestError as e:
+            if method == "POST" and not self._body_read:
+                # The unread body would be taken for the next request
+                self.close_connection = True
+            self._send_json(e.status, {"error": str(e)})
+
+    def do_GET(self) -> None:
+        self._handle("GET")
+
+    def do_POST(self) -> None:
+        self._handle("POST")
+
+
+class _UnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(service: AnalysisService, host: str = "127.0.0.1",
+                port: int = DEFAULT_PORT, unix_socket: Optional[str] = None,
+                quiet: bool = False) -> socketserver.BaseServer:
+    """Create (but do not start) a server for a service.
+
+    Args:
+        service: Service answering the requests
+        host: Address to listen on
+        port: TCP port to listen on (0 for a free one)
+        unix_socket: Path of a Unix socket to listen on instead of TCP
+        quiet: Do not log requests to stderr
+    """
+    if unix_socket is not None:
+        if os.path.exists(unix_socket):
+            # Left behind by a previous server
+            os.unlink(unix_socket)
+        server = _UnixHTTPServer(unix_socket, RequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), RequestHandler)
+    server.service = service
+    server.quiet = quiet
+    return server
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from url_analyzer.cli.main import (
+        add_dns_arguments, check_dns_arguments, get_dns_options
+    )
+
+    parser = argparse.ArgumentParser(
+        prog='url-analyzer serve',
+        description='Serve URL and DNS analyses over a local JSON API'
+    )
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='Address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                        help=f'TCP port to listen on (default: {DEFAULT_PORT})')
+    parser.add_argument('--unix-socket', metavar='PATH',
+                        help='Listen on a Unix socket at PATH instead of TCP')
+    parser.add_argument('--mode', choices=list(MODES), default='url',
+                        help='Analysis mode of requests not naming one '
+                             '(default: url)')
+    parser.add_argument('--workers', type=int, default=8,
+                        help='Threads analyzing each batch request (default: 8)')
+    parser.add_argument('--max-batch', type=int, default=1000,
+                        help='Most URLs accepted in one batch request '
+                             '(default: 1000)')
+    parser.add_argument('--quiet', '-q', action='store_true',
+                        help='Do not log requests')
+    add_dns_arguments(parser)
+    parser.add_argument('--profile', action='store_true',
+                        help='Time analysis stages, exposed at GET /metrics')
+
+    args = parser.parse_args(argv)
+    for option in ('workers', 'max_batch'):
+        if getattr(args, option) < 1:
+            parser.error(f"--{option.replace('_', '-')} must be at least 1")
+    if not 0 <= args.port < 65536:
+        parser.error('--port must be between 0 and 65535')
+    check_dns_arguments(args, parser)
+    dns_options = get_dns_options(args, parser)
+    if args.profile:
+        dns_options["instrumentation"] = Instrumentation()
+
+    service = AnalysisService(dns_options, args.mode, args.records,
+                              args.workers, args.max_batch)
+    try:
+        server = make_server(service, args.host, args.port, args.unix_socket,
+                             args.quiet)
+    except OSError as e:
+        service.close()
+        print(f"Error: Cannot listen: {str(e)}")
+        exit(1)
+    if args.unix_socket is not None:
+        print(f"Serving on {args.unix_socket}", file=sys.stderr)
+    else:
+        host, port = server.server_address[:2]
+        print(f"Serving on http://{host}:{port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.unix_socket is not None and os.path.exists(args.unix_socket):
+            os.unlink(args.unix_socket)
+        service.close()
@@ -0,0 +1,398 @@
+import os
+from collections import OrderedDict, deque
+from concurrent.futures import (
+    Future, ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+)
+from itertools import islice
+from typing import (
+    Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+)
+from url_analyzer.core.url_analyzer import URLAnalyzer
+from url_analyzer.utils.exceptions import URLAnalyzerError
+from url_analyzer.utils.instrumentation import timer
+
+MODES = ('url', 'dns', 'full')
+
+
+def _dns_analyzer():
+    """Import DNSAnalyzer on first use, so URL-only batches skip dnspython."""
+    from url_analyzer.analyzers.dns_analyzer import DNSAnalyzer
+    return DNSAnalyzer
+
+
+def _full_analyzers() -> Tuple[List[str], bool]:
+    """Get the analyzers a complete analysis runs by default, and whether
+    they are exactly URL and DNS analysis.
+
+    Raises:
+        ValueError: If $URL_ANALYZER_ANALYZERS names an unknown analyzer
+    """
+    from url_analyzer.core.registry import CORE_ANALYZERS, get_default_registry
+    names = [spec.name for spec in get_default_registry().plan()]
+    return names, sorted(names) == sorted(CORE_ANALYZERS)
+
+
+def read_urls(stream: TextIO) -> Iterator[str]:
+    """Yield URLs from a text stream, one per line.
+
+    Blank lines and lines starting with '#' are skipped.
+    """
+    for line in stream:
+        url = line.strip()
+        if url and not url.startswith('#'):
+            yield url
+
+
+def combine_results(url_analyzer: URLAnalyzer, mode: str,
+                    dns_analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the result for one URL from a (possibly shared) DNS analysis."""
+    if mode == 'dns':
+        return {"url": url_analyzer.url, **dns_analysis}
+    from url_analyzer.core.main_analyzer import MainAnalyzer
+    return {"url": url_analyzer.url,
+            **MainAnalyzer.combine(url_analyzer, dns_analysis)}
+
+
+def analyze_url(url: str, mode: str = 'url',
+                record_types: Optional[List[str]] = None,
+                **dns_options: Any) -> Dict[str, Any]:
+    """Analyze a single URL in the given mode.
+
+    Errors are reported in the result instead of raised, so one bad URL
+    does not abort a batch. Complete analyses run the analyzers
+    MainAnalyzer runs by default.
+
+    Args:
+        url: URL to analyze
+        mode: One of 'url', 'dns' or 'full'
+        record_types: DNS record types to query (default: all types)
+        **dns_options: Keyword arguments passed through to DNSAnalyzer
+
+    Returns:
+        Dict with the analyzed URL under "url" and either the analysis
+        results or an "error" message
+    """
+    if mode == 'full':
+        from url_analyzer.core.main_analyzer import MainAnalyzer
+        try:
+            analyzer = MainAnalyzer(url, **dns_options)
+        except URLAnalyzerError as e:
+            return {"url": url, "error": str(e)}
+        return {"url": url, **analyzer.analyze(record_types)}
+    try:
+        with timer(dns_options.get("instrumentation"), "url.parse"):
+            url_analyzer = URLAnalyzer(url)
+    except URLAnalyzerError as e:
+        return {"url": url, "error": str(e)}
+    if mode == 'url':
+        return url_analyzer.analyze()
+    dns_analysis = _dns_analyzer()(url_analyzer.get_host(),
+                                   **dns_options).analyze(record_types)
+    return combine_results(url_analyzer, mode, dns_analysis)
+
+
+class BatchAnalyzer:
+    """Analyze a stream of URLs with a bounded pool of worker threads.
+
+    At most a fixed number of URLs are in flight at any time, so memory
+    stays flat regardless of the input size. Results are yielded in
+    completion order, or in input order when "ordered" is set; results
+    held back waiting for an earlier URL count towards the in-flight
+    limit.
+
+    In 'dns' and 'full' modes DNS analysis is planned per host rather than
+    per URL: URLs are grouped by normalized host (see
+    URLAnalyzer.get_host), each host in flight is analyzed once, and the
+    result is fanned back to every URL on it. Results for recently
+    analyzed hosts are kept to serve later URLs too. The "stats" attribute
+    counts the DNS lookups performed and saved.
+
+    Complete analyses report the analyzers MainAnalyzer runs by default
+    (see core.registry). When these are not exactly URL and DNS analysis,
+    each URL is analyzed on its own by a MainAnalyzer instead.
+    """
+
+    def __init__(self, mode: str = 'url', workers: int = 8,
+                 host_memo_size: int = 10000, ordered: bool = False,
+                 record_types: Optional[List[str]] = None,
+                 **dns_options: Any):
+        """Initialize the batch analyzer.
+
+        Args:
+            mode: One of 'url', 'dns' or 'full'
+            workers: Number of worker threads
+            host_memo_size: Number of recent per-host DNS results reused
+                for later URLs on the same host
+            ordered: Yield results in input order instead of completion order
+            record_types: DNS record types to query (default: all types)
+            **dns_options: Keyword arguments passed through to DNSAnalyzer
+
+        Raises:
+            ValueError: If an option, or an analyzer of a complete
+                analysis, is unknown
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode: {mode}")
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        # Reject unsupported record types before any URL is read
+        if record_types is not None:
+            _dns_analyzer().select_records(record_types)
+        # DNS results are shared per host unless other analyzers need the URL
+        analyzers, self.per_host = [], mode == 'dns'
+        if mode == 'full':
+            analyzers, self.per_host = _full_analyzers()
+        # Complete analyses run one by one still look up DNS per URL
+        self._dns_per_url = not self.per_host and "dns_analysis" in analyzers
+        self.mode = mode
+        self.workers = workers
+        self.host_memo_size = host_memo_size
+        self.ordered = ordered
+        self.record_types = record_types
+        self.dns_options = dns_options
+        self.stats = {"urls": 0, "dns_lookups": 0, "dns_lookups_saved": 0}
+        # Results completed ahead of an earlier URL, by input position
+        self._held: Dict[int, Dict[str, Any]] = {}
+
+    def run(self, urls: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """Analyze URLs, yielding each result as soon as it can be."""
+        self._held = {}
+        if self.per_host:
+            results = self._run_per_host(enumerate(urls))
+        else:
+            results = self._run_per_url(enumerate(urls))
+        if self.ordered:
+            return self._reorder(results)
+        return (result for _, result in results)
+
+    def _reorder(self, results: Iterator[Tuple[int, Dict[str, Any]]]
+                 ) -> Iterator[Dict[str, Any]]:
+        held = self._held
+        next_index = 0
+        for index, result in results:
+            if index != next_index:
+                held[index] = result
+                continue
+            yield result
+            next_index += 1
+            while next_index in held:
+                yield held.pop(next_index)
+                next_index += 1
+
+    def _run_per_url(self, urls: Iterable[Tuple[int, str]]
+                     ) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        max_pending = self.workers * 2
+        pending: Dict[Future, int] = {}
+
+        def collect() -> Iterator[Tuple[int, Dict[str, Any]]]:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for index, url in urls:
+                self.stats["urls"] += 1
+                if self._dns_per_url:
+                    self.stats["dns_lookups"] += 1
+                while pending and len(pending) + len(self._held) >= max_pending:
+                    yield from collect()
+                future = executor.submit(
+                    analyze_url, url, self.mode, self.record_types,
+                    **self.dns_options
+                )
+                pending[future] = index
+
+            while pending:
+                yield from collect()
+
+    def _analyze_host(self, host: str) -> Dict[str, Any]:
+        return _dns_analyzer()(host, **self.dns_options).analyze(self.record_types)
+
+    def _run_per_host(self, urls: Iterable[Tuple[int, str]]
+                      ) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        max_pending_hosts = self.workers * 2
+        # Bounds memory when many URLs queue up behind one slow host
+        max_pending_urls = max_pending_hosts * 64
+        pending: Dict[str, Tuple[Future, List[Tuple[int, URLAnalyzer]]]] = {}
+        pending_urls = 0
+        memo: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+        def collect() -> Iterator[Tuple[int, Dict[str, Any]]]:
+            nonlocal pending_urls
+            done, _ = wait([future for future, _ in pending.values()],
+                           return_when=FIRST_COMPLETED)
+            for host in [host for host, (future, _) in pending.items()
+                         if future in done]:
+                future, url_analyzers = pending.pop(host)
+                pending_urls -= len(url_analyzers)
+                dns_analysis = future.result()
+                if self.host_memo_size > 0:
+                    memo[host] = dns_analysis
+                    if len(memo) > self.host_memo_size:
+                        memo.popitem(last=False)
+                for index, url_analyzer in url_analyzers:
+                    yield index, combine_results(url_analyzer, self.mode,
+                                                 dns_analysis)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for index, url in urls:
+                self.stats["urls"] += 1
+                try:
+                    with timer(self.dns_options.get("instrumentation"),
+                               "url.parse"):
+                        url_analyzer = URLAnalyzer(url)
+                except URLAnalyzerError as e:
+                    yield index, {"url": url, "error": str(e)}
+                    continue
+
+                while pending and (
+                        len(pending) >= max_pending_hosts
+                        or pending_urls + len(self._held) >= max_pending_urls):
+                    yield from collect()
+
+                host = url_analyzer.get_host()
+                if host in memo:
+                    memo.move_to_end(host)
+                    self.stats["dns_lookups_saved"] += 1
+                    yield index, combine_results(url_analyzer, self.mode,
+                                                 memo[host])
+                elif host in pending:
+                    self.stats["dns_lookups_saved"] += 1
+                    pending[host][1].append((index, url_analyzer))
+                    pending_urls += 1
+                else:
+                    self.stats["dns_lookups"] += 1
+                    pending[host] = (executor.submit(self._analyze_host, host),
+                                     [(index, url_analyzer)])
+                    pending_urls += 1
+
+            while pending:
+                yield from collect()
+
+
+# Batch analyzer of the current worker process, set up by _init_worker
+_worker_batch: Optional[BatchAnalyzer] = None
+_worker_serializer: Optional[Callable[[Dict[str, Any]], Any]] = None
+
+
+def _init_worker(mode: str, threads: int,
+                 serializer: Optional[Callable[[Dict[str, Any]], Any]],
+                 record_types: Optional[List[str]],
+                 dns_options: Dict[str, Any]) -> None:
+    global _worker_batch, _worker_serializer
+    _worker_batch = BatchAnalyzer(mode, threads, ordered=True,
+                                  record_types=record_types, **dns_options)
+    _worker_serializer = serializer
+
+
+def _run_chunk(urls: List[str]) -> Tuple[List[Any], Dict[str, int]]:
+    """Analyze one chunk in a worker process, in input order."""
+    batch = _worker_batch
+    before = dict(batch.stats)
+    results = list(batch.run(urls))
+    if _worker_serializer is not None:
+        results = [_worker_serializer(result) for result in results]
+    stats = {key: value - before[key] for key, value in batch.stats.items()}
+    return results, stats
+
+
+def chunked(iterable: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Split an iterable into lists of at most size items."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class ProcessBatchAnalyzer:
+    """Analyze a stream of URLs across a pool of worker processes.
+
+    URL parsing, normalization and result serialization are pure Python
+    and serialize on the GIL; sharding the input across processes lets a
+    batch use every core. URLs are submitted in chunks to amortise
+    pickling, each worker process analyzes its chunks with a
+    BatchAnalyzer of its own threads, and results are merged in input or
+    completion order. Results can be serialized in the workers, so the
+    parent only writes strings.
+
+    DNS options must be picklable. The process-wide and persistent DNS
+    caches are reopened in each worker rather than copied.
+    """
+
+    def __init__(self, mode: str = 'url', processes: Optional[int] = None,
+                 threads: int = 4, chunk_size: int = 256,
+                 ordered: bool = False,
+                 serializer: Optional[Callable[[Dict[str, Any]], Any]] = None,
+                 record_types: Optional[List[str]] = None,
+                 **dns_options: Any):
+        """Initialize the batch analyzer.
+
+        Args:
+            mode: One of 'url', 'dns' or 'full'
+            processes: Number of worker processes (default: CPU count)
+            threads: Worker threads per process, for DNS I/O
+            chunk_size: Number of URLs sent to a worker at a time
+            ordered: Yield results in input order instead of completion order
+            serializer: Picklable function applied to each result in the
+                worker, e.g. json.dumps
+            record_types: DNS record types to query (default: all types)
+            **dns_options: Keyword arguments passed through to DNSAnalyzer
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode: {mode}")
+        if processes is None:
+            processes = os.cpu_count() or 1
+        if processes < 1 or threads < 1 or chunk_size < 1:
+            raise ValueError("processes, threads and chunk_size must be at least 1")
+        if record_types is not None:
+            _dns_analyzer().select_records(record_types)
+        self.mode = mode
+        self.processes = processes
+        self.threads = threads
+        self.chunk_size = chunk_size
+        self.ordered = ordered
+        self.serializer = serializer
+        self.record_types = record_types
+        self.dns_options = dns_options
+        self.stats = {"urls": 0, "dns_lookups": 0, "dns_lookups_saved": 0}
+
+    def _merge_stats(self, stats: Dict[str, int]) -> None:
+        for key, value in stats.items():
+            self.stats[key] += value
+
+    def run(self, urls: Iterable[str]) -> Iterator[Any]:
+        """Analyze URLs, yielding each (serialized) result."""
+        max_pending = self.processes * 2
+        with ProcessPoolExecutor(
+            max_workers=self.processes,
+            initializer=_init_worker,
+            initargs=(self.mode, self.threads, self.serializer,
+                      self.record_types, self.dns_options)
+        ) as executor:
+            if self.ordered:
+                pending: Deque[Future] = deque()
+                for chunk in chunked(urls, self.chunk_size):
+                    if len(pending) >= max_pending:
+                        yield from self._collect(pending.popleft())
+                    pending.append(executor.submit(_run_chunk, chunk))
+                while pending:
+                    yield from self._collect(pending.popleft())
+            else:
+                waiting = set()
+                for chunk in chunked(urls, self.chunk_size):
+                    if len(waiting) >= max_pending:
+                        done, waiting = wait(waiting, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            yield from self._collect(future)
+                    waiting.add(executor.submit(_run_chunk, chunk))
+                while waiting:
+                    done, waiting = wait(waiting, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield from self._collect(future)
+
+    def _collect(self, future: Future) -> Iterator[Any]:
+        results, stats = future.result()
+        self._merge_stats(stats)
+        return iter(results)
@@ -1,30 +1,173 @@
-from typing import Dict, Any
-from urllib.parse import urlparse
+import asyncio
+from typing import Dict, Any, Iterable, List, Optional
 from url_analyzer.core.base_analyzer_interface import BaseAnalyzer
+from url_analyzer.core.registry import (
+    CORE_ANALYZERS, AnalyzerRegistry, AnalyzerSpec, get_default_registry, run_plan
+)
+from url_analyzer.core.results import FullResult
 from url_analyzer.core.url_analyzer import URLAnalyzer
-from url_analyzer.analyzers.dns_analyzer import DNSAnalyzer
+from url_analyzer.utils.instrumentation import timer
 
 class MainAnalyzer(BaseAnalyzer):
-    """Main analyzer that combines URL and DNS analysis."""
+    """Main analyzer that runs the analyzers of a registry on one URL.
+
+    By default these are URL and DNS analysis plus any installed plugins;
+    see core.registry. Independent analyzers run concurrently. Every way
+    of running an analysis reports the same analyzers, so a selection
+    without DNS analysis has no "dns_analysis" key.
+    """
     
-    def __init__(self, url: str):
+    def __init__(self, url: str, analyzers: Optional[Iterable[str]] = None,
+                 registry: Optional[AnalyzerRegistry] = None,
+                 analyzer_options: Optional[Dict[str, Dict[str, Any]]] = None,
+                 **dns_options: Any):
+        """Initialize the analyzer.
+
+        Args:
+            url: URL to analyze
+            analyzers: Names of the analyzers to run, with the ones they
+                require (default: the registry's default_names())
+            registry: Registry of the analyzers (default: the built-in and
+                installed ones, from registry.get_default_registry())
+            analyzer_options: Options of each analyzer by name, passed to
+                its factory
+            **dns_options: Keyword arguments passed through to DNSAnalyzer
+
+        Raises:
+            URLAnalyzerError: If the URL is invalid
+            ValueError: If an analyzer is unknown
+        """
         self.url = url
-        self.url_analyzer = URLAnalyzer(url)
-        # Extract domain from URL for DNS analysis
-        self.dns_analyzer = DNSAnalyzer(urlparse(url).netloc)
+        self.dns_options = dns_options
+        self.instrumentation = dns_options.get("instrumentation")
+        with timer(self.instrumentation, "url.parse"):
+            self.url_analyzer = URLAnalyzer(url)
+        self.registry = registry or get_default_registry()
+        self.plan: List[AnalyzerSpec] = self.registry.plan(analyzers)
+        options = {"dns_analysis": dns_options, **(analyzer_options or {})}
+        self.analyzers: Dict[str, BaseAnalyzer] = {
+            spec.name: spec.factory(self.url_analyzer, options.get(spec.name, {}))
+            for spec in self.plan
+        }
+        # Kept for callers using the DNS analyzer directly
+        self.dns_analyzer = self.analyzers.get("dns_analysis")
     
-    def get_info(self) -> Dict[str, Any]:
-        """Get basic information from all analyzers."""
+    @staticmethod
+    def _info(url_analyzer: URLAnalyzer) -> Dict[str, Any]:
         return {
-            "url": self.url,
-            "domain": self.url_analyzer.get_domain(),
-            "normalized_url": self.url_analyzer.normalized_url
+            "url": url_analyzer.url,
+            "domain": url_analyzer.get_domain(),
+            "normalized_url": url_analyzer.normalized_url
         }
+
+    def get_info(self) -> Dict[str, Any]:
+        """Get basic information from all analyzers."""
+        return self._info(self.url_analyzer)
     
-    def analyze(self) -> Dict[str, Any]:
-        """Perform complete analysis using all analyzers."""
+    def analyze(self, record_types: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Perform complete analysis using all analyzers.
+
+        Args:
+            record_types: DNS record types to query (default: all types)
+
+        Returns:
+            Dict with the basic information under "info" and each
+            analyzer's result under its name, in plan order
+        """
+        with timer(self.instrumentation, "analyze"):
+            return self._run(record_types)
+
+    def _run(self, record_types: Optional[Iterable[str]] = None,
+             dns_analysis: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Run the plan, taking the DNS results given instead of querying."""
+        if record_types is not None:
+            record_types = list(record_types)
+
+        def run_one(spec: AnalyzerSpec, required: Dict[str, Any]) -> Any:
+            if dns_analysis is not None and spec.name == "dns_analysis":
+                return dns_analysis
+            return spec.run(self.analyzers[spec.name], required, record_types)
+
+        results = run_plan(self.plan, run_one)
+        return {"info": self.get_info(),
+                **{spec.name: results[spec.name] for spec in self.plan}}
+
+    def uses_core_analyzers(self) -> bool:
+        """Whether exactly URL and DNS analysis are run."""
+        return sorted(self.analyzers) == sorted(CORE_ANALYZERS)
+
+    def analyze_result(self, record_types: Optional[Iterable[str]] = None
+                       ) -> FullResult:
+        """Like analyze(), into a compact result object.
+
+        Raises:
+            ValueError: If the analyzers are not exactly URL and DNS
+                analysis, the results a FullResult holds
+        """
+        if not self.uses_core_analyzers():
+            raise ValueError(
+                "analyze_result() needs exactly the url_analysis and "
+                f"dns_analysis analyzers, not: {', '.join(self.analyzers)}; "
+                "use analyze()"
+            )
+        with timer(self.instrumentation, "analyze"):
+            return FullResult(self.url_analyzer.analyze_result(),
+                              self.dns_analyzer.analyze_result(record_types))
+
+    @classmethod
+    def combine(cls, url_analyzer: URLAnalyzer,
+                dns_analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """Build a complete analysis from a URL analyzer and DNS results.
+
+        Lets batch callers that share one DNS analysis between URLs on the
+        same host produce the same layout as analyze() with exactly URL
+        and DNS analysis; see uses_core_analyzers().
+        """
         return {
-            "info": self.get_info(),
-            "url_analysis": self.url_analyzer.analyze(),
-            "dns_analysis": self.dns_analyzer.analyze()
+            "info": cls._info(url_analyzer),
+            "url_analysis": url_analyzer.analyze(),
+            "dns_analysis": dns_analysis
         }
+
+    async def analyze_async(self, resolver: Optional[Any] = None,
+                            record_types: Optional[Iterable[str]] = None
+                            ) -> Dict[str, Any]:
+        """Perform complete analysis with DNS queries run on the event loop.
+
+        Args:
+            resolver: dns.asyncresolver.Resolver to share between analyses
+            record_types: DNS record types to query (default: all types)
+
+        Returns:
+            Dict with the same layout as analyze(); other analyzers that
+            wait on I/O run on the loop's default executor
+        """
+        dns_analysis = None
+        if "dns_analysis" in self.analyzers:
+            dns_analysis = await self._analyze_dns_async(resolver, record_types)
+        if any(spec.blocking and spec.name != "dns_analysis" for spec in self.plan):
+            return await asyncio.get_running_loop().run_in_executor(
+                None, self._run, record_types, dns_analysis)
+        return self._run(record_types, dns_analysis)
+
+    async def _analyze_dns_async(self, resolver: Optional[Any],
+                                 record_types: Optional[Iterable[str]]
+                                 ) -> Dict[str, Any]:
+        from url_analyzer.analyzers.async_dns_analyzer import AsyncDNSAnalyzer
+
+        if resolver is None:
+            resolver = AsyncDNSAnalyzer.create_resolver(
+                self.dns_options.get("nameservers"),
+                self.dns_options.get("timeout"),
+                self.dns_options.get("lifetime"),
+                self.dns_options.get("port")
+            )
+        dns_analyzer = AsyncDNSAnalyzer(
+            self.url_analyzer.get_host(),
+            deadline=self.dns_options.get("deadline"),
+            resolver=resolver,
+            cache=self.dns_options.get("cache"),
+            governor=self.dns_options.get("governor"),
+            retry=self.dns_options.get("retry")
+        )
+        return await dns_analyzer.analyze_async(record_types)
@@ -0,0 +1,275 @@
+"""Registry of the analyzers run by a complete analysis.
+
+MainAnalyzer runs every enabled analyzer of a registry and reports each
+result under the analyzer's name. Analyzers name the analyzers whose
+results they need; the others are independent and run concurrently, so
+a network-bound analyzer adds its latency in parallel with DNS rather
+than after it.
+
+The built-in analyzers are "url_analysis", "dns_analysis" and
+"http_analysis"; the last fetches the URL and only runs when selected.
+Packages add their own by exposing an AnalyzerSpec under the
+"url_analyzer.analyzers" entry point group:
+
+    [project.entry-points."url_analyzer.analyzers"]
+    whois = "my_package.whois:WHOIS_SPEC"
+
+$URL_ANALYZER_ANALYZERS (comma-separated names) selects the analyzers run
+by default instead of all enabled ones.
+"""
+import os
+import threading
+import warnings
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from importlib import metadata
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+from url_analyzer.core.base_analyzer_interface import BaseAnalyzer
+from url_analyzer.core.url_analyzer import URLAnalyzer
+
+ENTRY_POINT_GROUP = "url_analyzer.analyzers"
+ANALYZERS_ENV = "URL_ANALYZER_ANALYZERS"
+
+# Build an analyzer from the URL analyzer and the analyzer's options
+Factory = Callable[[URLAnalyzer, Dict[str, Any]], BaseAnalyzer]
+# Run an analyzer given the results it requires and the record types asked for
+Runner = Callable[[BaseAnalyzer, Dict[str, Any], Optional[List[str]]], Any]
+
+
+def _analyze(analyzer: BaseAnalyzer, results: Dict[str, Any],
+             record_types: Optional[List[str]]) -> Any:
+    return analyzer.analyze()
+
+
+class AnalyzerSpec:
+    """How to build and run one analyzer of a complete analysis."""
+
+    def __init__(self, name: str, factory: Factory,
+                 requires: Sequence[str] = (), run: Optional[Runner] = None,
+                 enabled: bool = True, blocking: bool = True):
+        """Initialize the spec.
+
+        Args:
+            name: Unique name, also the key of the analyzer's result
+            factory: Builds the analyzer from the URL analyzer and the
+                analyzer's options
+            requires: Names of the analyzers whose results it needs; they
+                are passed to run() by name
+            run: Runs the analyzer (default: its analyze())
+            enabled: Run it when no analyzers are selected explicitly
+            blocking: Whether it waits on I/O and is worth a thread; quick
+                analyzers run on the calling thread
+        """
+        self.name = name
+        self.factory = factory
+        self.requires = tuple(requires)
+        self.run = run or _analyze
+        self.enabled = enabled
+        self.blocking = blocking
+
+    def __repr__(self) -> str:
+        return f"AnalyzerSpec({self.name!r}, requires={self.requires!r})"
+
+
+class AnalyzerRegistry:
+    """Analyzer specs by name, in registration order."""
+
+    def __init__(self, specs: Iterable[AnalyzerSpec] = ()):
+        self._specs: Dict[str, AnalyzerSpec] = {}
+        for spec in specs:
+            self.register(spec)
+
+    def register(self, spec: AnalyzerSpec, replace: bool = False) -> AnalyzerSpec:
+        """Add a spec.
+
+        Raises:
+            ValueError: If an analyzer of the same name is registered and
+                replace is not set
+        """
+        if spec.name in self._specs and not replace:
+            raise ValueError(f"Analyzer already registered: {spec.name}")
+        self._specs[spec.name] = spec
+        return spec
+
+    def unregister(self, name: str) -> None:
+        self._specs.pop(name, None)
+
+    def get(self, name: str) -> AnalyzerSpec:
+        """Get a spec by name.
+
+        Raises:
+            ValueError: If no analyzer has the name
+        """
+        try:
+            return self._specs[name]
+        except KeyError:
+            raise ValueError(f"Unknown analyzer: {name}")
+
+    def names(self) -> List[str]:
+        return list(self._specs)
+
+    def default_names(self) -> List[str]:
+        """Get the analyzers run by default: $URL_ANALYZER_ANALYZERS, else
+        the enabled ones."""
+        selected = os.environ.get(ANALYZERS_ENV)
+        if selected:
+            return [name.strip() for name in selected.split(',') if name.strip()]
+        return [name for name, spec in self._specs.items() if spec.enabled]
+
+    def load_entry_points(self, group: str = ENTRY_POINT_GROUP) -> None:
+        """Register the specs installed packages expose under group.
+
+        Plugins that fail to load are skipped with a warning.
+        """
+        entry_points = metadata.entry_points()
+        if hasattr(entry_points, "select"):
+            entry_points = entry_points.select(group=group)
+        else:
+            # Python < 3.10
+            entry_points = entry_points.get(group, [])
+        for entry_point in entry_points:
+            try:
+                spec = entry_point.load()
+                if not isinstance(spec, AnalyzerSpec):
+                    raise TypeError("not an AnalyzerSpec")
+                self.register(spec)
+            except Exception as e:
+                warnings.warn(f"Cannot load analyzer {entry_point.name}: {e}")
+
+    def plan(self, names: Optional[Iterable[str]] = None) -> List[AnalyzerSpec]:
+        """Order analyzers so each comes after the ones it requires.
+
+        Required analyzers are added when not selected. Independent
+        analyzers keep registration order.
+
+        Args:
+            names: Analyzers to run (default: default_names())
+
+        Raises:
+            ValueError: If an analyzer is unknown or the requirements
+                form a cycle
+        """
+        selected = set()
+        pending = list(self.default_names() if names is None else names)
+        while pending:
+            name = pending.pop()
+            if name not in selected:
+                selected.add(name)
+                pending.extend(self.get(name).requires)
+
+        plan: List[AnalyzerSpec] = []
+        done = set()
+        remaining = [spec for name, spec in self._specs.items() if name in selected]
+        while remaining:
+            ready = [spec for spec in remaining if done.issuperset(spec.requires)]
+            if not ready:
+                cycle = ", ".join(spec.name for spec in remaining)
+                raise ValueError(f"Analyzer requirements form a cycle: {cycle}")
+            plan.extend(ready)
+            done.update(spec.name for spec in ready)
+            remaining = [spec for spec in remaining if spec.name not in done]
+        return plan
+
+
+def run_plan(plan: List[AnalyzerSpec],
+             run_one: Callable[[AnalyzerSpec, Dict[str, Any]], Any]
+             ) -> Dict[str, Any]:
+    """Run the analyzers of a plan, each as soon as its requirements are
+    done and independent ones on threads of their own.
+
+    Quick analyzers, and a blocking one with nothing else to run
+    alongside, run on the calling thread, so plans without independent
+    blocking analyzers start no threads.
+
+    Args:
+        plan: Specs ordered by AnalyzerRegistry.plan()
+        run_one: Runs a spec given the results it requires
+
+    Returns:
+        Results by analyzer name
+
+    Raises:
+        ValueError: If an analyzer requires one not in the plan
+        Exception: The first error of an analyzer; analyzers not started
+            yet are cancelled
+    """
+    results: Dict[str, Any] = {}
+    waiting = {spec.name: spec for spec in plan}
+    running: Dict[Future, str] = {}
+    executor: Optional[ThreadPoolExecutor] = None
+
+    def required(spec: AnalyzerSpec) -> Dict[str, Any]:
+        return {name: results[name] for name in spec.requires}
+
+    try:
+        while waiting or running:
+            ready = [spec for spec in waiting.values()
+                     if all(name in results for name in spec.requires)]
+            if not ready and not running:
+                raise ValueError("Unmet analyzer requirements: "
+                                 + ", ".join(waiting))
+            for spec in ready:
+                del waiting[spec.name]
+            quick = [spec for spec in ready if not spec.blocking]
+            blocking = [spec for spec in ready if spec.blocking]
+            if len(blocking) == 1 and not running:
+                quick += blocking
+                blocking = []
+            if blocking:
+                if executor is None:
+                    executor = ThreadPoolExecutor(max_workers=len(plan))
+                for spec in blocking:
+                    running[executor.submit(run_one, spec, required(spec))] = spec.name
+            if quick:
+                for spec in quick:
+                    results[spec.name] = run_one(spec, required(spec))
+                # Their results may have readied more analyzers
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+    finally:
+        if executor is not None:
+            for future in running:
+                future.cancel()
+            # Do not block on analyzers left running by an error
+            executor.shutdown(wait=False)
+    return results
+
+
+def _dns_factory(url_analyzer: URLAnalyzer, options: Dict[str, Any]) -> BaseAnalyzer:
+    from url_analyzer.analyzers.dns_analyzer import DNSAnalyzer
+    return DNSAnalyzer(url_analyzer.get_host(), **options)
+
+
+def _run_dns(analyzer: BaseAnalyzer, results: Dict[str, Any],
+             record_types: Optional[List[str]]) -> Any:
+    return analyzer.analyze(record_types)
+
+
+def _http_factory(url_analyzer: URLAnalyzer, options: Dict[str, Any]) -> BaseAnalyzer:
+    from url_analyzer.analyzers.http_analyzer import HTTPAnalyzer
+    return HTTPAnalyzer(url_analyzer.url, **options)
+
+
+URL_SPEC = AnalyzerSpec("url_analysis", lambda url_analyzer, options: url_analyzer,
+                        blocking=False)
+DNS_SPEC = AnalyzerSpec("dns_analysis", _dns_factory, run=_run_dns)
+# Fetching every URL is opt-in
+HTTP_SPEC = AnalyzerSpec("http_analysis", _http_factory, enabled=False)
+# Analyzers whose results the result objects and batch deduplication know
+CORE_ANALYZERS = (URL_SPEC.name, DNS_SPEC.name)
+
+_default_registry: Optional[AnalyzerRegistry] = None
+_default_registry_lock = threading.Lock()
+
+
+def get_default_registry() -> AnalyzerRegistry:
+    """Get the registry of the built-in and installed analyzers, loading
+    the entry points on first use."""
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            registry = AnalyzerRegistry([URL_SPEC, DNS_SPEC, HTTP_SPEC])
+            registry.load_entry_points()
+            _default_registry = registry
+        return _default_registry
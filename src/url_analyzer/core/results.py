@@ -0,0 +1,167 @@
+"""Compact result objects.
+
+The analyzers' analyze() methods return nested dicts, which are convenient
+but take several hundred bytes per URL in dict overhead alone. The classes
+here hold the same data in __slots__ attributes, built once per analysis,
+and produce the dict (or JSON) layout of analyze() only when asked to.
+Prefer them when holding many results in memory before aggregating.
+"""
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+from url_analyzer.analyzers.records import RECORD_KEYS
+
+
+class Result(ABC):
+    """Base class of the result objects."""
+
+    __slots__ = ()
+
+    @abstractmethod
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the result in the layout of the analyzer's analyze()."""
+        pass
+
+    def to_json(self, **kwargs: Any) -> str:
+        """Encode the result as JSON.
+
+        Args:
+            **kwargs: Keyword arguments passed through to json.dumps
+        """
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def __eq__(self, other: Any) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name)
+                   for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}"
+                           for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class URLResult(Result):
+    """Result of a URL analysis."""
+
+    __slots__ = ('url', 'normalized_url', 'domain', 'scheme', 'netloc', 'path',
+                 'params', 'query', 'fragment', 'query_params')
+
+    def __init__(self, url: str, normalized_url: str, domain: str, scheme: str,
+                 netloc: str, path: str, params: str, query: str,
+                 fragment: str, query_params: Dict[str, List[str]]):
+        self.url = url
+        self.normalized_url = normalized_url
+        self.domain = domain
+        self.scheme = scheme
+        self.netloc = netloc
+        self.path = path
+        self.params = params
+        self.query = query
+        self.fragment = fragment
+        self.query_params = query_params
+
+    @property
+    def components(self) -> Dict[str, Any]:
+        """The URL components, as in URLAnalyzer.get_info()."""
+        return {
+            "scheme": self.scheme,
+            "netloc": self.netloc,
+            "path": self.path,
+            "params": self.params,
+            "query": self.query,
+            "fragment": self.fragment,
+            "query_params": self.query_params,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "normalized_url": self.normalized_url,
+            "components": self.components,
+            "domain": self.domain
+        }
+
+
+class DNSResult(Result):
+    """Result of a DNS analysis.
+
+    Each record attribute is None when its record type was not queried.
+    min_ttl is the smallest TTL of the answers, in seconds, or None when
+    no answer carried one (e.g. every query timed out). errors maps the
+    record types whose query failed (a timeout or server failure, not a
+    negative answer) to the error message; their records are reported
+    empty but are unknown.
+    """
+
+    __slots__ = ('domain', 'nameservers', 'min_ttl', 'errors') + RECORD_KEYS
+
+    def __init__(self, domain: str, nameservers: List[str],
+                 a_records: Optional[List[str]] = None,
+                 aaaa_records: Optional[List[str]] = None,
+                 cname_records: Optional[List[str]] = None,
+                 mx_records: Optional[List[Dict[str, Any]]] = None,
+                 txt_records: Optional[List[str]] = None,
+                 ns_records: Optional[List[str]] = None,
+                 soa_record: Optional[Dict[str, Any]] = None,
+                 min_ttl: Optional[int] = None,
+                 errors: Optional[Dict[str, str]] = None):
+        self.domain = domain
+        self.nameservers = nameservers
+        self.min_ttl = min_ttl
+        self.errors = errors
+        self.a_records = a_records
+        self.aaaa_records = aaaa_records
+        self.cname_records = cname_records
+        self.mx_records = mx_records
+        self.txt_records = txt_records
+        self.ns_records = ns_records
+        self.soa_record = soa_record
+
+    @property
+    def records(self) -> Dict[str, Any]:
+        """The queried records by result key, in output order."""
+        records = {}
+        for key in RECORD_KEYS:
+            value = getattr(self, key)
+            if value is not None:
+                records[key] = value
+        return records
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "info": {
+                "domain": self.domain,
+                "nameservers": self.nameservers,
+                "min_ttl": self.min_ttl,
+                "errors": self.errors or {}
+            },
+            "records": self.records
+        }
+
+
+class FullResult(Result):
+    """Result of a complete analysis.
+
+    The basic information is derived from the URL result instead of being
+    stored a second time.
+    """
+
+    __slots__ = ('url_result', 'dns_result')
+
+    def __init__(self, url_result: URLResult, dns_result: DNSResult):
+        self.url_result = url_result
+        self.dns_result = dns_result
+
+    def to_dict(self) -> Dict[str, Any]:
+        url_result = self.url_result
+        return {
+            "info": {
+                "url": url_result.url,
+                "domain": url_result.domain,
+                "normalized_url": url_result.normalized_url
+            },
+            "url_analysis": url_result.to_dict(),
+            "dns_analysis": self.dns_result.to_dict()
+        }
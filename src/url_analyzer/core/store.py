@@ -0,0 +1,257 @@
+"""Store of past DNS results, for incremental batch runs.
+
+A ResultStore remembers, per normalized URL, the DNS records last found,
+their hash and when the smallest of their TTLs runs out. An
+IncrementalAnalyzer uses it to analyze only the URLs that are new or whose
+records may have changed since (their TTL expired), and yields what
+changed instead of every result:
+
+    {"url": ..., "normalized_url": ..., "status": "new", "records": {...}}
+    {"url": ..., "normalized_url": ..., "status": "changed",
+     "changes": {"a_records": {"added": [...], "removed": [...]},
+                 "soa_record": {"old": {...}, "new": {...}}}}
+
+URLs that fail are yielded as the batch reports them, with an "error". So
+are URLs with any failed query (a timeout or server failure, as opposed to
+a negative answer): their stored records are kept, to be compared on the
+next run. Record lists are compared as sets, since resolvers rotate their
+order.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from url_analyzer.core.url_analyzer import URLAnalyzer
+from url_analyzer.utils.exceptions import URLAnalyzerError
+
+# Rows written to the database at a time
+WRITE_BATCH = 500
+
+
+class StoredResult:
+    """Records of a URL as last analyzed."""
+
+    __slots__ = ("digest", "expires", "records")
+
+    def __init__(self, digest: str, expires: float, records: Dict[str, Any]):
+        self.digest = digest
+        self.expires = expires
+        self.records = records
+
+
+def canonical_records(records: Dict[str, Any]) -> Dict[str, Any]:
+    """Sort record lists so equal record sets compare and hash equal."""
+    return {key: sorted(value, key=lambda item: json.dumps(item, sort_keys=True))
+            if isinstance(value, list) else value
+            for key, value in records.items()}
+
+
+def records_hash(records: Dict[str, Any]) -> str:
+    """Hash canonical records."""
+    return hashlib.sha256(
+        json.dumps(records, sort_keys=True, separators=(',', ':')).encode()
+    ).hexdigest()
+
+
+def diff_records(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Get the changes between two sets of canonical records.
+
+    Record lists report the records added and removed; other records (the
+    SOA record) their old and new value.
+    """
+    changes = {}
+    for key in list(old) + [key for key in new if key not in old]:
+        before, after = old.get(key), new.get(key)
+        if before == after:
+            continue
+        if isinstance(before, list) or isinstance(after, list):
+            before, after = before or [], after or []
+            if before == after:
+                continue
+            changes[key] = {"added": [item for item in after if item not in before],
+                            "removed": [item for item in before if item not in after]}
+        else:
+            changes[key] = {"old": before, "new": after}
+    return changes
+
+
+def normalize_url(url: str) -> Optional[str]:
+    """Get the store key of a URL, or None if it is invalid."""
+    try:
+        return URLAnalyzer(url).normalized_url
+    except URLAnalyzerError:
+        return None
+
+
+class ResultStore:
+    """SQLite store of the last DNS records of each URL.
+
+    Rows are keyed by normalized URL and a variant naming the record
+    types, so runs asking for different records do not mix. Writes are buffered and committed in batches.
+    """
+
+    FILENAME = "results.sqlite3"
+
+    def __init__(self, path: str,
+                 wall_clock: Callable[[], float] = time.time):
+        """Open (or create) the store.
+
+        Args:
+            path: Database file; its directory is created if missing
+            wall_clock: Time source for expiry times, in seconds
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.wall_clock = wall_clock
+        self._pending: Dict[Tuple[str, str], Tuple[Any, ...]] = {}
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " url TEXT NOT NULL,"
+                " variant TEXT NOT NULL,"
+                " digest TEXT NOT NULL,"
+                " expires REAL NOT NULL,"
+                " records TEXT NOT NULL,"
+                " PRIMARY KEY (url, variant))"
+            )
+
+    def get(self, url: str, variant: str) -> Optional[StoredResult]:
+        """Get the stored records of a normalized URL, if any."""
+        with self._lock:
+            row = self._pending.get((url, variant))
+            if row is None:
+                row = self._db.execute(
+                    "SELECT url, variant, digest, expires, records FROM results"
+                    " WHERE url = ? AND variant = ?", (url, variant)
+                ).fetchone()
+        if row is None:
+            return None
+        return StoredResult(row[2], row[3], json.loads(row[4]))
+
+    def put(self, url: str, variant: str, records: Dict[str, Any],
+            ttl: Optional[int]) -> str:
+        """Store canonical records of a normalized URL, valid for ttl seconds.
+
+        Returns:
+            The records' hash
+        """
+        digest = records_hash(records)
+        row = (url, variant, digest, self.wall_clock() + (ttl or 0),
+               json.dumps(records))
+        with self._lock:
+            self._pending[(url, variant)] = row
+            if len(self._pending) >= WRITE_BATCH:
+                self._write()
+        return digest
+
+    def _write(self) -> None:
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                self._pending.values()
+            )
+        self._pending.clear()
+
+    def flush(self) -> None:
+        """Write buffered rows to the database."""
+        with self._lock:
+            if self._pending:
+                self._write()
+
+    def __len__(self) -> int:
+        self.flush()
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def close(self) -> None:
+        """Write buffered rows and close the database."""
+        self.flush()
+        with self._lock:
+            self._db.close()
+
+
+class IncrementalAnalyzer:
+    """Run a batch over the URLs whose stored records are new or expired.
+
+    The "stats" attribute counts URLs skipped as fresh, and analyzed URLs
+    by outcome: new, changed, unchanged and errors.
+    """
+
+    def __init__(self, batch: Any, store: ResultStore, mode: str,
+                 record_types: Optional[List[str]] = None):
+        """Initialize the analyzer.
+
+        Args:
+            batch: BatchAnalyzer or ProcessBatchAnalyzer in 'dns' or 'full'
+                mode, yielding result dicts
+            store: Store of the previous runs' records
+            mode: Analysis mode of the batch
+            record_types: DNS record types the batch queries (default: all)
+        """
+        if mode not in ('dns', 'full'):
+            raise ValueError("Incremental runs need DNS results ('dns' or 'full' mode)")
+        self.batch = batch
+        self.store = store
+        self.mode = mode
+        # Both modes store the same records; only the set of types matters
+        types = sorted({record_type.upper() for record_type in record_types or ()})
+        self.variant = ','.join(types) or '*'
+        self.stats = {"fresh": 0, "new": 0, "changed": 0, "unchanged": 0,
+                      "errors": 0}
+
+    def _due(self, urls: Iterable[str]) -> Iterator[str]:
+        """Yield the URLs without live stored records."""
+        for url in urls:
+            key = normalize_url(url)
+            stored = None if key is None else self.store.get(key, self.variant)
+            if stored is not None and stored.expires > self.store.wall_clock():
+                self.stats["fresh"] += 1
+                continue
+            yield url
+
+    def run(self, urls: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """Analyze due URLs, yielding errors and the records that changed."""
+        try:
+            for result in self.batch.run(self._due(urls)):
+                if "error" in result:
+                    self.stats["errors"] += 1
+                    yield result
+                    continue
+                diff = self._update(result)
+                if diff is not None:
+                    yield diff
+        finally:
+            self.store.flush()
+
+    def _update(self, result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Store a result, getting its diff unless it is unchanged, or its
+        error if a query failed."""
+        dns_analysis = result if self.mode == 'dns' else result["dns_analysis"]
+        errors = dns_analysis["info"].get("errors")
+        if errors:
+            # Failed queries leave the records unknown, not removed
+            self.stats["errors"] += 1
+            return {"url": result["url"], "error": "; ".join(errors.values())}
+        records = canonical_records(dns_analysis["records"])
+        key = normalize_url(result["url"])
+        stored = self.store.get(key, self.variant)
+        digest = self.store.put(key, self.variant, records,
+                                dns_analysis["info"].get("min_ttl"))
+        diff = {"url": result["url"], "normalized_url": key}
+        if stored is None:
+            self.stats["new"] += 1
+            return {**diff, "status": "new", "records": records}
+        if stored.digest != digest:
+            self.stats["changed"] += 1
+            return {**diff, "status": "changed",
+                    "changes": diff_records(stored.records, records)}
+        self.stats["unchanged"] += 1
+        return None
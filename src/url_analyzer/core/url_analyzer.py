@@ -1,96 +1,190 @@
-from urllib.parse import urlparse, parse_qs
-from typing import Dict, Any
+from urllib.parse import ParseResult, urlparse, parse_qs
+from typing import Dict, Any, Iterable, List, Optional
 from url_analyzer.core.base_analyzer_interface import BaseAnalyzer
+from url_analyzer.core.results import URLResult
 from url_analyzer.utils.exceptions import InvalidURLError
+from url_analyzer.utils.public_suffix import get_default_list
 
 class URLAnalyzer(BaseAnalyzer):
-    """URL component analyzer."""
+    """URL component analyzer.
+
+    The URL is parsed once on construction; derived values (normalized
+    URL, host, domain, query parameters) are computed on first use and
+    cached on the instance.
+    """
     
     SUPPORTED_SCHEMES = {'http', 'https'}
     
     def __init__(self, url: str):
-        if not self.is_valid_url(url):
+        try:
+            parsed_url = urlparse(url)
+        except Exception:
+            parsed_url = None
+        if parsed_url is None or not self._is_valid_parsed(parsed_url):
             raise InvalidURLError(f"Invalid URL: {url}")
             
         self.url = url
-        self.parsed_url = urlparse(url)
-        self.normalized_url = self._normalize_url()
+        self.parsed_url = parsed_url
+        # Derived values, computed on first use
+        self._normalized_url: Optional[str] = None
+        self._query_params: Optional[Dict[str, List[str]]] = None
+        self._host: Optional[str] = None
+        self._domain: Optional[str] = None
+
+    @property
+    def normalized_url(self) -> str:
+        """The normalized URL."""
+        if self._normalized_url is None:
+            self._normalized_url = self._normalize_url()
+        return self._normalized_url
+
+    @property
+    def query_params(self) -> Dict[str, List[str]]:
+        """The parsed query string."""
+        if self._query_params is None:
+            query = self.parsed_url.query
+            self._query_params = parse_qs(query) if query else {}
+        return self._query_params
     
     def get_info(self) -> Dict[str, Any]:
         """Get basic URL information."""
+        parsed_url = self.parsed_url
         return {
-            "scheme": self.parsed_url.scheme,
-            "netloc": self.parsed_url.netloc,
-            "path": self.parsed_url.path,
-            "params": self.parsed_url.params,
-            "query": self.parsed_url.query,
-            "fragment": self.parsed_url.fragment,
-            "query_params": parse_qs(self.parsed_url.query),
+            "scheme": parsed_url.scheme,
+            "netloc": parsed_url.netloc,
+            "path": parsed_url.path,
+            "params": parsed_url.params,
+            "query": parsed_url.query,
+            "fragment": parsed_url.fragment,
+            "query_params": self.query_params,
         }
     
     def analyze(self) -> Dict[str, Any]:
         """Perform complete URL analysis."""
-        return {
-            "url": self.url,
-            "normalized_url": self.normalized_url,
-            "components": self.get_info(),
-            "domain": self.get_domain()
-        }
+        return self.analyze_result().to_dict()
+
+    def analyze_result(self) -> URLResult:
+        """Perform complete URL analysis into a compact result object."""
+        parsed_url = self.parsed_url
+        return URLResult(self.url, self.normalized_url, self.get_domain(),
+                         parsed_url.scheme, parsed_url.netloc, parsed_url.path,
+                         parsed_url.params, parsed_url.query,
+                         parsed_url.fragment, self.query_params)
     
+    # Columns returned by analyze_many(), in order
+    COLUMNS = ('url', 'valid', 'scheme', 'host', 'domain', 'path', 'query',
+               'normalized_url')
+
+    @classmethod
+    def analyze_many(cls, urls: Iterable[str]) -> Dict[str, List[Any]]:
+        """Analyze many URLs into columns without per-URL analyzer objects.
+
+        Args:
+            urls: URLs to analyze
+
+        Returns:
+            Dict mapping each name in COLUMNS to a list with one entry per
+            input URL, ready for pandas.DataFrame or pyarrow.table. Invalid
+            URLs have "valid" False and None in the derived columns.
+        """
+        columns: Dict[str, List[Any]] = {name: [] for name in cls.COLUMNS}
+        url_column = columns['url']
+        valid_column = columns['valid']
+        scheme_column = columns['scheme']
+        host_column = columns['host']
+        domain_column = columns['domain']
+        path_column = columns['path']
+        query_column = columns['query']
+        normalized_column = columns['normalized_url']
+        is_valid = cls._is_valid_parsed
+        normalize = cls._normalize_parsed
+        domain_of = cls._domain_of
+
+        for url in urls:
+            try:
+                parsed_url = urlparse(url)
+                valid = is_valid(parsed_url)
+            except Exception:
+                valid = False
+            url_column.append(url)
+            valid_column.append(valid)
+            if valid:
+                scheme_column.append(parsed_url.scheme)
+                host_column.append((parsed_url.hostname or "").rstrip('.'))
+                domain_column.append(domain_of(parsed_url.netloc))
+                path_column.append(parsed_url.path)
+                query_column.append(parsed_url.query)
+                normalized_column.append(normalize(parsed_url))
+            else:
+                scheme_column.append(None)
+                host_column.append(None)
+                domain_column.append(None)
+                path_column.append(None)
+                query_column.append(None)
+                normalized_column.append(None)
+
+        return columns
+
     @staticmethod
     def is_valid_url(url: str) -> bool:
         try:
-            result = urlparse(url)
-            return all([
-                result.scheme in URLAnalyzer.SUPPORTED_SCHEMES,
-                result.netloc,
-                '.' in result.netloc,
-                not result.netloc.startswith('.'),
-                not result.netloc.endswith('.')
-            ])
+            return URLAnalyzer._is_valid_parsed(urlparse(url))
         except Exception:
             return False
+
+    @staticmethod
+    def _is_valid_parsed(parsed_url: ParseResult) -> bool:
+        netloc = parsed_url.netloc
+        return bool(
+            parsed_url.scheme in URLAnalyzer.SUPPORTED_SCHEMES
+            and '.' in netloc
+            and netloc[0] != '.'
+            and netloc[-1] != '.'
+        )
             
     def _normalize_url(self) -> str:
         """Normalize the URL."""
-        scheme = self.parsed_url.scheme.lower()
-        netloc = self.parsed_url.netloc.lower()
+        return self._normalize_parsed(self.parsed_url)
+
+    @staticmethod
+    def _normalize_parsed(parsed_url: ParseResult) -> str:
+        scheme = parsed_url.scheme.lower()
+        netloc = parsed_url.netloc.lower()
         
-        if f":{scheme}" in netloc:
-            netloc = netloc.replace(f":{scheme}", "")
+        if ':' + scheme in netloc:
+            netloc = netloc.replace(':' + scheme, "")
             
-        path = self.parsed_url.path
-        if path == "/":
-            path = ""
-        elif path.endswith("/"):
+        path = parsed_url.path
+        if path.endswith("/"):
             path = path[:-1]
             
-        query = self.parsed_url.query
-        if not query:
-            query = ""
-            
-        fragment = self.parsed_url.fragment
-        if not fragment:
-            fragment = ""
-            
-        normalized = f"{scheme}://{netloc}{path}"
-        if query:
-            normalized += f"?{query}"
-        if fragment:
-            normalized += f"#{fragment}"
+        normalized = scheme + "://" + netloc + path
+        if parsed_url.query:
+            normalized += "?" + parsed_url.query
+        if parsed_url.fragment:
+            normalized += "#" + parsed_url.fragment
             
         return normalized
-        
-    def get_domain(self) -> str:
-        """Extract the main domain."""
-        netloc = self.parsed_url.netloc.lower()
-        
+
+    def get_host(self) -> str:
+        """Get the host name to query DNS for.
+
+        The host is lowercased, without credentials, port or trailing dot,
+        so URLs differing only in those share one DNS analysis.
+        """
+        if self._host is None:
+            self._host = (self.parsed_url.hostname or "").rstrip('.')
+        return self._host
+
+    @staticmethod
+    def _domain_of(netloc: str) -> str:
+        netloc = netloc.lower()
         if ':' in netloc:
             netloc = netloc.split(':')[0]
-            
-        parts = netloc.split('.')
+        return get_default_list().registrable_domain(netloc)
         
-        if len(parts) > 2 and parts[-2] in {'co', 'com', 'org', 'net', 'edu', 'gov'}:
-            return f"{parts[-3]}.{parts[-2]}.{parts[-1]}"
-            
-        return '.'.join(parts[-2:])
+    def get_domain(self) -> str:
+        """Extract the registrable domain, per the Public Suffix List."""
+        if self._domain is None:
+            self._domain = self._domain_of(self.parsed_url.netloc)
+        return self._domain
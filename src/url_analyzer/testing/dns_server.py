@@ -0,0 +1,355 @@
+"""In-process authoritative DNS server for offline testing.
+
+Serves records from a zone (a dict, or a JSON or YAML file) over UDP and
+TCP on localhost, with configurable latency, jitter, UDP drop rate and
+TTLs, so that concurrency, caching and rate limiting can be load-tested
+reproducibly without network access. Point analyzers at it with
+analyzer_options():
+
+    with DNSServer(load_zone("zone.json"), latency=0.02) as server:
+        DNSAnalyzer("www.example.test", **server.analyzer_options()).analyze()
+
+Zone layout (JSON shown; YAML is the same):
+
+    {
+      "ttl": 300,
+      "records": {
+        "example.test": {"A": ["192.0.2.1"], "MX": ["10 mail.example.test."]},
+        "*.example.test": {"A": {"ttl": 30, "values": ["192.0.2.2"]}}
+      }
+    }
+
+Names are absolute, with or without the trailing dot; "*." entries match
+any name below their parent that has no records of its own. Names with no
+records get NXDOMAIN, and existing names queried for a type they do not
+have get an empty answer. TXT values are quoted when they are not already.
+
+The server can also be run on its own:
+
+    python -m url_analyzer.testing.dns_server zone.json --port 5353 --latency 0.02
+"""
+import json
+import random
+import socketserver
+import struct
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import dns.exception
+import dns.flags
+import dns.message
+import dns.rcode
+import dns.rdatatype
+import dns.rrset
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+DEFAULT_TTL = 300
+# Largest UDP response to clients not advertising an EDNS buffer size
+UDP_PAYLOAD = 512
+
+# Records by (absolute name, record type): (ttl, values)
+Records = Dict[Tuple[str, str], Tuple[int, List[str]]]
+
+
+def _absolute(name: str) -> str:
+    return name.lower().rstrip('.') + '.'
+
+
+class Zone:
+    """Records served by a DNSServer."""
+
+    def __init__(self, records: Optional[Dict[str, Dict[str, Any]]] = None,
+                 ttl: int = DEFAULT_TTL):
+        """Initialize the zone.
+
+        Args:
+            records: Record values by name and record type; each entry is a
+                list of values in zone file syntax, or a dict with "values"
+                and an optional "ttl"
+            ttl: TTL of records without one of their own
+
+        Raises:
+            ValueError: If an entry is malformed
+        """
+        self.ttl = ttl
+        self.records: Records = {}
+        self.names = set()
+        for name, types in (records or {}).items():
+            # A name without records still exists
+            self.names.add(_absolute(name))
+            for record_type, entry in (types or {}).items():
+                self.add(name, record_type, entry)
+
+    def add(self, name: str, record_type: str, entry: Any) -> None:
+        """Add the records of one name and type, replacing any."""
+        if isinstance(entry, dict):
+            values, ttl = entry.get("values"), entry.get("ttl", self.ttl)
+        else:
+            values, ttl = entry, self.ttl
+        if isinstance(values, str):
+            values = [values]
+        if not isinstance(values, list) or not isinstance(ttl, int):
+            raise ValueError(f"Malformed records for {name} {record_type}")
+        record_type = record_type.upper()
+        values = [str(value) for value in values]
+        if record_type == "TXT":
+            values = [value if value.startswith('"') else json.dumps(value)
+                      for value in values]
+        name = _absolute(name)
+        try:
+            # Parse once, so bad values fail here rather than per query
+            dns.rrset.from_text_list(name, ttl, "IN", record_type, values)
+        except (dns.exception.DNSException, ValueError) as e:
+            raise ValueError(f"Malformed records for {name} {record_type}: {e}")
+        self.names.add(name)
+        self.records[(name, record_type)] = (ttl, values)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Zone":
+        """Create a zone from its JSON/YAML layout."""
+        return cls(data.get("records", {}), data.get("ttl", DEFAULT_TTL))
+
+    def _owner(self, name: str) -> Optional[str]:
+        """Get the zone name whose records answer name, if any."""
+        if name in self.names:
+            return name
+        labels = name.split('.')
+        for index in range(1, len(labels) - 1):
+            wildcard = '*.' + '.'.join(labels[index:])
+            if wildcard in self.names:
+                return wildcard
+        return None
+
+    def lookup(self, name: str, record_type: str
+               ) -> Tuple[bool, Optional[Tuple[int, List[str]]]]:
+        """Find the records of a name.
+
+        Returns:
+            Whether the name exists, and its TTL and values of the record
+            type (None if it has none)
+        """
+        owner = self._owner(_absolute(name))
+        if owner is None:
+            return False, None
+        return True, self.records.get((owner, record_type.upper()))
+
+
+def load_zone(path: str) -> Zone:
+    """Load a zone from a JSON file, or a YAML one (needs PyYAML).
+
+    Raises:
+        OSError: If the file cannot be read
+        ValueError: If the file is malformed
+    """
+    with open(path, encoding='utf-8') as f:
+        if path.endswith(('.yaml', '.yml')):
+            if yaml is None:
+                raise ValueError("Reading YAML zone files needs PyYAML")
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError(f"Malformed zone file: {path}")
+    return Zone.from_dict(data)
+
+
+class _UDPServer(socketserver.ThreadingUDPServer):
+    daemon_threads = True
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _UDPHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        wire, sock = self.request
+        response = self.server.dns_server.respond(wire, udp=True)
+        if response is not None:
+            sock.sendto(response, self.client_address)
+
+
+class _TCPHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        reader = self.request.makefile('rb')
+        while True:
+            prefix = reader.read(2)
+            if len(prefix) < 2:
+                return
+            wire = reader.read(struct.unpack("!H", prefix)[0])
+            response = self.server.dns_server.respond(wire, udp=False)
+            if response is None:
+                return
+            self.request.sendall(struct.pack("!H", len(response)) + response)
+
+
+class DNSServer:
+    """Authoritative DNS server for a Zone, on localhost.
+
+    Each query is answered on a thread of its own after the latency, so
+    concurrent queries overlap like they would on the network. Dropped
+    queries (UDP only) are never answered, making clients time out.
+    """
+
+    def __init__(self, zone: Zone, host: str = "127.0.0.1", port: int = 0,
+                 latency: float = 0.0, jitter: float = 0.0,
+                 drop_rate: float = 0.0, seed: Optional[int] = None):
+        """Initialize and start the server.
+
+        Args:
+            zone: Records to serve
+            host: Address to listen on
+            port: Port to listen on, for both UDP and TCP (default: a free one)
+            latency: Seconds to wait before answering each query
+            jitter: Maximum random seconds added to the latency
+            drop_rate: Fraction of UDP queries left unanswered
+            seed: Seed of the random jitter and drops, for reproducible runs
+        """
+        if not 0 <= drop_rate <= 1:
+            raise ValueError("drop_rate must be between 0 and 1")
+        self.zone = zone
+        self.latency = latency
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._stats = {"queries": 0, "udp": 0, "tcp": 0, "dropped": 0,
+                       "truncated": 0, "nxdomain": 0}
+
+        self._udp = _UDPServer((host, port), _UDPHandler)
+        self.host, self.port = self._udp.server_address[:2]
+        try:
+            self._tcp = _TCPServer((host, self.port), _TCPHandler)
+        except OSError:
+            self._udp.server_close()
+            raise
+        for server in (self._udp, self._tcp):
+            server.dns_server = self
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def __enter__(self) -> "DNSServer":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Stop serving and close the sockets."""
+        for server in (self._udp, self._tcp):
+            server.shutdown()
+            server.server_close()
+
+    def analyzer_options(self) -> Dict[str, Any]:
+        """Get the DNSAnalyzer options querying this server."""
+        return {"nameservers": [self.host], "port": self.port}
+
+    def stats(self) -> Dict[str, int]:
+        """Get query counts: total, by transport, dropped, truncated and
+        NXDOMAIN answers."""
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._stats[key] += 1
+
+    def _delay(self) -> float:
+        with self._lock:
+            return self.latency + self.jitter * self._random.random()
+
+    def _dropped(self) -> bool:
+        with self._lock:
+            return self._random.random() < self.drop_rate
+
+    def build_response(self, query: dns.message.Message) -> dns.message.Message:
+        """Answer a query from the zone."""
+        response = dns.message.make_response(query)
+        response.flags |= dns.flags.AA
+        if not query.question:
+            response.set_rcode(dns.rcode.FORMERR)
+            return response
+        question = query.question[0]
+        name = question.name.to_text()
+        record_type = dns.rdatatype.to_text(question.rdtype)
+        exists, found = self.zone.lookup(name, record_type)
+        if not exists:
+            self._count("nxdomain")
+            response.set_rcode(dns.rcode.NXDOMAIN)
+        elif found is not None:
+            ttl, values = found
+            response.answer.append(dns.rrset.from_text_list(
+                question.name, ttl, "IN", record_type, values))
+        return response
+
+    def respond(self, wire: bytes, udp: bool) -> Optional[bytes]:
+        """Get the wire response to a wire query, or None to drop it."""
+        self._count("queries", "udp" if udp else "tcp")
+        if udp and self.drop_rate and self._dropped():
+            self._count("dropped")
+            return None
+        try:
+            query = dns.message.from_wire(wire)
+        except dns.exception.DNSException:
+            return None
+        response = self.build_response(query)
+        delay = self._delay()
+        if delay > 0:
+            time.sleep(delay)
+        if not udp:
+            return response.to_wire()
+        max_size = max(query.payload, UDP_PAYLOAD) if query.edns >= 0 else UDP_PAYLOAD
+        try:
+            return response.to_wire(max_size=max_size)
+        except dns.exception.TooBig:
+            # The client is expected to retry over TCP
+            self._count("truncated")
+            response.answer.clear()
+            response.flags |= dns.flags.TC
+            return response.to_wire()
+
+
+def main(argv: Optional[list] = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Serve a zone file over DNS for offline testing"
+    )
+    parser.add_argument("zone", help="Zone file (.json, .yaml or .yml)")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=5353,
+                        help="UDP and TCP port (default: 5353)")
+    parser.add_argument("--latency", type=float, default=0.0, metavar="SECONDS",
+                        help="Delay before each answer")
+    parser.add_argument("--jitter", type=float, default=0.0, metavar="SECONDS",
+                        help="Maximum random delay added to the latency")
+    parser.add_argument("--drop-rate", type=float, default=0.0, metavar="RATE",
+                        help="Fraction of UDP queries left unanswered")
+    parser.add_argument("--seed", type=int, help="Seed for jitter and drops")
+    args = parser.parse_args(argv)
+
+    try:
+        zone = load_zone(args.zone)
+        server = DNSServer(zone, args.host, args.port, args.latency,
+                           args.jitter, args.drop_rate, args.seed)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    print(f"Serving {args.zone} on {server.host} port {server.port}",
+          file=sys.stderr)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
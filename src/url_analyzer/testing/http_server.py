@@ -0,0 +1,125 @@
+"""In-process HTTP server for offline testing of HTTP analysis.
+
+Serves canned responses by path on localhost, with keep-alive, optional
+per-route delays and counts of the requests, connections and peak
+concurrency it saw, so connection reuse and per-host limits can be tested
+without network access:
+
+    routes = {
+        "/": {"body": "hello"},
+        "/old": {"status": 301, "headers": {"Location": "/"}},
+        "/slow": {"body": "x" * 1000, "delay": 0.2},
+    }
+    with HTTPTestServer(routes) as server:
+        HTTPAnalyzer(server.url("/old")).analyze()
+        print(server.stats())
+
+Each route is a dict with an optional "status" (default 200), "body" (str
+or bytes), "headers" and "delay" in seconds. Unknown paths get a 404.
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self) -> None:
+        super().setup()
+        self.server.test_server._count("connections")
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _respond(self, head_only: bool) -> None:
+        test_server = self.server.test_server
+        route = test_server.routes.get(self.path.split('?', 1)[0])
+        test_server._enter()
+        try:
+            if route is None:
+                status, headers, body = 404, {}, b"Not found"
+            else:
+                if route.get("delay"):
+                    time.sleep(route["delay"])
+                status = route.get("status", 200)
+                headers = route.get("headers", {})
+                body = route.get("body", b"")
+                if isinstance(body, str):
+                    body = body.encode()
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if not head_only:
+                self.wfile.write(body)
+        finally:
+            test_server._leave()
+
+    def do_GET(self) -> None:
+        self._respond(head_only=False)
+
+    def do_HEAD(self) -> None:
+        self._respond(head_only=True)
+
+
+class HTTPTestServer:
+    """HTTP server for a table of routes, on localhost."""
+
+    def __init__(self, routes: Dict[str, Dict[str, Any]],
+                 host: str = "127.0.0.1", port: int = 0):
+        """Initialize and start the server.
+
+        Args:
+            routes: Responses by path
+            host: Address to listen on
+            port: Port to listen on (default: a free one)
+        """
+        self.routes = routes
+        self._lock = threading.Lock()
+        self._active = 0
+        self._stats = {"requests": 0, "connections": 0, "max_concurrent": 0}
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.test_server = self
+        self.host, self.port = self._server.server_address[:2]
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def __enter__(self) -> "HTTPTestServer":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Stop serving and close the socket."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def url(self, path: str = "/", host: Optional[str] = None) -> str:
+        """Get the URL of a path on this server, optionally under another
+        host name resolving to it (e.g. "localhost")."""
+        return f"http://{host or self.host}:{self.port}{path}"
+
+    def stats(self) -> Dict[str, int]:
+        """Get counts of requests, connections accepted and the most
+        requests handled at once."""
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def _enter(self) -> None:
+        with self._lock:
+            self._stats["requests"] += 1
+            self._active += 1
+            self._stats["max_concurrent"] = max(self._stats["max_concurrent"],
+                                                self._active)
+
+    def _leave(self) -> None:
+        with self._lock:
+            self._active -= 1
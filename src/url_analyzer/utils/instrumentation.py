@@ -0,0 +1,190 @@
+"""Per-stage timing of analyses.
+
+An Instrumentation records how long each stage of an analysis took and how
+it ended. Analyzers given one (the "instrumentation" option, passed along
+with the DNS options) time these stages:
+
+- url.parse: building a URLAnalyzer
+- dns.query.<TYPE>: resolving one record type, including cache lookups and
+  retries; the outcome is "cache_hit", "ok" or the error's class name,
+  e.g. "NXDOMAIN" or "LifetimeTimeout"
+- dns.analyze: a whole DNSAnalyzer analysis
+- analyze: a whole MainAnalyzer analysis
+- output: formatting and writing a result in the CLI
+
+Durations are kept in a bounded random sample per stage for the latency
+quantiles, so memory stays flat however many URLs are analyzed; counts
+are exact. Hooks receive every measurement as it is recorded.
+"""
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Optional
+
+# Quantiles reported by summary()
+QUANTILES = (0.5, 0.95, 0.99)
+# Durations kept per stage for the quantiles
+MAX_SAMPLES = 10000
+
+Hook = Callable[[str, float, str], Any]
+
+
+class Span:
+    """Outcome of a timed stage, settable inside the timer block."""
+
+    __slots__ = ("outcome",)
+
+    def __init__(self):
+        self.outcome: Optional[str] = None
+
+
+class StageStats:
+    """Durations and outcome counts of one stage."""
+
+    __slots__ = ("count", "total", "samples", "outcomes")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.samples: List[float] = []
+        self.outcomes: Dict[str, int] = {}
+
+
+def quantile(samples: List[float], q: float) -> float:
+    """Get a quantile of sorted samples, by nearest rank."""
+    index = min(len(samples) - 1, max(0, int(q * len(samples) + 0.5) - 1))
+    return samples[index]
+
+
+class Instrumentation:
+    """Thread-safe recorder of stage durations and outcomes."""
+
+    def __init__(self, max_samples: int = MAX_SAMPLES,
+                 clock: Callable[[], float] = time.perf_counter):
+        """Initialize the recorder.
+
+        Args:
+            max_samples: Durations kept per stage for the quantiles
+            clock: Time source, in seconds
+        """
+        self.max_samples = max_samples
+        self.clock = clock
+        self._stages: Dict[str, StageStats] = {}
+        self._hooks: List[Hook] = []
+        self._random = random.Random()
+        self._lock = threading.Lock()
+
+    def __reduce__(self):
+        # Worker processes record into instrumentation of their own
+        return type(self), (self.max_samples,)
+
+    def add_hook(self, hook: Hook) -> None:
+        """Call hook(stage, duration, outcome) on every measurement."""
+        self._hooks.append(hook)
+
+    def record(self, stage: str, duration: float, outcome: str = "ok") -> None:
+        """Record one run of a stage."""
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = StageStats()
+            stats.count += 1
+            stats.total += duration
+            stats.outcomes[outcome] = stats.outcomes.get(outcome, 0) + 1
+            if len(stats.samples) < self.max_samples:
+                stats.samples.append(duration)
+            else:
+                # Reservoir sampling keeps a uniform sample of all runs
+                index = self._random.randrange(stats.count)
+                if index < self.max_samples:
+                    stats.samples[index] = duration
+        for hook in self._hooks:
+            hook(stage, duration, outcome)
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[Span]:
+        """Time the block as one run of a stage.
+
+        The outcome is "ok", "error" if the block raises, or whatever the
+        block sets on the yielded Span.
+        """
+        span = Span()
+        start = self.clock()
+        try:
+            yield span
+        except BaseException:
+            if span.outcome is None:
+                span.outcome = "error"
+            raise
+        finally:
+            self.record(stage, self.clock() - start, span.outcome or "ok")
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Get count, total seconds, outcome counts and latency quantiles
+        (p50, p95, p99) of every stage, in stage name order."""
+        with self._lock:
+            stages = {stage: (stats.count, stats.total, dict(stats.outcomes),
+                              sorted(stats.samples))
+                      for stage, stats in self._stages.items()}
+        summary = {}
+        for stage in sorted(stages):
+            count, total, outcomes, samples = stages[stage]
+            summary[stage] = {"count": count, "total": total,
+                              "outcomes": outcomes}
+            for q in QUANTILES:
+                summary[stage][f"p{round(q * 100)}"] = quantile(samples, q)
+        return summary
+
+    def format_summary(self) -> str:
+        """Format the summary as a table, with latencies in milliseconds."""
+        lines = [f"{'Stage':<20} {'Count':>8} {'p50 ms':>9} {'p95 ms':>9} "
+                 f"{'p99 ms':>9}  Outcomes"]
+        for stage, stats in self.summary().items():
+            outcomes = ", ".join(f"{outcome}={count}" for outcome, count
+                                 in sorted(stats["outcomes"].items()))
+            lines.append(f"{stage:<20} {stats['count']:>8} "
+                         f"{stats['p50'] * 1000:>9.2f} {stats['p95'] * 1000:>9.2f} "
+                         f"{stats['p99'] * 1000:>9.2f}  {outcomes}")
+        return "\n".join(lines)
+
+    def to_json(self) -> str:
+        """Encode the summary as JSON."""
+        return json.dumps(self.summary(), indent=2)
+
+    def to_prometheus(self, prefix: str = "url_analyzer") -> str:
+        """Format the summary in the Prometheus text exposition format."""
+        name = f"{prefix}_stage_duration_seconds"
+        outcomes_name = f"{prefix}_stage_outcomes_total"
+        lines = [f"# HELP {name} Duration of analysis stages.",
+                 f"# TYPE {name} summary"]
+        summary = self.summary()
+        for stage, stats in summary.items():
+            for q in QUANTILES:
+                lines.append(f'{name}{{stage="{stage}",quantile="{q}"}} '
+                             f'{stats[f"p{round(q * 100)}"]}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {stats["total"]}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {stats["count"]}')
+        lines += [f"# HELP {outcomes_name} Analysis stage runs by outcome.",
+                  f"# TYPE {outcomes_name} counter"]
+        for stage, stats in summary.items():
+            for outcome, count in sorted(stats["outcomes"].items()):
+                lines.append(f'{outcomes_name}{{stage="{stage}",'
+                             f'outcome="{outcome}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str) -> None:
+        """Write the summary to a file: JSON if path ends in .json, else
+        Prometheus text."""
+        text = self.to_json() if path.endswith('.json') else self.to_prometheus()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+
+def timer(instrumentation: Optional[Instrumentation],
+          stage: str) -> ContextManager[Span]:
+    """Time a stage if instrumentation is given, else do nothing."""
+    if instrumentation is None:
+        return nullcontext(Span())
+    return instrumentation.timer(stage)
@@ -0,0 +1,219 @@
+"""Registrable domain extraction driven by the Public Suffix List.
+
+The list (https://publicsuffix.org/) is compiled into a trie keyed by
+reversed domain labels, so a lookup costs one dict access per label of the
+host name. The bundled copy is parsed on first use; a pre-compiled binary
+snapshot can be written with compile_snapshot() and loaded instead for
+faster startup:
+
+    python -m url_analyzer.utils.public_suffix compile psl.snapshot
+    export URL_ANALYZER_PSL_SNAPSHOT=psl.snapshot
+"""
+import os
+import pickle
+import sys
+import threading
+from typing import Any, Dict, Iterable, Optional
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                         "data", "public_suffix_list.dat")
+SNAPSHOT_ENV = "URL_ANALYZER_PSL_SNAPSHOT"
+SNAPSHOT_FORMAT = 1
+
+# Key under which a trie node records the kind of rule ending there. The
+# empty string never occurs as a label of a valid host name.
+_FLAG = ""
+_RULE = 1
+_EXCEPTION = 2
+_WILDCARD = "*"
+
+
+def _punycode(rule: str) -> Optional[str]:
+    """Get the ASCII form of an internationalized rule, if it has one."""
+    try:
+        return rule.encode("idna").decode("ascii")
+    except UnicodeError:
+        return None
+
+
+class PublicSuffixList:
+    """Public suffixes compiled into a reversed-label trie."""
+
+    def __init__(self, trie: Dict[str, Any], version: str = ""):
+        """Initialize from an already compiled trie.
+
+        Use from_lines(), from_file() or load_snapshot() to build one.
+        """
+        self._trie = trie
+        self.version = version
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[str],
+                   include_private: bool = False) -> "PublicSuffixList":
+        """Compile the rules of a list in the publicsuffix.org format.
+
+        Args:
+            lines: Lines of the list
+            include_private: Also honour suffixes from the PRIVATE DOMAINS
+                section (e.g. github.io), treating hosted sites as
+                separately registered
+        """
+        trie: Dict[str, Any] = {}
+        version = ""
+        for line in lines:
+            line = line.strip()
+            if line.startswith("// VERSION:"):
+                version = line[len("// VERSION:"):].strip()
+            elif line == "// ===BEGIN PRIVATE DOMAINS===" and not include_private:
+                break
+            if not line or line.startswith("//"):
+                continue
+
+            rule = line.split()[0].lower()
+            kind = _RULE
+            if rule.startswith("!"):
+                rule, kind = rule[1:], _EXCEPTION
+            forms = {rule}
+            ascii_rule = _punycode(rule)
+            if ascii_rule:
+                forms.add(ascii_rule)
+
+            for form in forms:
+                node = trie
+                for label in reversed(form.split(".")):
+                    node = node.setdefault(label, {})
+                node[_FLAG] = kind
+
+        return cls(trie, version)
+
+    @classmethod
+    def from_file(cls, path: str = DATA_FILE,
+                  include_private: bool = False) -> "PublicSuffixList":
+        """Compile a list file, by default the bundled copy."""
+        with open(path, encoding="utf-8") as f:
+            return cls.from_lines(f, include_private)
+
+    @classmethod
+    def load_snapshot(cls, path: str) -> "PublicSuffixList":
+        """Load a trie written by save_snapshot().
+
+        Only load snapshots you created: they are pickle files.
+
+        Raises:
+            ValueError: If the file is not a snapshot in a known format
+        """
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+        if not isinstance(data, dict) or data.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"Not a public suffix snapshot: {path}")
+        return cls(data["trie"], data["version"])
+
+    def save_snapshot(self, path: str) -> None:
+        """Write the compiled trie to a binary snapshot file."""
+        data = {"format": SNAPSHOT_FORMAT, "version": self.version,
+                "trie": self._trie}
+        with open(path, "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def suffix_length(self, host: str) -> int:
+        """Get the number of labels of the public suffix of a host.
+
+        Args:
+            host: Lowercase host name without port or trailing dot
+        """
+        labels = host.split(".")
+        node = self._trie
+        # Hosts matching no rule fall back to the implicit "*" rule
+        length = 1
+        depth = 0
+        for label in reversed(labels):
+            depth += 1
+            child = node.get(label)
+            wildcard = node.get(_WILDCARD)
+            if child is not None:
+                flag = child.get(_FLAG)
+                if flag == _EXCEPTION:
+                    return depth - 1
+                if flag == _RULE or wildcard is not None:
+                    length = depth
+                node = child
+            elif wildcard is not None:
+                length = depth
+                node = wildcard
+            else:
+                break
+        return length
+
+    def public_suffix(self, host: str) -> str:
+        """Get the public suffix of a host, e.g. 'co.uk'."""
+        labels = host.split(".")
+        return ".".join(labels[len(labels) - self.suffix_length(host):])
+
+    def registrable_domain(self, host: str) -> str:
+        """Get the registrable domain of a host, e.g. 'example.co.uk'.
+
+        Hosts that are public suffixes themselves, and IP addresses, are
+        returned unchanged.
+        """
+        if not host or host[-1].isdigit() or host[0] == "[":
+            return host
+        labels = host.split(".")
+        length = self.suffix_length(host) + 1
+        if length >= len(labels):
+            return host
+        return ".".join(labels[-length:])
+
+
+_default_list: Optional[PublicSuffixList] = None
+_default_list_lock = threading.Lock()
+
+
+def get_default_list() -> PublicSuffixList:
+    """Get the shared list, loading it on first use.
+
+    The snapshot named by $URL_ANALYZER_PSL_SNAPSHOT is used when set,
+    otherwise the bundled list is compiled.
+    """
+    global _default_list
+    if _default_list is None:
+        with _default_list_lock:
+            if _default_list is None:
+                snapshot = os.environ.get(SNAPSHOT_ENV)
+                if snapshot:
+                    _default_list = PublicSuffixList.load_snapshot(snapshot)
+                else:
+                    _default_list = PublicSuffixList.from_file()
+    return _default_list
+
+
+def compile_snapshot(path: str, source: str = DATA_FILE,
+                     include_private: bool = False) -> PublicSuffixList:
+    """Compile a list file and write it as a snapshot."""
+    suffix_list = PublicSuffixList.from_file(source, include_private)
+    suffix_list.save_snapshot(path)
+    return suffix_list
+
+
+def main(argv: Optional[list] = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Compile the Public Suffix List into a binary snapshot"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    compile_parser = subparsers.add_parser("compile", help="Write a snapshot")
+    compile_parser.add_argument("output", help="Snapshot file to write")
+    compile_parser.add_argument("--source", default=DATA_FILE,
+                                help="List file (default: bundled copy)")
+    compile_parser.add_argument("--include-private", action="store_true",
+                                help="Include the PRIVATE DOMAINS section")
+    args = parser.parse_args(argv)
+
+    suffix_list = compile_snapshot(args.output, args.source,
+                                   args.include_private)
+    print(f"Wrote {args.output} (list version {suffix_list.version or 'unknown'})",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import asyncio
+import threading
+import dns.resolver
+import pytest
+from unittest.mock import AsyncMock, Mock
+from url_analyzer.analyzers.async_dns_analyzer import AsyncDNSAnalyzer
+from url_analyzer.analyzers.dns_cache import PersistentDNSCache
+from url_analyzer.core.main_analyzer import MainAnalyzer
+
+@pytest.fixture
+def mock_resolver():
+    resolver = Mock()
+    resolver.nameservers = ['8.8.8.8', '8.8.4.4']
+    resolver.resolve = AsyncMock()
+    return resolver
+
+def test_async_dns_analyzer_init():
+    """Test async DNS analyzer initialization."""
+    analyzer = AsyncDNSAnalyzer(
+        "example.com",
+        resolver=AsyncDNSAnalyzer.create_resolver(['192.0.2.1'], timeout=1.5)
+    )
+    assert analyzer.domain == "example.com"
+    assert analyzer.resolver.nameservers == ['192.0.2.1']
+    assert analyzer.resolver.timeout == 1.5
+
+def test_get_a_records(mock_resolver):
+    """Test getting A records asynchronously."""
+    mock_answer = Mock()
+    mock_answer.address = "93.184.216.34"
+    mock_resolver.resolve.return_value = [mock_answer]
+
+    analyzer = AsyncDNSAnalyzer("example.com", resolver=mock_resolver)
+    records = asyncio.run(analyzer.get_a_records())
+
+    assert records == ["93.184.216.34"]
+    mock_resolver.resolve.assert_awaited_once_with("example.com", "A")
+
+def test_record_error_handling(mock_resolver):
+    """Test failed queries yield empty results."""
+    mock_resolver.resolve.side_effect = Exception("DNS query failed")
+
+    analyzer = AsyncDNSAnalyzer("example.com", resolver=mock_resolver)
+
+    assert asyncio.run(analyzer.get_mx_records()) == []
+    assert asyncio.run(analyzer.get_soa_record()) == {}
+
+def test_analyze_method(mock_resolver):
+    """Test complete async DNS analysis."""
+    mock_a = Mock()
+    mock_a.address = "93.184.216.34"
+    mock_mx = Mock()
+    mock_mx.exchange = "mail.example.com"
+    mock_mx.preference = 10
+
+    async def mock_resolve(domain, record_type):
+        if record_type == "A":
+            return [mock_a]
+        elif record_type == "MX":
+            return [mock_mx]
+        raise Exception(f"No {record_type} record")
+
+    mock_resolver.resolve.side_effect = mock_resolve
+
+    analyzer = AsyncDNSAnalyzer("example.com", resolver=mock_resolver)
+    result = asyncio.run(analyzer.analyze_async())
+
+    assert result["info"]["domain"] == "example.com"
+    assert list(result["records"]) == [key for key, _ in AsyncDNSAnalyzer.RECORD_METHODS]
+    assert result["records"]["a_records"] == ["93.184.216.34"]
+    assert result["records"]["mx_records"] == [
+        {"exchange": "mail.example.com", "preference": 10}
+    ]
+    assert result["records"]["soa_record"] == {}
+    assert mock_resolver.resolve.await_count == 7
+
+def test_analyze_selected_record_types(mock_resolver):
+    """Test only the requested record types are queried."""
+    mock_resolver.resolve.side_effect = Exception("No record")
+
+    analyzer = AsyncDNSAnalyzer("example.com", resolver=mock_resolver)
+    result = asyncio.run(analyzer.analyze_async(["MX"]))
+
+    assert result["records"] == {"mx_records": []}
+    mock_resolver.resolve.assert_awaited_once_with("example.com", "MX")
+
+def test_analyze_deadline(mock_resolver):
+    """Test records still pending at the deadline are reported empty."""
+    mock_a = Mock()
+    mock_a.address = "93.184.216.34"
+
+    async def mock_resolve(domain, record_type):
+        if record_type == "A":
+            return [mock_a]
+        await asyncio.sleep(5)
+
+    mock_resolver.resolve.side_effect = mock_resolve
+
+    analyzer = AsyncDNSAnalyzer("example.com", deadline=0.1, resolver=mock_resolver)
+    result = asyncio.run(analyzer.analyze_async())
+
+    assert result["records"]["a_records"] == ["93.184.216.34"]
+    assert result["records"]["txt_records"] == []
+    assert result["records"]["soa_record"] == {}
+
+def test_main_analyzer_analyze_async(mock_resolver):
+    """Test MainAnalyzer runs DNS analysis on the event loop."""
+    mock_a = Mock()
+    mock_a.address = "93.184.216.34"
+
+    async def mock_resolve(domain, record_type):
+        assert domain == "example.com"
+        if record_type == "A":
+            return [mock_a]
+        raise Exception(f"No {record_type} record")
+
+    mock_resolver.resolve.side_effect = mock_resolve
+
+    analyzer = MainAnalyzer("https://example.com/path")
+    result = asyncio.run(analyzer.analyze_async(resolver=mock_resolver))
+
+    assert result["info"]["domain"] == "example.com"
+    assert result["url_analysis"]["normalized_url"] == "https://example.com/path"
+    assert result["dns_analysis"]["records"]["a_records"] == ["93.184.216.34"]
+
+def test_analyze_runs_own_loop(mock_resolver):
+    """Test analyze() runs the analysis outside a running loop."""
+    mock_resolver.resolve.side_effect = Exception("No record")
+
+    analyzer = AsyncDNSAnalyzer("example.com", resolver=mock_resolver)
+
+    assert analyzer.analyze(["MX"])["records"] == {"mx_records": []}
+
+def test_persistent_cache_off_loop(mock_resolver, tmp_path):
+    """Test a persistent cache is read and written in worker threads."""
+    threads = []
+
+    class RecordingCache(PersistentDNSCache):
+        def get(self, *args):
+            threads.append(threading.get_ident())
+            return super().get(*args)
+
+        def put_negative(self, *args):
+            threads.append(threading.get_ident())
+            super().put_negative(*args)
+
+    mock_resolver.resolve.side_effect = dns.resolver.NXDOMAIN()
+    cache = RecordingCache(str(tmp_path))
+    try:
+        analyzer = AsyncDNSAnalyzer("example.com", resolver=mock_resolver,
+                                    cache=cache)
+        asyncio.run(analyzer.analyze_async(["A"]))
+        assert cache.get("example.com", "A") is not None
+    finally:
+        cache.close()
+
+    assert len(threads) == 3
+    assert threading.get_ident() not in threads[:2]
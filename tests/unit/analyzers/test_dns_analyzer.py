@@ -1,24 +1,54 @@
+import threading
+import time
+import dns.exception
 import pytest
 from unittest.mock import Mock, patch
 from url_analyzer.analyzers.dns_analyzer import DNSAnalyzer
+from url_analyzer.analyzers.retry import RetryPolicy
 from url_analyzer.utils.exceptions import DNSAnalyzerError
 
 def test_dns_analyzer_init():
     """Test DNS analyzer initialization."""
-    analyzer = DNSAnalyzer("example.com")
+    analyzer = DNSAnalyzer("example.com", nameservers=['192.0.2.1'],
+                           timeout=1.5, lifetime=4.0)
     assert analyzer.domain == "example.com"
-    assert analyzer.resolver.nameservers == ['8.8.8.8', '8.8.4.4']
+    assert analyzer.resolver.nameservers == ['192.0.2.1']
+    assert analyzer.resolver.timeout == 1.5
+    assert analyzer.resolver.lifetime == 4.0
+
+def test_dns_analyzer_nameservers_from_environment(monkeypatch):
+    """Test nameservers and timeouts are read from the environment."""
+    monkeypatch.setenv("URL_ANALYZER_NAMESERVERS", "192.0.2.1, 192.0.2.2")
+    monkeypatch.setenv("URL_ANALYZER_DNS_TIMEOUT", "0.5")
+    monkeypatch.setenv("URL_ANALYZER_DNS_PORT", "5353")
+    analyzer = DNSAnalyzer("example.com")
+    assert analyzer.resolver.nameservers == ['192.0.2.1', '192.0.2.2']
+    assert analyzer.resolver.timeout == 0.5
+    assert analyzer.resolver.port == 5353
 
 @patch('dns.resolver.Resolver')
 def test_get_info(mock_resolver):
     """Test getting basic DNS information."""
-    analyzer = DNSAnalyzer("example.com")
+    analyzer = DNSAnalyzer("example.com", nameservers=['192.0.2.1'])
     info = analyzer.get_info()
     
     assert isinstance(info, dict)
     assert info["domain"] == "example.com"
     assert isinstance(info["nameservers"], list)
-    assert info["nameservers"] == ['8.8.8.8', '8.8.4.4']
+    assert info["nameservers"] == ['192.0.2.1']
+
+def test_analyze_through_pool():
+    """Test queries are sent through a resolver pool when given."""
+    mock_answer = Mock()
+    mock_answer.address = "93.184.216.34"
+    pool = Mock()
+    pool.resolve.return_value = [mock_answer]
+    pool.ordered.return_value = ['192.0.2.2', '192.0.2.1']
+
+    analyzer = DNSAnalyzer("example.com", pool=pool)
+    assert analyzer.get_a_records() == ["93.184.216.34"]
+    assert analyzer.get_info()["nameservers"] == ['192.0.2.2', '192.0.2.1']
+    pool.resolve.assert_called_once_with("example.com", "A")
 
 @patch('dns.resolver.Resolver')
 def test_get_a_records(mock_resolver):
@@ -200,3 +230,142 @@ def test_analyze_method(mock_resolver):
     assert result["info"]["domain"] == "example.com"
     assert result["records"]["a_records"] == ["93.184.216.34"]
     assert result["records"]["soa_record"]["mname"] == "ns1.example.com"
+
+@patch('dns.resolver.Resolver')
+@pytest.mark.parametrize("concurrent", [False, True])
+def test_analyze_selected_record_types(mock_resolver, concurrent):
+    """Test only the requested record types are queried and reported."""
+    mock_a = Mock()
+    mock_a.address = "93.184.216.34"
+    resolver_instance = mock_resolver.return_value
+    resolver_instance.resolve.return_value = [mock_a]
+
+    analyzer = DNSAnalyzer("example.com", concurrent=concurrent)
+    result = analyzer.analyze(["aaaa", "A"])
+
+    assert list(result["records"]) == ["a_records", "aaaa_records"]
+    assert sorted(call.args[1] for call in resolver_instance.resolve.call_args_list) == [
+        "A", "AAAA"
+    ]
+
+def test_analyze_unsupported_record_type():
+    """Test unknown record types are rejected before querying."""
+    with pytest.raises(ValueError, match="Unsupported record types: PTR"):
+        DNSAnalyzer("example.com").analyze(["A", "PTR"])
+
+@patch('dns.resolver.Resolver')
+def test_analyze_concurrent_matches_sequential(mock_resolver):
+    """Test concurrent analysis returns the same records as sequential."""
+    mock_a = Mock()
+    mock_a.address = "93.184.216.34"
+    mock_ns = Mock()
+    mock_ns.target = "ns1.example.com"
+
+    def mock_resolve(domain, record_type):
+        if record_type == "A":
+            return [mock_a]
+        elif record_type == "NS":
+            return [mock_ns]
+        raise Exception(f"No {record_type} record")
+
+    resolver_instance = mock_resolver.return_value
+    resolver_instance.resolve.side_effect = mock_resolve
+
+    sequential = DNSAnalyzer("example.com").analyze()
+    concurrent = DNSAnalyzer("example.com", concurrent=True).analyze()
+
+    assert concurrent == sequential
+    assert list(concurrent["records"]) == [key for key, _ in DNSAnalyzer.RECORD_METHODS]
+    assert resolver_instance.resolve.call_count == 14
+
+@patch('dns.resolver.Resolver')
+def test_analyze_concurrent_deadline(mock_resolver):
+    """Test records still pending at the deadline are reported empty."""
+    release = threading.Event()
+    mock_a = Mock()
+    mock_a.address = "93.184.216.34"
+
+    def mock_resolve(domain, record_type):
+        if record_type == "A":
+            return [mock_a]
+        release.wait(5)
+        raise Exception("timed out")
+
+    resolver_instance = mock_resolver.return_value
+    resolver_instance.resolve.side_effect = mock_resolve
+    resolver_instance.lifetime = 5.0
+
+    analyzer = DNSAnalyzer("example.com", concurrent=True, deadline=0.2)
+    start = time.monotonic()
+    try:
+        result = analyzer.analyze()
+    finally:
+        release.set()
+
+    assert time.monotonic() - start < 2
+    assert resolver_instance.lifetime == 0.2
+    assert result["records"]["a_records"] == ["93.184.216.34"]
+    assert result["records"]["mx_records"] == []
+    assert result["records"]["soa_record"] == {}
+
+def test_deadline_keeps_shorter_lifetime():
+    """Test the deadline only bounds concurrent analyses and never
+    lengthens the lifetime."""
+    analyzer = DNSAnalyzer("example.com", concurrent=True, deadline=10,
+                           nameservers=['192.0.2.1'], lifetime=2.0)
+    assert analyzer.resolver.lifetime == 2.0
+    analyzer = DNSAnalyzer("example.com", concurrent=True, deadline=1,
+                           nameservers=['192.0.2.1'], lifetime=2.0)
+    assert analyzer.resolver.lifetime == 1
+    analyzer = DNSAnalyzer("example.com", deadline=1,
+                           nameservers=['192.0.2.1'], lifetime=2.0)
+    assert analyzer.resolver.lifetime == 2.0
+
+@patch('dns.resolver.Resolver')
+def test_abandoned_queries_keep_out_of_next_analysis(mock_resolver):
+    """Test queries outliving a deadline don't write into the next
+    analysis's errors."""
+    release = threading.Event()
+    finished = threading.Event()
+
+    def mock_resolve(domain, record_type, **kwargs):
+        if record_type == "MX" and not release.is_set():
+            release.wait(5)
+            finished.set()
+            raise dns.exception.Timeout()
+        return []
+
+    resolver_instance = mock_resolver.return_value
+    resolver_instance.resolve.side_effect = mock_resolve
+    resolver_instance.lifetime = 5.0
+
+    analyzer = DNSAnalyzer("example.com", concurrent=True, deadline=0.2)
+    first = analyzer.analyze_result(["A", "MX"])
+    assert set(first.errors) == {"MX"}
+
+    second = analyzer.analyze_result(["A"])
+    release.set()
+    assert finished.wait(5)
+    assert second.errors is None
+    assert analyzer.errors == {}
+
+def test_retries_stop_at_deadline():
+    """Test no retry through a pool starts after the deadline."""
+    def slow_timeout(*args, **kwargs):
+        time.sleep(0.15)
+        raise dns.exception.Timeout()
+
+    pool = Mock()
+    pool.resolve.side_effect = slow_timeout
+    retry = RetryPolicy(attempts=10, backoff=0)
+    analyzer = DNSAnalyzer("example.com", concurrent=True, deadline=0.3,
+                           pool=pool, retry=retry)
+    start = time.monotonic()
+    result = analyzer.analyze_result(["A"])
+    time.sleep(0.3)
+
+    assert time.monotonic() - start < 1
+    assert pool.resolve.call_count <= 3
+    assert all(call.kwargs["lifetime"] <= 0.3
+               for call in pool.resolve.call_args_list)
+    assert "deadline" in result.errors["A"]
@@ -0,0 +1,187 @@
+import dns.message
+import dns.resolver
+import dns.rrset
+import pytest
+from unittest.mock import Mock, patch
+from url_analyzer.analyzers.dns_analyzer import DNSAnalyzer
+from url_analyzer.analyzers.dns_cache import (
+    DNSCache, PersistentDNSCache, answer_ttl, deserialize_answers,
+    get_default_cache, negative_ttl
+)
+from url_analyzer.utils.exceptions import DNSAnalyzerError
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def make_nxdomain(soa_ttl, soa_minimum):
+    """Build an NXDOMAIN error whose response carries an SOA record."""
+    query = dns.message.make_query("missing.example.com", "A")
+    response = dns.message.make_response(query)
+    response.authority.append(dns.rrset.from_text(
+        "example.com.", soa_ttl, "IN", "SOA",
+        f"ns1.example.com. hostmaster.example.com. 1 7200 3600 1209600 {soa_minimum}"
+    ))
+    qname = query.question[0].name
+    return dns.resolver.NXDOMAIN(qnames=[qname], responses={qname: response})
+
+def test_cache_hit_and_miss():
+    """Test cached answers are returned and counted."""
+    cache = DNSCache()
+    assert cache.get("example.com", "A") is None
+    cache.put("example.com", "A", ["93.184.216.34"], ttl=60)
+
+    entry = cache.get("EXAMPLE.com.", "a")
+    assert entry.unwrap() == ["93.184.216.34"]
+    assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 0, "size": 1}
+
+def test_cache_ttl_expiry():
+    """Test entries expire after their TTL."""
+    clock = FakeClock()
+    cache = DNSCache(clock=clock)
+    cache.put("example.com", "A", ["93.184.216.34"], ttl=60)
+
+    clock.now += 59
+    assert cache.get("example.com", "A") is not None
+    clock.now += 1
+    assert cache.get("example.com", "A") is None
+    assert len(cache) == 0
+
+def test_cache_uses_answer_ttl():
+    """Test the TTL is taken from the answer's RRset."""
+    answers = Mock()
+    answers.rrset.ttl = 42
+    assert answer_ttl(answers) == 42
+    assert answer_ttl(["no-rrset"], default=7) == 7
+
+def test_cache_lru_eviction():
+    """Test the least recently used entry is evicted when full."""
+    cache = DNSCache(max_size=2)
+    cache.put("a.com", "A", [1], ttl=60)
+    cache.put("b.com", "A", [2], ttl=60)
+    cache.get("a.com", "A")
+    cache.put("c.com", "A", [3], ttl=60)
+
+    assert cache.get("b.com", "A") is None
+    assert cache.get("a.com", "A") is not None
+    assert cache.get("c.com", "A") is not None
+    assert cache.evictions == 1
+
+def test_negative_entry_raises():
+    """Test negative entries re-raise the original error."""
+    cache = DNSCache()
+    cache.put_negative("missing.com", "A", "Failed to get A records", ttl=60)
+
+    with pytest.raises(DNSAnalyzerError, match="Failed to get A records"):
+        cache.get("missing.com", "A").unwrap()
+
+def test_negative_ttl_from_soa():
+    """Test negative TTL is the lesser of the SOA TTL and minimum."""
+    assert negative_ttl(make_nxdomain(soa_ttl=900, soa_minimum=300)) == 300
+    assert negative_ttl(make_nxdomain(soa_ttl=120, soa_minimum=300)) == 120
+    assert negative_ttl(Exception("no response"), default=5) == 5
+
+def test_default_cache_is_shared():
+    """Test the process-wide cache is a singleton."""
+    assert get_default_cache() is get_default_cache()
+
+@patch('dns.resolver.Resolver')
+def test_dns_analyzer_shares_cache(mock_resolver):
+    """Test analyzers sharing a cache query each record only once."""
+    mock_answer = Mock()
+    mock_answer.address = "93.184.216.34"
+    resolver_instance = mock_resolver.return_value
+    resolver_instance.resolve.return_value = [mock_answer]
+
+    cache = DNSCache()
+    for _ in range(3):
+        assert DNSAnalyzer("example.com", cache=cache).get_a_records() == ["93.184.216.34"]
+
+    resolver_instance.resolve.assert_called_once_with("example.com", "A")
+    assert cache.hits == 2
+
+@patch('dns.resolver.Resolver')
+def test_dns_analyzer_caches_negative_answers(mock_resolver):
+    """Test NXDOMAIN answers are cached while other failures are not."""
+    resolver_instance = mock_resolver.return_value
+    resolver_instance.resolve.side_effect = make_nxdomain(900, 300)
+
+    cache = DNSCache()
+    assert DNSAnalyzer("missing.example.com", cache=cache).get_a_records() == []
+    assert DNSAnalyzer("missing.example.com", cache=cache).get_a_records() == []
+    assert resolver_instance.resolve.call_count == 1
+
+    resolver_instance.resolve.side_effect = dns.resolver.LifetimeTimeout(
+        timeout=1.0, errors=[])
+    assert DNSAnalyzer("slow.example.com", cache=cache).get_a_records() == []
+    assert DNSAnalyzer("slow.example.com", cache=cache).get_a_records() == []
+    assert resolver_instance.resolve.call_count == 3
+
+def make_answers(record_type, *texts):
+    """Build real rdata objects as returned in a dnspython Answer."""
+    return deserialize_answers(record_type, list(texts))
+
+def test_persistent_cache_survives_reopen(tmp_path):
+    """Test answers written by one cache are served by the next."""
+    cache = PersistentDNSCache(str(tmp_path))
+    cache.put("example.com", "MX", make_answers("MX", "10 mail.example.com."), ttl=300)
+    cache.put_negative("missing.com", "A", "Failed to get A records", ttl=300)
+    cache.close()
+
+    reopened = PersistentDNSCache(str(tmp_path))
+    answers = reopened.get("example.com", "MX").unwrap()
+    assert answers[0].preference == 10
+    assert str(answers[0].exchange) == "mail.example.com."
+    with pytest.raises(DNSAnalyzerError):
+        reopened.get("missing.com", "A").unwrap()
+    assert reopened.stats()["hits"] == 2
+    reopened.close()
+
+def test_persistent_cache_expiry(tmp_path):
+    """Test stored entries expire by wall-clock time across runs."""
+    wall_clock = FakeClock()
+    cache = PersistentDNSCache(str(tmp_path), wall_clock=wall_clock)
+    cache.put("example.com", "A", make_answers("A", "93.184.216.34"), ttl=60)
+    cache.close()
+
+    wall_clock.now += 30
+    reopened = PersistentDNSCache(str(tmp_path), wall_clock=wall_clock)
+    assert reopened.get("example.com", "A") is not None
+    reopened.close()
+
+    wall_clock.now += 30
+    expired = PersistentDNSCache(str(tmp_path), wall_clock=wall_clock)
+    assert expired.get("example.com", "A") is None
+    assert expired.misses == 1
+    expired.close()
+
+def test_persistent_cache_skips_unserializable(tmp_path):
+    """Test answers without a text form are only cached in memory."""
+    cache = PersistentDNSCache(str(tmp_path))
+    cache.put("example.com", "A", ["not-rdata"], ttl=60)
+    assert cache.get("example.com", "A").unwrap() == ["not-rdata"]
+    cache.close()
+
+    reopened = PersistentDNSCache(str(tmp_path))
+    assert reopened.get("example.com", "A") is None
+    reopened.close()
+
+def test_caches_are_not_copied_between_processes(tmp_path):
+    """Test pickled caches map to the receiving process's own caches."""
+    import pickle
+    default = get_default_cache()
+    assert pickle.loads(pickle.dumps(default)) is default
+
+    cache = DNSCache(max_size=5)
+    cache.put("example.com", "A", [1], ttl=60)
+    copy = pickle.loads(pickle.dumps(cache))
+    assert copy.max_size == 5 and len(copy) == 0
+
+    persistent = PersistentDNSCache(str(tmp_path))
+    reopened = pickle.loads(pickle.dumps(persistent))
+    assert reopened.path == persistent.path
+    assert pickle.loads(pickle.dumps(persistent)) is reopened
+    persistent.close()
@@ -0,0 +1,160 @@
+import socket
+import socketserver
+import struct
+import threading
+import dns.flags
+import dns.message
+import dns.rcode
+import dns.rdatatype
+import dns.resolver
+import dns.rrset
+import pytest
+from url_analyzer.analyzers.dns_analyzer import DNSAnalyzer
+from url_analyzer.analyzers.dns_transport import DNSTransport
+
+RECORDS = {
+    ("example.com.", "A"): ["93.184.216.34"],
+    ("example.com.", "MX"): ["10 mail.example.com."],
+    ("example.com.", "TXT"): ['"v=spf1 -all"'],
+}
+
+def respond(wire, truncate=()):
+    """Build the wire response of the stub nameserver to a query."""
+    query = dns.message.from_wire(wire)
+    response = dns.message.make_response(query)
+    question = query.question[0]
+    name = question.name.to_text()
+    record_type = dns.rdatatype.to_text(question.rdtype)
+    if not name.endswith("example.com."):
+        response.set_rcode(dns.rcode.NXDOMAIN)
+    elif record_type in truncate:
+        response.flags |= dns.flags.TC
+    elif (name, record_type) in RECORDS:
+        response.answer.append(dns.rrset.from_text_list(
+            name, 300, "IN", record_type, RECORDS[(name, record_type)]))
+    return response.to_wire()
+
+class StubNameserver:
+    """Nameserver on localhost answering from RECORDS over UDP and TCP.
+
+    Record types in "truncate" are answered with the TC bit over UDP.
+    """
+
+    def __init__(self, truncate=()):
+        self.truncate = truncate
+        self.udp_queries = 0
+        self.tcp_queries = 0
+        self.udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.udp.bind(("127.0.0.1", 0))
+        self.port = self.udp.getsockname()[1]
+        stub = self
+
+        class TCPHandler(socketserver.BaseRequestHandler):
+            def handle(self):
+                length = struct.unpack("!H", self.request.recv(2))[0]
+                stub.tcp_queries += 1
+                wire = respond(self.request.recv(length))
+                self.request.sendall(struct.pack("!H", len(wire)) + wire)
+
+        self.tcp = socketserver.TCPServer(("127.0.0.1", self.port), TCPHandler)
+        threading.Thread(target=self._serve_udp, daemon=True).start()
+        threading.Thread(target=self.tcp.serve_forever, daemon=True).start()
+
+    def _serve_udp(self):
+        while True:
+            try:
+                wire, address = self.udp.recvfrom(65535)
+            except OSError:
+                return
+            self.udp_queries += 1
+            self.udp.sendto(respond(wire, self.truncate), address)
+
+    def close(self):
+        self.udp.close()
+        self.tcp.shutdown()
+        self.tcp.server_close()
+
+@pytest.fixture
+def nameserver():
+    stub = StubNameserver(truncate=("TXT",))
+    yield stub
+    stub.close()
+
+def test_query_many(nameserver):
+    """Test all record types of a name are answered in one call."""
+    transport = DNSTransport("127.0.0.1", nameserver.port, timeout=2.0)
+    results = transport.query_many("example.com", ["A", "MX", "TXT", "NS"])
+
+    assert [rdata.address for rdata in results["A"]] == ["93.184.216.34"]
+    assert str(results["MX"][0].exchange) == "mail.example.com."
+    assert isinstance(results["NS"], dns.resolver.NoAnswer)
+    # The truncated TXT answer is fetched again over TCP
+    assert results["TXT"][0].strings == (b"v=spf1 -all",)
+    assert nameserver.udp_queries == 4
+    assert nameserver.tcp_queries == 1
+
+def test_query_many_nxdomain(nameserver):
+    """Test negative answers are reported as NXDOMAIN errors."""
+    transport = DNSTransport("127.0.0.1", nameserver.port, timeout=2.0)
+    results = transport.query_many("example.org", ["A"])
+    assert isinstance(results["A"], dns.resolver.NXDOMAIN)
+
+def test_query_many_duplicate_ids(nameserver, monkeypatch):
+    """Test queries given the same random ID are all sent and answered."""
+    make_query = dns.message.make_query
+
+    def same_id(*args, **kwargs):
+        query = make_query(*args, **kwargs)
+        query.id = 1234
+        return query
+
+    monkeypatch.setattr(dns.message, "make_query", same_id)
+    transport = DNSTransport("127.0.0.1", nameserver.port, timeout=2.0)
+    results = transport.query_many("example.com", ["A", "MX", "AAAA"])
+    assert [rdata.address for rdata in results["A"]] == ["93.184.216.34"]
+    assert str(results["MX"][0].exchange) == "mail.example.com."
+    assert isinstance(results["AAAA"], dns.resolver.NoAnswer)
+    assert nameserver.udp_queries == 3
+
+def test_query_many_reuses_sockets(nameserver):
+    """Test consecutive calls share one socket."""
+    transport = DNSTransport("127.0.0.1", nameserver.port, timeout=2.0)
+    transport.query_many("example.com", ["A"])
+    transport.query_many("example.com", ["A"])
+    assert len(transport._idle) == 1
+    transport.close()
+    assert transport._idle == []
+
+def test_query_many_timeout():
+    """Test queries nobody answers time out."""
+    silent = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    silent.bind(("127.0.0.1", 0))
+    try:
+        transport = DNSTransport("127.0.0.1", silent.getsockname()[1], timeout=0.1)
+        results = transport.query_many("example.com", ["A", "AAAA"])
+    finally:
+        silent.close()
+    assert isinstance(results["A"], dns.resolver.LifetimeTimeout)
+    assert isinstance(results["AAAA"], dns.resolver.LifetimeTimeout)
+
+def test_dns_analyzer_with_transport(nameserver):
+    """Test the analyzer sends one round of queries through a transport."""
+    transport = DNSTransport("127.0.0.1", nameserver.port, timeout=2.0)
+    result = DNSAnalyzer("example.com", transport=transport).analyze()
+
+    assert result["info"]["nameservers"] == ["127.0.0.1"]
+    records = result["records"]
+    assert records["a_records"] == ["93.184.216.34"]
+    assert records["mx_records"] == [{"exchange": "mail.example.com.",
+                                      "preference": 10}]
+    assert records["txt_records"] == ["v=spf1 -all"]
+    assert records["ns_records"] == []
+    assert records["soa_record"] == {}
+    assert nameserver.udp_queries == len(DNSAnalyzer.RECORD_TYPES)
+
+def test_dns_analyzer_port(nameserver):
+    """Test the analyzer can query a nameserver on another port."""
+    analyzer = DNSAnalyzer("example.com", nameservers=["127.0.0.1"],
+                           port=nameserver.port, timeout=2.0)
+    assert analyzer.get_a_records() == ["93.184.216.34"]
+    assert nameserver.udp_queries == 1
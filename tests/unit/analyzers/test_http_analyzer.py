@@ -0,0 +1,89 @@
+import pytest
+from url_analyzer.analyzers.http_analyzer import HTTPAnalyzer, HTTPClient
+from url_analyzer.core.main_analyzer import MainAnalyzer
+from url_analyzer.testing.http_server import HTTPTestServer
+from url_analyzer.utils.exceptions import ConnectionError, TimeoutError
+
+ROUTES = {
+    "/": {"body": "hello", "headers": {"Content-Type": "text/plain"}},
+    "/old": {"status": 301, "headers": {"Location": "/moved"}},
+    "/moved": {"status": 302, "headers": {"Location": "/"}},
+    "/loop": {"status": 302, "headers": {"Location": "/loop"}},
+    "/big": {"body": b"x" * 5000},
+    "/slow": {"body": "slow", "delay": 0.1},
+    "/stuck": {"delay": 1},
+}
+
+@pytest.fixture
+def server():
+    with HTTPTestServer(ROUTES) as server:
+        yield server
+
+@pytest.fixture
+def client():
+    with HTTPClient(timeout=0.5, max_per_host=2, max_redirects=3) as client:
+        yield client
+
+def test_fetch(server, client):
+    """Test status, headers and body size."""
+    result = client.fetch(server.url("/"))
+    assert (result["status"], result["reason"]) == (200, "OK")
+    assert result["headers"]["Content-Type"] == "text/plain"
+    assert (result["content_size"], result["truncated"]) == (5, False)
+    assert result["redirects"] == [] and result["latency"] > 0
+
+def test_fetch_truncates_body(server):
+    """Test bodies are only read up to max_body."""
+    with HTTPClient(max_body=1000) as client:
+        result = client.fetch(server.url("/big"))
+    assert (result["content_size"], result["truncated"]) == (1000, True)
+
+def test_fetch_redirects(server, client):
+    """Test the redirect chain is reported."""
+    result = client.fetch(server.url("/old"))
+    assert result["final_url"] == server.url("/")
+    assert result["redirects"] == [
+        {"url": server.url("/old"), "status": 301, "location": "/moved"},
+        {"url": server.url("/moved"), "status": 302, "location": "/"},
+    ]
+
+def test_fetch_errors(server, client):
+    """Test redirect loops and timeouts raise the package's errors."""
+    with pytest.raises(ConnectionError):
+        client.fetch(server.url("/loop"))
+    with pytest.raises(TimeoutError):
+        client.fetch(server.url("/stuck"))
+
+def test_keep_alive(server, client):
+    """Test sequential fetches reuse one connection."""
+    for _ in range(5):
+        client.fetch(server.url("/"))
+    assert server.stats()["connections"] == 1
+
+def test_fetch_many_per_host_limit(server, client):
+    """Test results keep input order and a host gets max_per_host at once."""
+    urls = [server.url("/slow")] * 8 + ["http://127.0.0.1:1/"]
+    results = list(client.fetch_many(urls, workers=8))
+    assert [result["url"] for result in results] == urls
+    assert all(result["status"] == 200 for result in results[:8])
+    assert "error" in results[8]
+    stats = server.stats()
+    assert stats["max_concurrent"] == 2 and stats["connections"] <= 2
+    # Limits of hosts with nothing in flight are dropped
+    assert client._host_limits == {}
+
+def test_analyzer_reports_errors(server, client):
+    """Test a failed fetch is reported instead of raised."""
+    analyzer = HTTPAnalyzer(server.url("/loop"), client=client)
+    assert analyzer.get_info()["max_per_host"] == 2
+    assert set(analyzer.analyze()) == {"url", "error"}
+
+def test_main_analyzer(server, client):
+    """Test the HTTP analyzer runs from MainAnalyzer when selected."""
+    result = MainAnalyzer(
+        server.url("/"), analyzers=["url_analysis", "http_analysis"],
+        analyzer_options={"http_analysis": {"client": client}}
+    ).analyze()
+    assert list(result) == ["info", "url_analysis", "http_analysis"]
+    assert result["http_analysis"]["status"] == 200
+    assert "http_analysis" not in MainAnalyzer(server.url("/")).analyzers
@@ -0,0 +1,125 @@
+import asyncio
+import pickle
+import threading
+import time
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+from url_analyzer.analyzers.async_dns_analyzer import AsyncDNSAnalyzer
+from url_analyzer.analyzers.dns_analyzer import DNSAnalyzer
+from url_analyzer.analyzers.rate_limit import QueryGovernor, TokenBucket
+
+class FakeClock:
+    """Clock advanced by the fake sleep function."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+def test_token_bucket():
+    """Test tokens are spent, then reserved ahead at the refill rate."""
+    clock = FakeClock()
+    bucket = TokenBucket(10, burst=2, clock=clock)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.1)
+    assert bucket.reserve() == pytest.approx(0.2)
+    clock.now += 1
+    assert bucket.reserve() == 0
+
+def test_token_bucket_invalid_rate():
+    """Test a bucket needs a positive rate."""
+    with pytest.raises(ValueError):
+        TokenBucket(0)
+
+def test_governor_global_rate():
+    """Test queries beyond the global rate are delayed."""
+    clock = FakeClock()
+    governor = QueryGovernor(qps=2, clock=clock, sleep=clock.sleep)
+    for server in ("192.0.2.1", "192.0.2.2", "192.0.2.3"):
+        with governor.limit(server):
+            pass
+    assert clock.sleeps == [pytest.approx(0.5)]
+    assert governor.stats() == {"queries": 3, "delayed": 1,
+                                "wait_time": pytest.approx(0.5)}
+
+def test_governor_per_server_rate():
+    """Test each nameserver has a bucket of its own."""
+    clock = FakeClock()
+    governor = QueryGovernor(qps_per_server=1, clock=clock, sleep=clock.sleep)
+    with governor.limit("192.0.2.1"):
+        pass
+    with governor.limit("192.0.2.2"):
+        pass
+    assert clock.sleeps == []
+    with governor.limit("192.0.2.1", queries=2):
+        pass
+    assert clock.sleeps == [pytest.approx(2.0)]
+
+def test_governor_max_in_flight():
+    """Test no more requests than allowed run at once."""
+    governor = QueryGovernor(max_in_flight=2)
+    lock = threading.Lock()
+    running = []
+    peak = []
+
+    def query():
+        with governor.limit():
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.02)
+            with lock:
+                running.pop()
+
+    threads = [threading.Thread(target=query) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(peak) == 2
+
+def test_governor_limit_async():
+    """Test the async limit shares slots with threads."""
+    governor = QueryGovernor(max_in_flight=1)
+
+    async def run():
+        async with governor.limit_async():
+            assert not governor._slots.acquire(blocking=False)
+        assert governor._slots.acquire(blocking=False)
+        governor._slots.release()
+
+    asyncio.run(run())
+
+def test_governor_split_and_pickle():
+    """Test worker processes get their share of the limits."""
+    governor = QueryGovernor(qps=100, qps_per_server=10, max_in_flight=3)
+    share = pickle.loads(pickle.dumps(governor.split(4)))
+    assert (share.qps, share.qps_per_server, share.max_in_flight) == (25, 2.5, 1)
+
+@patch('dns.resolver.Resolver')
+def test_dns_analyzer_with_governor(mock_resolver):
+    """Test the analyzer sends its queries through the governor."""
+    resolver_instance = mock_resolver.return_value
+    resolver_instance.resolve.side_effect = Exception("No record")
+    governor = QueryGovernor(qps=1000)
+
+    DNSAnalyzer("example.com", nameservers=['192.0.2.1'],
+                governor=governor).analyze(["A", "MX"])
+    assert governor.stats()["queries"] == 2
+
+def test_async_dns_analyzer_with_governor():
+    """Test the async analyzer sends its queries through the governor."""
+    resolver = Mock()
+    resolver.nameservers = ['192.0.2.1']
+    resolver.resolve = AsyncMock(side_effect=Exception("No record"))
+    governor = QueryGovernor(qps=1000)
+    analyzer = AsyncDNSAnalyzer("example.com", resolver=resolver, governor=governor)
+    asyncio.run(analyzer.analyze_async(["A", "AAAA", "MX"]))
+    assert governor.stats()["queries"] == 3
@@ -0,0 +1,114 @@
+import pickle
+import dns.resolver
+import pytest
+from unittest.mock import MagicMock, Mock
+from url_analyzer.analyzers.resolver_pool import (
+    FALLBACK_NAMESERVERS, ResolverPool, configure_resolver, parse_nameservers
+)
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def make_pool(responses, clock=None):
+    """Create a pool whose per-server resolvers answer from a dict.
+
+    Each server maps to (latency, result); results that are exceptions
+    are raised.
+    """
+    clock = clock or FakeClock()
+    pool = ResolverPool(list(responses), timeout=1.0, clock=clock)
+    for server, (latency, result) in responses.items():
+        def resolve(name, record_type, latency=latency, result=result):
+            clock.now += latency
+            if isinstance(result, Exception):
+                raise result
+            return result
+        pool._resolvers[server].resolve = Mock(side_effect=resolve)
+    return pool
+
+def test_parse_nameservers():
+    """Test parsing comma-separated nameserver lists."""
+    assert parse_nameservers("192.0.2.1, 192.0.2.2,") == ['192.0.2.1', '192.0.2.2']
+    assert parse_nameservers("") is None
+    assert parse_nameservers(None) is None
+
+def test_configure_resolver_precedence(monkeypatch):
+    """Test explicit settings win over the environment."""
+    monkeypatch.setenv("URL_ANALYZER_NAMESERVERS", "192.0.2.9")
+    monkeypatch.setenv("URL_ANALYZER_DNS_LIFETIME", "7")
+    resolver = configure_resolver(dns.resolver.Resolver(configure=False),
+                                  ['192.0.2.1'], timeout=0.5)
+    assert resolver.nameservers == ['192.0.2.1']
+    assert resolver.timeout == 0.5
+    assert resolver.lifetime == 7.0
+
+def test_configure_resolver_fallback(monkeypatch):
+    """Test the public fallback is only used without any nameserver."""
+    monkeypatch.delenv("URL_ANALYZER_NAMESERVERS", raising=False)
+    resolver = configure_resolver(dns.resolver.Resolver(configure=False))
+    assert resolver.nameservers == FALLBACK_NAMESERVERS
+
+def test_pool_prefers_fastest_server():
+    """Test queries go to the server with the lowest latency."""
+    pool = make_pool({"192.0.2.1": (0.3, ["slow"]), "192.0.2.2": (0.1, ["fast"])})
+    # Both unmeasured servers get probed first
+    pool.resolve("example.com", "A")
+    pool.resolve("example.com", "A")
+    assert pool.ordered() == ["192.0.2.2", "192.0.2.1"]
+    assert pool.resolve("example.com", "A") == ["fast"]
+    assert pool.stats()["192.0.2.2"]["queries"] == 2
+
+def test_pool_fails_over_and_avoids_unhealthy_server():
+    """Test a failing server is skipped until its cooldown passes."""
+    clock = FakeClock()
+    pool = make_pool({"192.0.2.1": (0.1, dns.resolver.LifetimeTimeout()),
+                      "192.0.2.2": (0.2, ["ok"])}, clock)
+    pool.unhealthy_error_rate = 0.1
+    assert pool.resolve("example.com", "A") == ["ok"]
+    assert not pool.is_healthy("192.0.2.1")
+    assert pool.ordered() == ["192.0.2.2", "192.0.2.1"]
+
+    clock.now += pool.cooldown
+    assert pool.is_healthy("192.0.2.1")
+
+def test_pool_does_not_retry_negative_answers():
+    """Test NXDOMAIN is raised at once and counted as a success."""
+    pool = make_pool({"192.0.2.1": (0.1, dns.resolver.NXDOMAIN()),
+                      "192.0.2.2": (0.1, ["ok"])})
+    with pytest.raises(dns.resolver.NXDOMAIN):
+        pool.resolve("example.com", "A")
+    stats = pool.stats()
+    assert stats["192.0.2.1"]["failures"] == 0
+    assert stats["192.0.2.2"]["queries"] == 0
+
+def test_pool_raises_last_error():
+    """Test the last error is raised when every server fails."""
+    pool = make_pool({"192.0.2.1": (0.1, dns.resolver.NoNameservers()),
+                      "192.0.2.2": (0.1, dns.resolver.LifetimeTimeout())})
+    with pytest.raises((dns.resolver.NoNameservers, dns.resolver.LifetimeTimeout)):
+        pool.resolve("example.com", "A")
+
+def test_pool_pickles_settings_only():
+    """Test pools copied to worker processes start without statistics."""
+    pool = make_pool({"192.0.2.1": (0.1, ["ok"])})
+    pool.resolve("example.com", "A")
+    copy = pickle.loads(pickle.dumps(pool))
+    assert copy.nameservers == ["192.0.2.1"]
+    assert copy.timeout == 1.0
+    assert copy.stats()["192.0.2.1"]["queries"] == 0
+
+def test_pool_attempts_wait_for_governor():
+    """Test each attempt waits for the governor of its server."""
+    pool = make_pool({"192.0.2.1": (0.1, dns.resolver.LifetimeTimeout()),
+                      "192.0.2.2": (0.1, ["ok"])})
+    governor = MagicMock()
+    assert pool.resolve("example.com", "A", governor=governor) == ["ok"]
+    assert [call.args[0] for call in governor.limit.call_args_list] == [
+        "192.0.2.1", "192.0.2.2"
+    ]
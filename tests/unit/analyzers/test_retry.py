@@ -0,0 +1,144 @@
+import asyncio
+import pickle
+import threading
+import dns.resolver
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+from url_analyzer.analyzers.async_dns_analyzer import AsyncDNSAnalyzer
+from url_analyzer.analyzers.dns_analyzer import DNSAnalyzer
+from url_analyzer.analyzers.resolver_pool import ResolverPool
+from url_analyzer.analyzers.retry import RetryPolicy, parse_timeouts
+
+def make_policy(**kwargs):
+    """Create a policy with full jitter and recorded, instant sleeps."""
+    sleeps = []
+    policy = RetryPolicy(uniform=lambda: 1.0, sleep=sleeps.append, **kwargs)
+    return policy, sleeps
+
+def test_parse_timeouts():
+    """Test parsing per record type timeouts."""
+    assert parse_timeouts("a=0.5, TXT=2") == {"A": 0.5, "TXT": 2.0}
+    with pytest.raises(ValueError):
+        parse_timeouts("A")
+    with pytest.raises(ValueError):
+        parse_timeouts("A=0")
+
+def test_lifetime_per_record_type():
+    """Test record type timeouts override the default one."""
+    policy = RetryPolicy(timeout=1.0, timeouts={"txt": 3.0})
+    assert policy.lifetime("TXT") == 3.0
+    assert policy.lifetime("A") == 1.0
+    assert RetryPolicy().lifetime("A") is None
+
+def test_delay_backs_off_exponentially():
+    """Test retry delays double up to the cap."""
+    policy, _ = make_policy(backoff=0.1, max_backoff=0.3)
+    assert [policy.delay(retry) for retry in (1, 2, 3)] == [
+        pytest.approx(0.1), pytest.approx(0.2), pytest.approx(0.3)
+    ]
+
+def test_call_retries_timeouts():
+    """Test timed out attempts are retried with the record type lifetime."""
+    policy, sleeps = make_policy(attempts=3, timeouts={"A": 0.5})
+    query = Mock(side_effect=[dns.resolver.LifetimeTimeout(), "answer"])
+    assert policy.call(query, "A") == "answer"
+    assert query.call_count == 2
+    query.assert_called_with(0.5)
+    assert sleeps == [pytest.approx(0.1)]
+
+def test_call_gives_up():
+    """Test the last error is raised once attempts run out."""
+    policy, sleeps = make_policy(attempts=2)
+    query = Mock(side_effect=dns.resolver.NoNameservers())
+    with pytest.raises(dns.resolver.NoNameservers):
+        policy.call(query, "A")
+    assert query.call_count == 2
+
+def test_call_does_not_retry_negative_answers():
+    """Test NXDOMAIN is final."""
+    policy, sleeps = make_policy(attempts=3)
+    query = Mock(side_effect=dns.resolver.NXDOMAIN())
+    with pytest.raises(dns.resolver.NXDOMAIN):
+        policy.call(query, "A")
+    assert query.call_count == 1
+    assert sleeps == []
+
+def test_call_async():
+    """Test async queries are retried too."""
+    policy = RetryPolicy(attempts=2, backoff=0.001)
+    query = AsyncMock(side_effect=[dns.resolver.LifetimeTimeout(), "answer"])
+    assert asyncio.run(policy.call_async(query, "MX")) == "answer"
+
+def test_policy_pickles_settings():
+    """Test policies copied to worker processes keep their settings."""
+    policy = RetryPolicy(attempts=4, timeouts={"A": 0.5}, hedge=True)
+    copy = pickle.loads(pickle.dumps(policy))
+    assert (copy.attempts, copy.timeouts, copy.hedge) == (4, {"A": 0.5}, True)
+
+@patch('dns.resolver.Resolver')
+def test_dns_analyzer_with_retry(mock_resolver):
+    """Test the analyzer retries failed queries with per-type lifetimes."""
+    mock_answer = Mock()
+    mock_answer.address = "93.184.216.34"
+    resolver_instance = mock_resolver.return_value
+    resolver_instance.resolve.side_effect = [dns.resolver.LifetimeTimeout(),
+                                             [mock_answer]]
+    policy, _ = make_policy(attempts=2, timeouts={"A": 0.5})
+
+    analyzer = DNSAnalyzer("example.com", retry=policy)
+    assert analyzer.get_a_records() == ["93.184.216.34"]
+    resolver_instance.resolve.assert_called_with("example.com", "A", lifetime=0.5)
+
+def test_async_dns_analyzer_with_retry():
+    """Test the async analyzer retries failed queries."""
+    mock_answer = Mock()
+    mock_answer.address = "93.184.216.34"
+    resolver = Mock()
+    resolver.resolve = AsyncMock(side_effect=[dns.resolver.LifetimeTimeout(),
+                                              [mock_answer]])
+    analyzer = AsyncDNSAnalyzer("example.com", resolver=resolver,
+                                retry=RetryPolicy(attempts=2, backoff=0.001))
+    assert asyncio.run(analyzer.get_a_records()) == ["93.184.216.34"]
+
+def test_pool_latency_quantile():
+    """Test latency quantiles come from recent successful queries."""
+    pool = ResolverPool(["192.0.2.1"], timeout=1.0)
+    assert pool.latency_quantile("192.0.2.1", 0.95) is None
+    for latency in range(1, 101):
+        pool.record("192.0.2.1", latency / 1000, True)
+    assert pool.latency_quantile("192.0.2.1", 0.95) == pytest.approx(0.096)
+
+def test_pool_resolve_hedged():
+    """Test a slow server is raced by the next one, which answers first."""
+    pool = ResolverPool(["192.0.2.1", "192.0.2.2"], timeout=1.0)
+    release = threading.Event()
+
+    def slow(name, record_type):
+        release.wait(5)
+        return ["slow"]
+
+    pool._resolvers["192.0.2.1"].resolve = Mock(side_effect=slow)
+    pool._resolvers["192.0.2.2"].resolve = Mock(return_value=["fast"])
+    try:
+        assert pool.resolve_hedged("example.com", "A", hedge_after=0.05) == ["fast"]
+    finally:
+        release.set()
+
+def test_pool_close_shuts_down_hedging_threads():
+    """Test closing the pool shuts down the executor of hedged requests."""
+    with ResolverPool(["192.0.2.1", "192.0.2.2"], timeout=1.0) as pool:
+        pool._resolvers["192.0.2.1"].resolve = Mock(return_value=["ok"])
+        assert pool.resolve_hedged("example.com", "A", hedge_after=1.0) == ["ok"]
+        executor = pool._executor
+        assert executor is not None
+    assert pool._executor is None
+    with pytest.raises(RuntimeError):
+        executor.submit(print)
+
+def test_pool_resolve_hedged_without_latency_data():
+    """Test no request is hedged before the best server is measured."""
+    pool = ResolverPool(["192.0.2.1", "192.0.2.2"], timeout=1.0)
+    pool._resolvers["192.0.2.1"].resolve = Mock(return_value=["ok"])
+    pool._resolvers["192.0.2.2"].resolve = Mock(return_value=["other"])
+    assert pool.resolve_hedged("example.com", "A") == ["ok"]
+    pool._resolvers["192.0.2.2"].resolve.assert_not_called()
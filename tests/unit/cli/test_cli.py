@@ -1,5 +1,10 @@
+import json
 import pytest
 from unittest.mock import patch, Mock
+from url_analyzer.analyzers.dns_cache import PersistentDNSCache
+from url_analyzer.analyzers.rate_limit import QueryGovernor
+from url_analyzer.analyzers.resolver_pool import ResolverPool
+from url_analyzer.analyzers.retry import RetryPolicy
 from url_analyzer.cli.main import main, format_url_output, format_dns_output, format_full_output
 
 @pytest.fixture
@@ -125,6 +130,29 @@ def test_cli_dns_mode(mock_analyze, mock_dns_analysis, capsys):
     assert "DNS Records:" in captured.out
     assert "A Records:" in captured.out
 
+@patch('sys.argv', ['url-analyzer', 'https://example.com', '--mode', 'dns',
+                    '--records', 'a, mx'])
+@patch('url_analyzer.analyzers.dns_analyzer.DNSAnalyzer.analyze')
+def test_cli_dns_selected_records(mock_analyze, capsys):
+    """Test --records queries and prints only the selected record types."""
+    mock_analyze.return_value = {
+        "info": {"domain": "example.com", "nameservers": []},
+        "records": {"a_records": ["93.184.216.34"], "mx_records": []}
+    }
+    main()
+    mock_analyze.assert_called_once_with(["A", "MX"])
+    captured = capsys.readouterr()
+    assert "A Records:" in captured.out
+    assert "\nNS Records:" not in captured.out
+
+@patch('sys.argv', ['url-analyzer', 'https://example.com', '--mode', 'dns',
+                    '--records', 'A,PTR'])
+def test_cli_unsupported_records(capsys):
+    """Test --records rejects unsupported record types."""
+    with pytest.raises(SystemExit):
+        main()
+    assert "Unsupported record types: PTR" in capsys.readouterr().err
+
 @patch('sys.argv', ['url-analyzer', 'https://example.com', '--mode', 'full'])
 @patch('url_analyzer.core.main_analyzer.MainAnalyzer.analyze')
 def test_cli_full_mode(mock_analyze, mock_full_analysis, capsys):
@@ -136,6 +164,20 @@ def test_cli_full_mode(mock_analyze, mock_full_analysis, capsys):
     assert "URL Analysis:" in captured.out
     assert "DNS Records:" in captured.out
 
+@patch('sys.argv', ['url-analyzer', 'https://example.com', '--mode', 'full'])
+def test_cli_full_mode_analyzer_selection(capsys, monkeypatch):
+    """Test full mode reports only the analyzers selected."""
+    monkeypatch.setenv('URL_ANALYZER_ANALYZERS', 'url_analysis')
+    main()
+    captured = capsys.readouterr()
+    assert "URL Analysis:" in captured.out
+    assert "DNS Records:" not in captured.out
+
+    monkeypatch.setenv('URL_ANALYZER_ANALYZERS', 'url_analysis,unknown')
+    with pytest.raises(SystemExit):
+        main()
+    assert "Unknown analyzer: unknown" in capsys.readouterr().err
+
 @patch('sys.argv', ['url-analyzer', 'invalid-url'])
 def test_cli_error_handling(capsys):
     """Test CLI error handling."""
@@ -143,3 +185,248 @@ def test_cli_error_handling(capsys):
         main()
     captured = capsys.readouterr()
     assert "Error:" in captured.out
+
+@patch('sys.argv', ['url-analyzer', 'https://example.com', '--mode', 'dns',
+                    '--concurrent', '--dns-deadline', '2.5'])
+@patch('url_analyzer.analyzers.dns_analyzer.DNSAnalyzer')
+def test_cli_dns_concurrent_mode(mock_dns_analyzer, mock_dns_analysis, capsys):
+    """Test CLI passes concurrent DNS options to the analyzer."""
+    mock_dns_analyzer.return_value.analyze.return_value = mock_dns_analysis
+    main()
+    mock_dns_analyzer.assert_called_once_with(
+        "example.com", concurrent=True, deadline=2.5)
+    captured = capsys.readouterr()
+    assert "A Records:" in captured.out
+
+def test_cli_batch_mode(tmp_path, capsys):
+    """Test CLI batch mode writes one JSON object per input URL."""
+    input_file = tmp_path / "urls.txt"
+    input_file.write_text("https://example.com/a\nnot-a-url\n\nhttps://example.org\n")
+    with patch('sys.argv', ['url-analyzer', '--input', str(input_file),
+                            '--workers', '2']):
+        main()
+    captured = capsys.readouterr()
+    lines = [json.loads(line) for line in captured.out.splitlines()]
+    assert sorted(line["url"] for line in lines) == [
+        "https://example.com/a", "https://example.org", "not-a-url"
+    ]
+    assert sum("error" in line for line in lines) == 1
+
+@patch('sys.argv', ['url-analyzer'])
+def test_cli_requires_url_or_input(capsys):
+    """Test CLI rejects calls without a URL or input file."""
+    with pytest.raises(SystemExit):
+        main()
+    assert "provide either a URL or --input" in capsys.readouterr().err
+
+@patch('url_analyzer.analyzers.dns_analyzer.DNSAnalyzer')
+def test_cli_cache_dir(mock_dns_analyzer, mock_dns_analysis, tmp_path):
+    """Test --cache-dir gives the analyzer a persistent cache."""
+    mock_dns_analyzer.return_value.analyze.return_value = mock_dns_analysis
+    with patch('sys.argv', ['url-analyzer', 'https://example.com', '--mode', 'dns',
+                            '--cache-dir', str(tmp_path)]):
+        main()
+    cache = mock_dns_analyzer.call_args.kwargs["cache"]
+    assert isinstance(cache, PersistentDNSCache)
+    assert (tmp_path / PersistentDNSCache.FILENAME).exists()
+
+@patch('sys.argv', ['url-analyzer', 'https://example.com', '--mode', 'dns',
+                    '--no-cache', '--cache-dir', '/nonexistent'])
+@patch('url_analyzer.analyzers.dns_analyzer.DNSAnalyzer')
+def test_cli_no_cache(mock_dns_analyzer, mock_dns_analysis):
+    """Test --no-cache disables DNS caching."""
+    mock_dns_analyzer.return_value.analyze.return_value = mock_dns_analysis
+    main()
+    assert mock_dns_analyzer.call_args.kwargs["cache"] is None
+
+@patch('sys.argv', ['url-analyzer', 'https://example.com', '--mode', 'dns',
+                    '--nameservers', '192.0.2.1,192.0.2.2', '--dns-timeout', '0.5'])
+@patch('url_analyzer.analyzers.dns_analyzer.DNSAnalyzer')
+def test_cli_nameservers(mock_dns_analyzer, mock_dns_analysis):
+    """Test --nameservers with several servers sets up a resolver pool."""
+    mock_dns_analyzer.return_value.analyze.return_value = mock_dns_analysis
+    main()
+    kwargs = mock_dns_analyzer.call_args.kwargs
+    assert kwargs["nameservers"] == ['192.0.2.1', '192.0.2.2']
+    assert kwargs["timeout"] == 0.5
+    assert isinstance(kwargs["pool"], ResolverPool)
+    assert kwargs["pool"].nameservers == ['192.0.2.1', '192.0.2.2']
+
+@patch('sys.argv', ['url-analyzer', 'https://example.com', '--mode', 'dns',
+                    '--qps', '50', '--max-in-flight', '8'])
+@patch('url_analyzer.analyzers.dns_analyzer.DNSAnalyzer')
+def test_cli_rate_limits(mock_dns_analyzer, mock_dns_analysis):
+    """Test rate limit options give the analyzer a query governor."""
+    mock_dns_analyzer.return_value.analyze.return_value = mock_dns_analysis
+    main()
+    governor = mock_dns_analyzer.call_args.kwargs["governor"]
+    assert isinstance(governor, QueryGovernor)
+    assert (governor.qps, governor.qps_per_server, governor.max_in_flight) == (50, None, 8)
+
+@patch('sys.argv', ['url-analyzer', 'https://example.com', '--mode', 'dns',
+                    '--retries', '2', '--record-timeout', '*=1,txt=3'])
+@patch('url_analyzer.analyzers.dns_analyzer.DNSAnalyzer')
+def test_cli_retry_policy(mock_dns_analyzer, mock_dns_analysis):
+    """Test retry options give the analyzer a retry policy."""
+    mock_dns_analyzer.return_value.analyze.return_value = mock_dns_analysis
+    main()
+    retry = mock_dns_analyzer.call_args.kwargs["retry"]
+    assert isinstance(retry, RetryPolicy)
+    assert retry.attempts == 3
+    assert (retry.lifetime("A"), retry.lifetime("TXT")) == (1.0, 3.0)
+    assert not retry.hedge
+
+def test_cli_batch_process_executor(tmp_path, capsys):
+    """Test CLI batch mode across worker processes in input order."""
+    urls = [f"https://host{i}.example.com/path" for i in range(30)]
+    input_file = tmp_path / "urls.txt"
+    input_file.write_text("\n".join(urls))
+    with patch('sys.argv', ['url-analyzer', '--input', str(input_file),
+                            '--executor', 'process', '--workers', '2',
+                            '--chunk-size', '4', '--order', 'input']):
+        main()
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [line["url"] for line in lines] == urls
+
+def test_cli_batch_csv_output(tmp_path):
+    """Test CLI batch mode can stream CSV rows to a file."""
+    input_file = tmp_path / "urls.txt"
+    input_file.write_text("https://example.com/a\nnot-a-url\n")
+    output_file = tmp_path / "results.csv"
+    with patch('sys.argv', ['url-analyzer', '--input', str(input_file),
+                            '--format', 'csv', '--output', str(output_file),
+                            '--order', 'input']):
+        main()
+    rows = output_file.read_text().splitlines()
+    assert rows[0].startswith("url,normalized_url,domain,")
+    assert rows[1].startswith("https://example.com/a,")
+    assert rows[2].startswith("not-a-url,")
+
+@patch('sys.argv', ['url-analyzer', 'https://example.com', '--format', 'ndjson'])
+def test_cli_single_ndjson_output(capsys):
+    """Test a single URL analysis can be written as one JSON line."""
+    main()
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 1
+    assert json.loads(lines[0])["domain"] == "example.com"
+
+@patch('sys.argv', ['url-analyzer', 'https://example.com/a', '--mode', 'dns',
+                    '--format', 'csv'])
+@patch('url_analyzer.analyzers.dns_analyzer.DNSAnalyzer.analyze')
+def test_cli_single_dns_csv_output(mock_analyze, mock_dns_analysis, capsys):
+    """Test a single URL's DNS analysis is written as a CSV row naming the URL."""
+    mock_analyze.return_value = mock_dns_analysis
+    main()
+    rows = capsys.readouterr().out.splitlines()
+    assert len(rows) == 2
+    assert rows[0].startswith("url,")
+    assert rows[1].startswith("https://example.com/a,")
+
+def test_cli_profile(tmp_path, capsys):
+    """Test --profile prints a latency summary of the stages run."""
+    profile = tmp_path / "profile.json"
+    with patch('sys.argv', ['url-analyzer', 'https://example.com', '--profile',
+                            '--profile-output', str(profile)]):
+        main()
+    err = capsys.readouterr().err
+    assert "p95 ms" in err
+    assert "url.parse" in err
+    assert set(json.loads(profile.read_text())) == {"url.parse", "output"}
+
+def test_cli_incremental(tmp_path, capsys):
+    """Test --incremental writes only new and changed records."""
+    from url_analyzer.testing.dns_server import DNSServer, Zone
+
+    input_file = tmp_path / "urls.txt"
+    input_file.write_text("https://example.test/a\nhttps://www.example.test\n")
+    argv = ['url-analyzer', '--input', str(input_file), '--mode', 'dns',
+            '--records', 'A', '--incremental', '--no-cache',
+            '--cache-dir', str(tmp_path / "cache"), '--nameservers', '127.0.0.1']
+    # TTL 0 records expire at once, so every run queries them again
+    zone = {"ttl": 0, "records": {"example.test": {"A": ["192.0.2.1"]},
+                                  "www.example.test": {"A": ["192.0.2.2"]}}}
+    with DNSServer(Zone.from_dict(zone)) as server:
+        argv += ['--dns-port', str(server.port)]
+        with patch('sys.argv', argv):
+            main()
+        first = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert sorted(line["status"] for line in first) == ["new", "new"]
+
+        zone["records"]["example.test"]["A"] = ["192.0.2.9"]
+        server.zone = Zone.from_dict(zone)
+        with patch('sys.argv', argv):
+            main()
+    captured = capsys.readouterr()
+    assert [json.loads(line) for line in captured.out.splitlines()] == [{
+        "url": "https://example.test/a", "normalized_url": "https://example.test/a",
+        "status": "changed",
+        "changes": {"a_records": {"added": ["192.0.2.9"], "removed": ["192.0.2.1"]}}
+    }]
+    assert "1 changed, 1 unchanged" in captured.err
+
+def test_cli_incremental_reordered_records(tmp_path, capsys):
+    """Test runs selecting the same record types in another order or mode
+    share their stored records."""
+    from url_analyzer.testing.dns_server import DNSServer, Zone
+
+    input_file = tmp_path / "urls.txt"
+    input_file.write_text("https://example.test\n")
+    argv = ['url-analyzer', '--input', str(input_file), '--incremental',
+            '--no-cache', '--cache-dir', str(tmp_path / "cache"),
+            '--nameservers', '127.0.0.1']
+    zone = {"ttl": 0, "records": {"example.test": {"A": ["192.0.2.1"],
+                                                   "MX": ["10 mail.example.test."]}}}
+    with DNSServer(Zone.from_dict(zone)) as server:
+        argv += ['--dns-port', str(server.port)]
+        with patch('sys.argv', argv + ['--mode', 'dns', '--records', 'A,MX']):
+            main()
+        assert json.loads(capsys.readouterr().out)["status"] == "new"
+
+        for mode, records in (('dns', 'mx,a'), ('full', 'MX,A,a')):
+            with patch('sys.argv', argv + ['--mode', mode, '--records', records]):
+                main()
+            captured = capsys.readouterr()
+            assert captured.out == ""
+            assert "1 unchanged" in captured.err
+
+def test_cli_incremental_failed_queries(tmp_path, capsys):
+    """Test a run whose queries time out keeps the stored records."""
+    from url_analyzer.core.store import ResultStore
+    from url_analyzer.testing.dns_server import DNSServer, Zone
+
+    input_file = tmp_path / "urls.txt"
+    input_file.write_text("https://example.test\n")
+    argv = ['url-analyzer', '--input', str(input_file), '--mode', 'dns',
+            '--records', 'A', '--incremental', '--no-cache',
+            '--cache-dir', str(tmp_path / "cache"), '--nameservers', '127.0.0.1',
+            '--dns-timeout', '0.2', '--dns-lifetime', '0.2']
+    zone = {"ttl": 0, "records": {"example.test": {"A": ["192.0.2.1"]}}}
+    with DNSServer(Zone.from_dict(zone)) as server:
+        argv += ['--dns-port', str(server.port)]
+        with patch('sys.argv', argv):
+            main()
+    assert json.loads(capsys.readouterr().out)["status"] == "new"
+
+    # The server is gone, so every query fails
+    with patch('sys.argv', argv):
+        main()
+    captured = capsys.readouterr()
+    result = json.loads(captured.out)
+    assert result["url"] == "https://example.test"
+    assert "Failed to get A records" in result["error"]
+    assert "1 failed" in captured.err
+    store = ResultStore(str(tmp_path / "cache" / ResultStore.FILENAME))
+    try:
+        assert store.get("https://example.test", "A").records == {
+            "a_records": ["192.0.2.1"]}
+    finally:
+        store.close()
+
+def test_cli_incremental_needs_cache_dir(tmp_path, capsys, monkeypatch):
+    """Test --incremental is rejected without somewhere to keep results."""
+    monkeypatch.delenv('URL_ANALYZER_CACHE_DIR', raising=False)
+    with patch('sys.argv', ['url-analyzer', '--input', str(tmp_path / "urls.txt"),
+                            '--mode', 'dns', '--incremental']):
+        with pytest.raises(SystemExit):
+            main()
+    assert "--incremental needs --cache-dir" in capsys.readouterr().err
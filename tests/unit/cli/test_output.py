@@ -0,0 +1,116 @@
+import csv
+import io
+import json
+import pickle
+import pytest
+from url_analyzer.cli.output import (
+    CSV_COLUMNS, ResultWriter, format_text, get_formatter, open_output
+)
+
+INFO = {"url": "https://example.com/path?q=1",
+        "normalized_url": "https://example.com/path?q=1", "domain": "example.com"}
+
+URL_RESULT = {
+    "url": "https://example.com/path?q=1",
+    "normalized_url": "https://example.com/path?q=1",
+    "domain": "example.com",
+    "components": {"scheme": "https", "netloc": "example.com", "path": "/path",
+                   "params": "", "query": "q=1", "fragment": ""},
+}
+
+DNS_RESULT = {
+    "url": "https://example.com/path",
+    "records": {
+        "a_records": ["93.184.216.34", "93.184.216.35"],
+        "mx_records": [{"preference": 10, "exchange": "mail.example.com"}],
+        "soa_record": {"mname": "ns1.example.com", "rname": "admin.example.com"},
+    },
+}
+
+ERROR_RESULT = {"url": "not-a-url", "error": "Invalid URL"}
+
+def test_ndjson_is_compact():
+    """Test each result is one line of JSON."""
+    out = io.StringIO()
+    writer = ResultWriter(out, 'ndjson', 'dns')
+    writer.write(DNS_RESULT)
+    writer.write(ERROR_RESULT)
+    lines = out.getvalue().splitlines()
+    assert [json.loads(line) for line in lines] == [DNS_RESULT, ERROR_RESULT]
+    assert ", " not in lines[0]
+    assert writer.count == 2
+
+def test_csv_url_mode():
+    """Test URL results are written as CSV rows under a header."""
+    out = io.StringIO()
+    writer = ResultWriter(out, 'csv', 'url')
+    writer.write(URL_RESULT)
+    writer.write(ERROR_RESULT)
+    rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+    assert tuple(rows[0]) == CSV_COLUMNS['url']
+    assert rows[0]["domain"] == "example.com"
+    assert rows[0]["query"] == "q=1"
+    assert rows[0]["error"] == ""
+    assert rows[1]["url"] == "not-a-url"
+    assert rows[1]["error"] == "Invalid URL"
+
+def test_csv_dns_mode_flattens_records():
+    """Test record lists and the SOA record fit in one cell each."""
+    out = io.StringIO()
+    ResultWriter(out, 'csv', 'dns').write(DNS_RESULT)
+    row = next(csv.DictReader(io.StringIO(out.getvalue())))
+    assert row["a_records"] == "93.184.216.34;93.184.216.35"
+    assert row["mx_records"] == "10 mail.example.com"
+    assert row["soa_record"] == "ns1.example.com admin.example.com"
+    assert row["txt_records"] == ""
+
+def test_csv_full_mode():
+    """Test full results combine URL components and DNS records."""
+    result = {
+        "info": {"url": URL_RESULT["url"], "normalized_url": URL_RESULT["url"],
+                 "domain": "example.com"},
+        "url_analysis": URL_RESULT,
+        "dns_analysis": DNS_RESULT,
+    }
+    out = io.StringIO()
+    ResultWriter(out, 'csv', 'full').write(result)
+    row = next(csv.DictReader(io.StringIO(out.getvalue())))
+    assert row["domain"] == "example.com"
+    assert row["path"] == "/path"
+    assert row["a_records"] == "93.184.216.34;93.184.216.35"
+
+def test_full_mode_without_dns():
+    """Test full results only show the analyses they carry."""
+    result = {"info": INFO, "url_analysis": URL_RESULT,
+              "http_analysis": {"status": 200}}
+    text = format_text(result, 'full')
+    assert "URL Analysis:" in text and "DNS Records:" not in text
+    assert "Http Analysis:" in text and "Status: 200" in text
+    out = io.StringIO()
+    ResultWriter(out, 'csv', 'full').write(result)
+    row = next(csv.DictReader(io.StringIO(out.getvalue())))
+    assert row["path"] == "/path" and row["a_records"] == ""
+
+def test_text_format():
+    """Test text results match the single URL report."""
+    text = format_text(DNS_RESULT, 'dns')
+    assert text.startswith("\nURL: https://example.com/path\n\nDNS Records:")
+    assert "  Priority: 10" in text
+    assert "Error analyzing not-a-url: Invalid URL" in format_text(ERROR_RESULT, 'url')
+
+def test_formatter_pickles():
+    """Test formatters can be sent to worker processes."""
+    formatter = pickle.loads(pickle.dumps(get_formatter('csv', 'url')))
+    assert formatter(ERROR_RESULT).startswith("not-a-url,")
+
+def test_unknown_format():
+    """Test unknown formats are rejected."""
+    with pytest.raises(ValueError):
+        ResultWriter(io.StringIO(), 'xml')
+
+def test_open_output(tmp_path):
+    """Test results can be streamed to a file."""
+    path = tmp_path / "results.ndjson"
+    with open_output(str(path)) as out:
+        ResultWriter(out, 'ndjson', 'url').write(ERROR_RESULT)
+    assert json.loads(path.read_text()) == ERROR_RESULT
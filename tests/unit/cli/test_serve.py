@@ -0,0 +1,181 @@
+import http.client
+import json
+import socket
+import threading
+import pytest
+from unittest.mock import patch
+from url_analyzer.analyzers.dns_analyzer import DNSAnalyzer
+from url_analyzer.analyzers.dns_cache import DNSCache
+from url_analyzer.cli.serve import AnalysisService, RequestError, make_server
+from url_analyzer.testing.dns_server import DNSServer, Zone
+from url_analyzer.utils.instrumentation import Instrumentation
+
+ZONE = {"records": {"example.test": {"A": ["192.0.2.1"],
+                                     "MX": ["10 mail.example.test."]}}}
+
+@pytest.fixture
+def dns_server():
+    with DNSServer(Zone.from_dict(ZONE)) as server:
+        yield server
+
+@pytest.fixture
+def service(dns_server):
+    return AnalysisService({"cache": DNSCache(), "lifetime": 2,
+                            "instrumentation": Instrumentation(),
+                            **dns_server.analyzer_options()}, mode='full')
+
+@pytest.fixture
+def client(service):
+    server = make_server(service, port=0, quiet=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    connection = http.client.HTTPConnection(*server.server_address[:2], timeout=5)
+    yield connection
+    connection.close()
+    server.shutdown()
+    server.server_close()
+
+def request(connection, method, path, body=None):
+    headers = {}
+    if body is not None:
+        body = json.dumps(body)
+        headers["Content-Type"] = "application/json"
+    connection.request(method, path, body, headers)
+    response = connection.getresponse()
+    data = response.read().decode()
+    if response.getheader("Content-Type") == "application/json":
+        data = json.loads(data)
+    return response.status, data
+
+def test_service_shares_resolver(service, dns_server):
+    """Test that analyses reuse one resolver and cache across requests."""
+    resolver = service.dns_options["resolver"]
+    assert resolver.port == dns_server.port
+    with patch("dns.resolver.Resolver") as resolver_class:
+        first = service.analyze({"url": "https://example.test", "mode": "dns"})
+        second = service.analyze({"url": "https://example.test", "mode": "dns"})
+    resolver_class.assert_not_called()
+    assert first["records"]["a_records"] == ["192.0.2.1"]
+    assert second["records"] == first["records"]
+    assert dns_server.stats()["queries"] == 7
+    assert service.health()["cache"]["hits"] == 7
+
+def test_shared_resolver_deadline():
+    """Test that a deadline does not change a shared resolver."""
+    resolver = DNSAnalyzer.create_resolver(["127.0.0.1"], lifetime=5)
+    analyzer = DNSAnalyzer("example.test", concurrent=True, deadline=1,
+                           resolver=resolver)
+    assert analyzer.resolver.lifetime == 1
+    assert resolver.lifetime == 5
+    assert DNSAnalyzer("example.test", resolver=resolver).resolver is resolver
+
+def test_service_options(service):
+    """Test request validation."""
+    assert service.analyze({"url": "https://example.test/a", "mode": "url"}
+                           )["components"]["path"] == "/a"
+    for params, message in (({}, "url is required"),
+                            ({"url": "x", "mode": "bogus"}, "Unknown mode"),
+                            ({"url": "x", "records": 5}, "records must be"),
+                            ({"url": "x", "records": ["BOGUS"]}, "BOGUS"),
+                            ({"url": "x", "records": []}, "at least one"),
+                            ({"url": "x", "records": ""}, "at least one")):
+        with pytest.raises(RequestError, match=message) as error:
+            service.analyze(params)
+        assert error.value.status == 400
+
+def test_analyze_endpoint(client):
+    """Test analyzing one URL over HTTP, by POST and by GET."""
+    status, result = request(client, "POST", "/analyze",
+                             {"url": "https://example.test/path",
+                              "records": ["A", "MX"]})
+    assert status == 200
+    assert result["info"]["url"] == "https://example.test/path"
+    assert result["dns_analysis"]["records"] == {
+        "a_records": ["192.0.2.1"],
+        "mx_records": [{"exchange": "mail.example.test.", "preference": 10}]
+    }
+    # The connection is kept open for the next request
+    status, result = request(client, "GET",
+                             "/analyze?url=https://example.test&mode=dns&records=A")
+    assert status == 200
+    assert result["records"] == {"a_records": ["192.0.2.1"]}
+
+def test_batch_endpoint(client):
+    """Test analyzing many URLs in one request, in input order."""
+    urls = ["https://example.test/1", "not a url", "https://example.test/2"]
+    status, result = request(client, "POST", "/batch",
+                             {"urls": urls, "mode": "dns", "records": ["A"]})
+    assert status == 200
+    results = result["results"]
+    assert [item["url"] for item in results] == urls
+    assert "error" in results[1]
+    assert results[2]["records"] == {"a_records": ["192.0.2.1"]}
+
+def test_errors(client):
+    """Test that errors are answered as JSON with their status."""
+    assert request(client, "POST", "/analyze", {"url": "not a url"})[0] == 400
+    assert request(client, "POST", "/batch", {"urls": "x"})[0] == 400
+    assert request(client, "GET", "/analyze?url=https://example.test&records=")[0] == 400
+    assert request(client, "GET", "/nowhere")[0] == 404
+    status, result = request(client, "GET", "/batch")
+    assert status == 405
+    assert "error" in result
+    client.request("POST", "/analyze", "{not json",
+                   {"Content-Type": "application/json"})
+    response = client.getresponse()
+    assert response.status == 400
+    assert json.loads(response.read()) == {"error": "Request body is not valid JSON"}
+
+def test_failed_lookup():
+    """Test an analysis whose every DNS query failed is a 502."""
+    with DNSServer(Zone.from_dict(ZONE)) as server:
+        options = server.analyzer_options()
+    service = AnalysisService({"lifetime": 0.2, **options}, mode='dns')
+    with pytest.raises(RequestError) as excinfo:
+        service.analyze({"url": "https://example.test", "records": ["A", "MX"]})
+    assert excinfo.value.status == 502
+    assert "Failed to get A records" in str(excinfo.value)
+
+def test_health_and_metrics(client):
+    """Test the health and Prometheus metrics endpoints."""
+    request(client, "POST", "/analyze", {"url": "https://example.test", "mode": "url"})
+    status, health = request(client, "GET", "/health")
+    assert status == 200
+    assert health["status"] == "ok"
+    assert health["requests"] == 1
+    status, metrics = request(client, "GET", "/metrics")
+    assert status == 200
+    assert 'stage="url.parse"' in metrics
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="needs Unix sockets")
+def test_unix_socket(service, tmp_path):
+    """Test serving over a Unix socket."""
+    path = str(tmp_path / "analyzer.sock")
+    server = make_server(service, unix_socket=path, quiet=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with socket.socket(socket.AF_UNIX) as sock:
+            sock.connect(path)
+            sock.sendall(b"GET /health HTTP/1.1\r\nHost: localhost\r\n"
+                         b"Connection: close\r\n\r\n")
+            response = b""
+            while chunk := sock.recv(4096):
+                response += chunk
+    finally:
+        server.shutdown()
+        server.server_close()
+    head, body = response.split(b"\r\n\r\n", 1)
+    assert head.startswith(b"HTTP/1.1 200")
+    assert json.loads(body)["status"] == "ok"
+
+def test_cli_dispatches_serve():
+    """Test that 'url-analyzer serve' starts the server."""
+    from url_analyzer.cli.main import main
+    with patch("sys.argv", ["url-analyzer", "serve", "--port", "0", "--quiet"]), \
+         patch("url_analyzer.cli.serve.make_server") as make_server_mock:
+        make_server_mock.return_value.server_address = ("127.0.0.1", 8123)
+        make_server_mock.return_value.serve_forever.side_effect = KeyboardInterrupt
+        main()
+    service = make_server_mock.call_args[0][0]
+    assert service.mode == 'url'
+    assert "resolver" in service.dns_options
+    make_server_mock.return_value.server_close.assert_called_once()
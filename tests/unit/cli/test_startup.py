@@ -0,0 +1,49 @@
+import subprocess
+import sys
+
+# Runs the CLI the way the url-analyzer entry point does
+RUN_CLI = ("import sys; from url_analyzer.cli.main import main; "
+           "sys.argv[0] = 'url-analyzer'; main()")
+
+def import_times(*args):
+    """Run the CLI under -X importtime.
+
+    Returns:
+        Dict mapping each imported module to its cumulative import time
+        in microseconds
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", RUN_CLI, *args],
+        capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        times[module.strip()] = int(cumulative)
+    return times
+
+def dns_modules(times):
+    return [module for module in times
+            if module == "dns" or module.startswith("dns.")
+            or module.startswith("url_analyzer.analyzers.dns")]
+
+def test_url_mode_does_not_import_dnspython():
+    """Test URL analysis starts without loading dnspython or DNS analyzers."""
+    times = import_times("https://example.com/path", "--mode", "url")
+    assert "url_analyzer.cli.main" in times
+    assert dns_modules(times) == []
+
+def test_help_does_not_import_dnspython():
+    """Test --help lists the record types without loading dnspython."""
+    assert dns_modules(import_times("--help")) == []
+
+def test_dns_mode_imports_dnspython():
+    """Test DNS analyzers are loaded when the mode needs them."""
+    times = import_times("https://example.com", "--mode", "dns", "--records", "A",
+                         "--nameservers", "127.0.0.1", "--dns-lifetime", "0.1",
+                         "--no-cache")
+    assert "dns.resolver" in times
+    assert "url_analyzer.analyzers.dns_analyzer" in times
@@ -0,0 +1,168 @@
+import io
+import json
+import pytest
+from unittest.mock import patch
+from url_analyzer.analyzers.dns_analyzer import DNSAnalyzer
+from url_analyzer.core.batch import (
+    BatchAnalyzer, ProcessBatchAnalyzer, analyze_url, chunked, read_urls
+)
+
+def test_read_urls():
+    """Test URLs are read line by line, skipping blanks and comments."""
+    stream = io.StringIO("https://example.com\n\n  # comment\n  https://example.org/  \n")
+    assert list(read_urls(stream)) == ["https://example.com", "https://example.org/"]
+
+def test_analyze_url_mode():
+    """Test single URL analysis in URL mode."""
+    result = analyze_url("https://Example.com/path/")
+    assert result["url"] == "https://Example.com/path/"
+    assert result["normalized_url"] == "https://example.com/path"
+
+def test_analyze_url_error():
+    """Test invalid URLs are reported instead of raised."""
+    result = analyze_url("not-a-url")
+    assert result == {"url": "not-a-url", "error": "Invalid URL: not-a-url"}
+
+@patch('url_analyzer.analyzers.dns_analyzer.DNSAnalyzer.analyze')
+def test_analyze_url_dns_mode(mock_analyze):
+    """Test single URL analysis in DNS mode carries the URL."""
+    mock_analyze.return_value = {"info": {"domain": "example.com"}, "records": {}}
+    result = analyze_url("https://example.com/x", "dns")
+    assert result["url"] == "https://example.com/x"
+    assert result["info"]["domain"] == "example.com"
+
+@patch('url_analyzer.analyzers.dns_analyzer.DNSAnalyzer.analyze')
+def test_analyze_url_record_types(mock_analyze):
+    """Test the selected record types are passed to the DNS analysis."""
+    mock_analyze.return_value = {"info": {"domain": "example.com"}, "records": {}}
+    analyze_url("https://example.com/x", "dns", ["A"])
+    mock_analyze.assert_called_once_with(["A"])
+
+def test_batch_analyzer_run():
+    """Test every input URL yields exactly one result."""
+    urls = [f"https://host{i}.example.com/path" for i in range(50)] + ["bad"]
+    results = list(BatchAnalyzer("url", workers=4).run(iter(urls)))
+
+    assert sorted(result["url"] for result in results) == sorted(urls)
+    errors = [result for result in results if "error" in result]
+    assert [error["url"] for error in errors] == ["bad"]
+
+def test_batch_analyzer_bounds_pending():
+    """Test the input is consumed lazily rather than all at once."""
+    consumed = []
+
+    def urls():
+        for i in range(100):
+            consumed.append(i)
+            yield f"https://host{i}.example.com"
+
+    results = BatchAnalyzer("url", workers=2).run(urls())
+    next(results)
+    assert len(consumed) <= 5
+    assert len(list(results)) == 99
+
+def test_batch_analyzer_invalid_arguments():
+    """Test invalid batch settings are rejected."""
+    with pytest.raises(ValueError):
+        BatchAnalyzer("whois")
+    with pytest.raises(ValueError):
+        BatchAnalyzer("url", workers=0)
+    with pytest.raises(ValueError):
+        BatchAnalyzer("dns", record_types=["A", "BOGUS"])
+
+@pytest.fixture
+def mock_dns_analyze():
+    """Patch DNS analysis to record the hosts queried."""
+    def analyze(self, record_types=None):
+        return {"info": {"domain": self.domain}, "records": {"a_records": ["192.0.2.1"]}}
+
+    with patch.object(DNSAnalyzer, 'analyze', autospec=True, side_effect=analyze) as mock:
+        yield mock
+
+def test_batch_dedups_dns_by_host(mock_dns_analyze):
+    """Test URLs on the same host share one DNS analysis."""
+    urls = [
+        "https://a.example.com/x",
+        "https://a.example.com/y",
+        "https://A.example.com:443/z",
+        "https://b.example.com/",
+        "not-a-url",
+    ]
+    batch = BatchAnalyzer("dns", workers=2)
+    results = list(batch.run(urls))
+
+    queried = sorted(call.args[0].domain for call in mock_dns_analyze.call_args_list)
+    assert queried == ["a.example.com", "b.example.com"]
+    assert sorted(result["url"] for result in results) == sorted(urls)
+    for result in results:
+        if result["url"] != "not-a-url":
+            assert result["records"]["a_records"] == ["192.0.2.1"]
+    assert batch.stats == {"urls": 5, "dns_lookups": 2, "dns_lookups_saved": 2}
+
+def test_batch_full_mode_combines_results(mock_dns_analyze):
+    """Test full mode fans the shared DNS analysis out per URL."""
+    urls = ["https://example.com/one", "https://example.com/two"]
+    results = sorted(BatchAnalyzer("full", workers=1).run(urls),
+                     key=lambda result: result["url"])
+
+    assert mock_dns_analyze.call_count == 1
+    for url, result in zip(urls, results):
+        assert result["url"] == url
+        assert result["info"]["url"] == url
+        assert result["url_analysis"]["url"] == url
+        assert result["dns_analysis"]["info"]["domain"] == "example.com"
+
+def test_batch_full_mode_follows_analyzer_selection(monkeypatch):
+    """Test full mode reports the analyzers MainAnalyzer runs by default."""
+    from url_analyzer.core.main_analyzer import MainAnalyzer
+
+    monkeypatch.setenv("URL_ANALYZER_ANALYZERS", "url_analysis")
+    batch = BatchAnalyzer("full", workers=2, ordered=True)
+    results = list(batch.run(["https://example.com/one", "not-a-url"]))
+    assert results[0] == {"url": "https://example.com/one",
+                          **MainAnalyzer("https://example.com/one").analyze()}
+    assert "dns_analysis" not in results[0]
+    assert "error" in results[1]
+    assert batch.stats == {"urls": 2, "dns_lookups": 0, "dns_lookups_saved": 0}
+
+    monkeypatch.setenv("URL_ANALYZER_ANALYZERS", "url_analysis,unknown")
+    with pytest.raises(ValueError):
+        BatchAnalyzer("full")
+
+def test_batch_ordered_url_mode():
+    """Test ordered batches yield results in input order."""
+    urls = [f"https://host{i}.example.com/path" for i in range(200)] + ["bad"]
+    results = list(BatchAnalyzer("url", workers=4, ordered=True).run(urls))
+    assert [result["url"] for result in results] == urls
+
+def test_batch_ordered_dns_mode(mock_dns_analyze):
+    """Test ordered batches keep input order across shared host lookups."""
+    urls = [f"https://host{i % 7}.example.com/{i}" for i in range(100)]
+    results = list(BatchAnalyzer("dns", workers=3, ordered=True).run(urls))
+    assert [result["url"] for result in results] == urls
+
+def test_chunked():
+    """Test iterables are split into bounded chunks."""
+    assert list(chunked(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(chunked([], 3)) == []
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_process_batch_analyzer(ordered):
+    """Test process batches analyze every URL across worker processes."""
+    urls = [f"https://host{i}.example.com/path" for i in range(60)] + ["bad"]
+    batch = ProcessBatchAnalyzer("url", processes=2, chunk_size=7,
+                                 ordered=ordered, serializer=json.dumps)
+    results = [json.loads(line) for line in batch.run(iter(urls))]
+
+    if ordered:
+        assert [result["url"] for result in results] == urls
+    else:
+        assert sorted(result["url"] for result in results) == sorted(urls)
+    assert batch.stats["urls"] == len(urls)
+
+def test_process_batch_analyzer_invalid_arguments():
+    """Test invalid process batch settings are rejected."""
+    with pytest.raises(ValueError):
+        ProcessBatchAnalyzer("url", processes=0)
+    with pytest.raises(ValueError):
+        ProcessBatchAnalyzer("url", chunk_size=0)
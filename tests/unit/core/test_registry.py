@@ -0,0 +1,158 @@
+import asyncio
+import threading
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+from url_analyzer.core.base_analyzer_interface import BaseAnalyzer
+from url_analyzer.core.main_analyzer import MainAnalyzer
+from url_analyzer.core.registry import (
+    ANALYZERS_ENV, DNS_SPEC, URL_SPEC, AnalyzerRegistry, AnalyzerSpec,
+    get_default_registry, run_plan
+)
+
+class StubAnalyzer(BaseAnalyzer):
+    """Analyzer returning a fixed result after an optional wait."""
+
+    def __init__(self, result, barrier=None):
+        self.result = result
+        self.barrier = barrier
+
+    def analyze(self):
+        if self.barrier is not None:
+            # Only passes when the other analyzer runs at the same time
+            self.barrier.wait()
+        return self.result
+
+    def get_info(self):
+        return {}
+
+def stub_spec(name, requires=(), barrier=None, **kwargs):
+    return AnalyzerSpec(name, lambda url_analyzer, options: StubAnalyzer(
+        options.get("result", name), barrier), requires, **kwargs)
+
+def test_plan_orders_requirements():
+    """Test that required analyzers come first and are added when missing."""
+    registry = AnalyzerRegistry([stub_spec("report", requires=("a", "b")),
+                                 stub_spec("a"), stub_spec("b", requires=("a",)),
+                                 stub_spec("c")])
+    assert [spec.name for spec in registry.plan(["report"])] == ["a", "b", "report"]
+    assert [spec.name for spec in registry.plan()] == ["a", "c", "b", "report"]
+
+def test_plan_errors():
+    """Test unknown analyzers, cycles and duplicate names."""
+    registry = AnalyzerRegistry([stub_spec("a", requires=("b",)),
+                                 stub_spec("b", requires=("a",))])
+    with pytest.raises(ValueError, match="Unknown analyzer: x"):
+        registry.plan(["x"])
+    with pytest.raises(ValueError, match="cycle"):
+        registry.plan(["a"])
+    with pytest.raises(ValueError, match="already registered"):
+        registry.register(stub_spec("a"))
+    registry.register(stub_spec("a"), replace=True)
+    assert [spec.name for spec in registry.plan(["a"])] == ["a"]
+
+def test_default_names(monkeypatch):
+    """Test selecting analyzers by the enabled flag and the environment."""
+    registry = AnalyzerRegistry([stub_spec("a"), stub_spec("b", enabled=False)])
+    monkeypatch.delenv(ANALYZERS_ENV, raising=False)
+    assert registry.default_names() == ["a"]
+    monkeypatch.setenv(ANALYZERS_ENV, "b, a")
+    assert registry.default_names() == ["b", "a"]
+
+def test_run_plan_concurrent():
+    """Test that independent blocking analyzers run at the same time and
+    dependents get their results."""
+    barrier = threading.Barrier(2, timeout=5)
+    registry = AnalyzerRegistry([stub_spec("a", barrier=barrier),
+                                 stub_spec("b", barrier=barrier),
+                                 stub_spec("both", requires=("a", "b"))])
+    plan = registry.plan()
+    analyzers = {spec.name: spec.factory(None, {}) for spec in plan}
+    seen = {}
+
+    def run_one(spec, required):
+        seen[spec.name] = required
+        return spec.run(analyzers[spec.name], required, None)
+
+    assert run_plan(plan, run_one) == {"a": "a", "b": "b", "both": "both"}
+    assert seen["both"] == {"a": "a", "b": "b"}
+
+def test_run_plan_inline():
+    """Test that plans without independent blocking analyzers start no threads."""
+    registry = AnalyzerRegistry([URL_SPEC, stub_spec("dns"),
+                                 stub_spec("after", requires=("dns",))])
+    with patch("url_analyzer.core.registry.ThreadPoolExecutor") as executor:
+        results = run_plan(registry.plan(), lambda spec, required: spec.name)
+    executor.assert_not_called()
+    assert set(results) == {"url_analysis", "dns", "after"}
+
+def test_run_plan_error():
+    """Test that an analyzer's error is raised."""
+    def run_one(spec, required):
+        if spec.name == "b":
+            raise RuntimeError("boom")
+        return spec.name
+
+    plan = AnalyzerRegistry([stub_spec("a"), stub_spec("b"),
+                             stub_spec("c", requires=("b",))]).plan()
+    with pytest.raises(RuntimeError, match="boom"):
+        run_plan(plan, run_one)
+    with pytest.raises(ValueError, match="Unmet"):
+        run_plan([stub_spec("c", requires=("b",))], run_one)
+
+def test_load_entry_points():
+    """Test registering plugins, skipping broken ones with a warning."""
+    plugin, broken = Mock(), Mock()
+    plugin.load.return_value = stub_spec("plugin")
+    broken.name = "broken"
+    broken.load.return_value = object()
+    entry_points = Mock()
+    entry_points.select.return_value = [plugin, broken]
+    registry = AnalyzerRegistry()
+    with patch("url_analyzer.core.registry.metadata.entry_points",
+               return_value=entry_points), \
+         pytest.warns(UserWarning, match="broken"):
+        registry.load_entry_points()
+    entry_points.select.assert_called_once_with(group="url_analyzer.analyzers")
+    assert registry.names() == ["plugin"]
+
+def test_default_registry():
+    """Test the built-in analyzers."""
+    registry = get_default_registry()
+    assert registry.names()[:2] == ["url_analysis", "dns_analysis"]
+    assert registry.get("dns_analysis") is DNS_SPEC
+
+@patch('url_analyzer.analyzers.dns_analyzer.DNSAnalyzer.analyze')
+def test_main_analyzer_registry(mock_dns_analyze):
+    """Test running extra analyzers alongside the built-in ones."""
+    mock_dns_analyze.return_value = {"records": {}}
+    registry = AnalyzerRegistry([URL_SPEC, DNS_SPEC, stub_spec("extra"),
+                                 stub_spec("summary", requires=("dns_analysis",))])
+    analyzer = MainAnalyzer("https://example.com", registry=registry,
+                            analyzer_options={"extra": {"result": 42}})
+    result = analyzer.analyze(["A"])
+    assert list(result) == ["info", "url_analysis", "dns_analysis", "extra", "summary"]
+    assert result["extra"] == 42
+    mock_dns_analyze.assert_called_once_with(["A"])
+
+    url_only = MainAnalyzer("https://example.com", ["url_analysis"], registry)
+    assert url_only.dns_analyzer is None
+    assert list(url_only.analyze()) == ["info", "url_analysis"]
+
+@patch('url_analyzer.analyzers.async_dns_analyzer.AsyncDNSAnalyzer.analyze_async',
+       new_callable=AsyncMock)
+def test_main_analyzer_async_registry(mock_dns_analyze):
+    """Test analyze_async() and analyze_result() follow the plan."""
+    mock_dns_analyze.return_value = {"records": {}}
+    registry = AnalyzerRegistry([URL_SPEC, DNS_SPEC, stub_spec("extra")])
+    analyzer = MainAnalyzer("https://example.com", registry=registry)
+    result = asyncio.run(analyzer.analyze_async(resolver=Mock()))
+    assert list(result) == ["info", "url_analysis", "dns_analysis", "extra"]
+    assert result["extra"] == "extra"
+    with pytest.raises(ValueError):
+        analyzer.analyze_result()
+
+    url_only = MainAnalyzer("https://example.com", ["url_analysis"], registry)
+    assert list(asyncio.run(url_only.analyze_async())) == ["info", "url_analysis"]
+    mock_dns_analyze.assert_called_once()
+    with pytest.raises(ValueError):
+        url_only.analyze_result()
@@ -0,0 +1,83 @@
+import json
+import tracemalloc
+import pytest
+from unittest.mock import Mock, patch
+from url_analyzer.analyzers.dns_analyzer import DNSAnalyzer
+from url_analyzer.core.main_analyzer import MainAnalyzer
+from url_analyzer.core.results import DNSResult, FullResult, Result, URLResult
+from url_analyzer.core.url_analyzer import URLAnalyzer
+
+def make_dns_result(**records):
+    return DNSResult("example.com", ["192.0.2.1"], **records)
+
+def test_url_result_matches_analyze():
+    """Test URL results convert to the layout of analyze()."""
+    analyzer = URLAnalyzer("https://example.com/path?param=value#top")
+    result = analyzer.analyze_result()
+    assert isinstance(result, URLResult)
+    assert result.to_dict() == analyzer.analyze()
+    assert result.components == analyzer.get_info()
+    assert result.query_params == {"param": ["value"]}
+
+def test_results_use_slots():
+    """Test results carry no per-instance dict."""
+    result = URLAnalyzer("https://example.com").analyze_result()
+    for obj in (result, make_dns_result(), FullResult(result, make_dns_result())):
+        assert not hasattr(obj, "__dict__")
+        with pytest.raises(AttributeError):
+            obj.extra = 1
+
+def test_result_is_abstract():
+    with pytest.raises(TypeError):
+        Result()
+
+def test_dns_result_omits_unqueried_records():
+    """Test only queried record types appear in the records."""
+    result = make_dns_result(a_records=["93.184.216.34"], soa_record={})
+    assert result.to_dict() == {
+        "info": {"domain": "example.com", "nameservers": ["192.0.2.1"],
+                 "min_ttl": None, "errors": {}},
+        "records": {"a_records": ["93.184.216.34"], "soa_record": {}}
+    }
+
+@patch('dns.resolver.Resolver')
+def test_dns_analyzer_analyze_result(mock_resolver):
+    """Test the DNS analyzer builds a result object."""
+    mock_answer = Mock()
+    mock_answer.address = "93.184.216.34"
+    mock_resolver.return_value.resolve.return_value = [mock_answer]
+    analyzer = DNSAnalyzer("example.com", nameservers=["192.0.2.1"])
+    result = analyzer.analyze_result(["A"])
+    assert isinstance(result, DNSResult)
+    assert result.a_records == ["93.184.216.34"]
+    assert result.mx_records is None
+
+def test_full_result_to_json():
+    """Test complete results encode to the layout of MainAnalyzer.analyze()."""
+    url_analyzer = URLAnalyzer("https://www.example.com/path")
+    dns_result = make_dns_result(a_records=["93.184.216.34"])
+    result = FullResult(url_analyzer.analyze_result(), dns_result)
+    expected = MainAnalyzer.combine(url_analyzer, dns_result.to_dict())
+    assert result.to_dict() == expected
+    assert json.loads(result.to_json()) == expected
+    assert result == FullResult(url_analyzer.analyze_result(), make_dns_result(
+        a_records=["93.184.216.34"]))
+
+def test_results_use_less_memory_than_dicts():
+    """Test held results take less memory as objects than as dicts."""
+    analyzers = [URLAnalyzer(f"https://host{index}.example.com/path?q={index}")
+                 for index in range(500)]
+    for analyzer in analyzers:
+        analyzer.analyze_result()
+
+    def held(build):
+        tracemalloc.start()
+        try:
+            results = [build(analyzer) for analyzer in analyzers]
+            return tracemalloc.get_traced_memory()[0] / len(results)
+        finally:
+            tracemalloc.stop()
+
+    as_dicts = held(lambda analyzer: analyzer.analyze())
+    as_objects = held(lambda analyzer: analyzer.analyze_result())
+    assert as_objects < as_dicts * 0.75
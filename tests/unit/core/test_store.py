@@ -0,0 +1,126 @@
+import pytest
+from url_analyzer.core.store import (
+    IncrementalAnalyzer, ResultStore, canonical_records, diff_records, records_hash
+)
+
+class FakeBatch:
+    """Batch yielding DNS results from a table of records by URL."""
+
+    def __init__(self, records, min_ttl=60):
+        self.records = records
+        self.min_ttl = min_ttl
+        self.analyzed = []
+        self.errors = {}
+
+    def run(self, urls):
+        for url in urls:
+            self.analyzed.append(url)
+            if url not in self.records:
+                yield {"url": url, "error": "Invalid URL"}
+                continue
+            yield {"url": url,
+                   "info": {"domain": "example.com", "nameservers": [],
+                            "min_ttl": self.min_ttl, "errors": self.errors},
+                   "records": self.records[url]}
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+@pytest.fixture
+def store(tmp_path, clock):
+    store = ResultStore(str(tmp_path / "store" / ResultStore.FILENAME), clock)
+    yield store
+    store.close()
+
+def test_canonical_records_ignore_order():
+    """Test rotated record lists hash the same."""
+    first = canonical_records({"a_records": ["192.0.2.2", "192.0.2.1"]})
+    second = canonical_records({"a_records": ["192.0.2.1", "192.0.2.2"]})
+    assert first == second
+    assert records_hash(first) == records_hash(second)
+
+def test_diff_records():
+    """Test added and removed records and changed values."""
+    old = {"a_records": ["192.0.2.1", "192.0.2.2"], "soa_record": {"serial": 1},
+           "txt_records": ["x"]}
+    new = {"a_records": ["192.0.2.2", "192.0.2.3"], "soa_record": {"serial": 2},
+           "txt_records": ["x"], "mx_records": []}
+    assert diff_records(old, new) == {
+        "a_records": {"added": ["192.0.2.3"], "removed": ["192.0.2.1"]},
+        "soa_record": {"old": {"serial": 1}, "new": {"serial": 2}},
+    }
+
+def test_store_round_trip(store, clock):
+    """Test stored records, their hash and expiry, before and after flushing."""
+    records = {"a_records": ["192.0.2.1"]}
+    digest = store.put("https://example.com/", "*", records, 30)
+    for _ in range(2):
+        stored = store.get("https://example.com/", "*")
+        assert (stored.digest, stored.expires, stored.records) == (digest, 1030.0, records)
+        store.flush()
+    assert store.get("https://example.com/", "A") is None
+    assert len(store) == 1
+
+def test_incremental_run(store, clock):
+    """Test only new and expired URLs are analyzed and only changes reported."""
+    urls = ["https://a.example.com", "https://b.example.com", "bad"]
+    batch = FakeBatch({"https://a.example.com": {"a_records": ["192.0.2.1"]},
+                       "https://b.example.com": {"a_records": ["192.0.2.2"]}})
+    first = list(IncrementalAnalyzer(batch, store, 'dns').run(urls))
+    assert [result.get("status") for result in first] == ["new", "new", None]
+    assert first[0]["normalized_url"] == "https://a.example.com"
+
+    # Nothing has expired yet: only the invalid URL is retried
+    batch.analyzed.clear()
+    incremental = IncrementalAnalyzer(batch, store, 'dns')
+    assert [result["url"] for result in incremental.run(urls)] == ["bad"]
+    assert batch.analyzed == ["bad"]
+    assert incremental.stats == {"fresh": 2, "new": 0, "changed": 0,
+                                 "unchanged": 0, "errors": 1}
+
+    clock.now += 61
+    batch.records["https://a.example.com"] = {"a_records": ["192.0.2.9"]}
+    incremental = IncrementalAnalyzer(batch, store, 'dns')
+    changes = [result for result in incremental.run(urls) if "status" in result]
+    assert changes == [{
+        "url": "https://a.example.com", "normalized_url": "https://a.example.com",
+        "status": "changed",
+        "changes": {"a_records": {"added": ["192.0.2.9"], "removed": ["192.0.2.1"]}}
+    }]
+    assert incremental.stats["unchanged"] == 1
+
+def test_incremental_keeps_records_on_failed_queries(store, clock):
+    """Test failed queries are reported as errors, not as removed records."""
+    batch = FakeBatch({"https://example.com": {"a_records": ["192.0.2.1"]}})
+    list(IncrementalAnalyzer(batch, store, 'dns').run(["https://example.com"]))
+
+    clock.now += 61
+    batch.records["https://example.com"] = {"a_records": []}
+    batch.errors = {"A": "Failed to get A records: timed out"}
+    incremental = IncrementalAnalyzer(batch, store, 'dns')
+    assert list(incremental.run(["https://example.com"])) == [
+        {"url": "https://example.com", "error": "Failed to get A records: timed out"}
+    ]
+    assert incremental.stats["errors"] == 1
+    assert store.get("https://example.com", "*").records == {
+        "a_records": ["192.0.2.1"]}
+
+def test_incremental_without_ttl(store):
+    """Test results without a TTL are analyzed again on every run."""
+    batch = FakeBatch({"https://example.com": {"a_records": []}}, min_ttl=None)
+    list(IncrementalAnalyzer(batch, store, 'dns').run(["https://example.com"]))
+    incremental = IncrementalAnalyzer(batch, store, 'dns')
+    assert list(incremental.run(["https://example.com"])) == []
+    assert incremental.stats["unchanged"] == 1
+
+def test_incremental_needs_dns_mode(store):
+    with pytest.raises(ValueError):
+        IncrementalAnalyzer(FakeBatch({}), store, 'url')
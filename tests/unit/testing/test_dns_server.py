@@ -0,0 +1,115 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+import dns.exception
+import dns.flags
+import dns.message
+import dns.query
+import dns.rcode
+import pytest
+from url_analyzer.analyzers.dns_analyzer import DNSAnalyzer
+from url_analyzer.analyzers.dns_cache import DNSCache
+from url_analyzer.testing.dns_server import DNSServer, Zone, load_zone
+
+ZONE = {
+    "ttl": 120,
+    "records": {
+        "example.test": {
+            "A": ["192.0.2.1"],
+            "MX": {"ttl": 30, "values": ["10 mail.example.test."]},
+            "TXT": ["v=spf1 -all"],
+        },
+        "*.example.test": {"A": ["192.0.2.2"]},
+        "big.example.test": {"TXT": [f"record {index} " + "x" * 100
+                                     for index in range(10)]},
+    },
+}
+
+@pytest.fixture
+def server():
+    with DNSServer(Zone.from_dict(ZONE)) as server:
+        yield server
+
+def test_zone_lookup():
+    """Test exact names, wildcards and missing names."""
+    zone = Zone.from_dict(ZONE)
+    assert zone.lookup("example.test", "mx") == (True, (30, ["10 mail.example.test."]))
+    assert zone.lookup("www.example.test.", "A") == (True, (120, ["192.0.2.2"]))
+    assert zone.lookup("example.test", "AAAA") == (True, None)
+    assert zone.lookup("example.org", "A") == (False, None)
+
+def test_zone_rejects_malformed_records():
+    """Test bad record values fail when the zone is built."""
+    with pytest.raises(ValueError):
+        Zone({"example.test": {"A": ["not an address"]}})
+    with pytest.raises(ValueError):
+        Zone({"example.test": {"BOGUS": ["1"]}})
+
+def test_load_zone(tmp_path):
+    """Test zones are read from JSON and YAML files."""
+    json_file = tmp_path / "zone.json"
+    json_file.write_text(json.dumps(ZONE))
+    yaml_file = tmp_path / "zone.yaml"
+    yaml_file.write_text("ttl: 60\nrecords:\n  example.test:\n    A: [192.0.2.9]\n")
+    assert load_zone(str(json_file)).lookup("example.test", "A")[1] == (120, ["192.0.2.1"])
+    assert load_zone(str(yaml_file)).lookup("example.test", "A")[1] == (60, ["192.0.2.9"])
+
+def test_dns_analyzer_against_server(server):
+    """Test the analyzer gets records, TTLs and empty answers from the server."""
+    cache = DNSCache()
+    analyzer = DNSAnalyzer("example.test", cache=cache, timeout=2.0,
+                           **server.analyzer_options())
+    result = analyzer.analyze(["A", "MX", "TXT", "AAAA"])
+    assert result["records"] == {
+        "a_records": ["192.0.2.1"],
+        "aaaa_records": [],
+        "mx_records": [{"preference": 10, "exchange": "mail.example.test."}],
+        "txt_records": ["v=spf1 -all"],
+    }
+    assert server.stats()["udp"] == 4
+    assert cache.get("example.test", "MX").expires - time.monotonic() <= 30
+
+def test_nxdomain(server):
+    """Test names outside the zone do not exist."""
+    response = dns.query.udp(dns.message.make_query("example.org", "A"),
+                             "127.0.0.1", timeout=2.0, port=server.port)
+    assert response.rcode() == dns.rcode.NXDOMAIN
+    assert server.stats()["nxdomain"] == 1
+
+def test_truncation_and_tcp(server):
+    """Test large answers are truncated over UDP and served over TCP."""
+    query = dns.message.make_query("big.example.test", "TXT")
+    response = dns.query.udp(query, "127.0.0.1", timeout=2.0, port=server.port)
+    assert response.flags & dns.flags.TC
+    response = dns.query.tcp(query, "127.0.0.1", timeout=2.0, port=server.port)
+    assert len(response.answer[0]) == 10
+    assert server.stats()["truncated"] == 1
+
+def test_latency_overlaps():
+    """Test concurrent queries wait for the latency in parallel."""
+    with DNSServer(Zone.from_dict(ZONE), latency=0.1) as server:
+        query = dns.message.make_query("example.test", "A")
+        start = time.monotonic()
+        with ThreadPoolExecutor(8) as executor:
+            list(executor.map(lambda _: dns.query.udp(
+                query, "127.0.0.1", timeout=2.0, port=server.port), range(8)))
+        elapsed = time.monotonic() - start
+    assert 0.1 <= elapsed < 0.5
+
+def test_drop_rate():
+    """Test dropped queries are not answered."""
+    with DNSServer(Zone.from_dict(ZONE), drop_rate=1.0) as server:
+        with pytest.raises(dns.exception.Timeout):
+            dns.query.udp(dns.message.make_query("example.test", "A"),
+                          "127.0.0.1", timeout=0.2, port=server.port)
+        assert server.stats()["dropped"] == 1
+
+def test_analyzer_min_ttl(server):
+    """Test DNS analyses report the smallest TTL of their answers."""
+    cache = DNSCache()
+    options = {**server.analyzer_options(), "cache": cache}
+    result = DNSAnalyzer("example.test", **options).analyze(["A", "MX"])
+    assert result["info"]["min_ttl"] == 30
+    result = DNSAnalyzer("example.test", **options).analyze(["A"])
+    # From the cache, the TTL left is reported
+    assert 119 <= result["info"]["min_ttl"] <= 120
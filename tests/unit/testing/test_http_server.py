@@ -0,0 +1,14 @@
+import requests
+from url_analyzer.testing.http_server import HTTPTestServer
+
+def test_routes_and_stats():
+    """Test canned responses, 404s and request counts."""
+    routes = {"/": {"status": 201, "body": "hi", "headers": {"X-Test": "1"}}}
+    with HTTPTestServer(routes) as server, requests.Session() as session:
+        response = session.get(server.url("/?q=1"))
+        assert (response.status_code, response.text) == (201, "hi")
+        assert response.headers["X-Test"] == "1"
+        assert session.head(server.url("/")).text == ""
+        assert session.get(server.url("/missing")).status_code == 404
+        assert server.stats() == {"requests": 3, "connections": 1,
+                                  "max_concurrent": 1}
@@ -0,0 +1,105 @@
+import json
+import pickle
+import pytest
+from unittest.mock import Mock, patch
+import dns.resolver
+from url_analyzer.analyzers.dns_analyzer import DNSAnalyzer
+from url_analyzer.analyzers.dns_cache import DNSCache
+from url_analyzer.utils.instrumentation import Instrumentation, timer
+
+class FakeClock:
+    """Clock advancing by a set step on every reading."""
+
+    def __init__(self, step):
+        self.now = 0.0
+        self.step = step
+
+    def __call__(self):
+        self.now += self.step
+        return self.now
+
+def test_summary_quantiles():
+    """Test counts, totals and nearest-rank quantiles per stage."""
+    instrumentation = Instrumentation()
+    for duration in range(1, 101):
+        instrumentation.record("dns.query.A", duration / 1000)
+    instrumentation.record("dns.query.A", 0.5, "NXDOMAIN")
+    stats = instrumentation.summary()["dns.query.A"]
+    assert stats["count"] == 101
+    assert stats["outcomes"] == {"ok": 100, "NXDOMAIN": 1}
+    assert stats["p50"] == pytest.approx(0.051)
+    assert stats["p99"] == pytest.approx(0.1)
+    assert stats["total"] == pytest.approx(5.55)
+
+def test_timer_outcomes():
+    """Test timed blocks end as ok, error or the outcome they set."""
+    instrumentation = Instrumentation(clock=FakeClock(0.25))
+    with instrumentation.timer("stage"):
+        pass
+    with instrumentation.timer("stage") as span:
+        span.outcome = "cache_hit"
+    with pytest.raises(KeyError):
+        with instrumentation.timer("stage"):
+            raise KeyError("missing")
+    stats = instrumentation.summary()["stage"]
+    assert stats["outcomes"] == {"ok": 1, "cache_hit": 1, "error": 1}
+    assert stats["p50"] == pytest.approx(0.25)
+
+def test_timer_without_instrumentation():
+    """Test stages are not timed when no instrumentation is given."""
+    with timer(None, "stage") as span:
+        span.outcome = "ok"
+
+def test_samples_are_bounded():
+    """Test the kept durations stay within max_samples."""
+    instrumentation = Instrumentation(max_samples=10)
+    for _ in range(1000):
+        instrumentation.record("stage", 0.001)
+    assert len(instrumentation._stages["stage"].samples) == 10
+    assert instrumentation.summary()["stage"]["count"] == 1000
+
+def test_hooks():
+    """Test hooks receive every measurement."""
+    instrumentation = Instrumentation()
+    hook = Mock()
+    instrumentation.add_hook(hook)
+    instrumentation.record("output", 0.002)
+    hook.assert_called_once_with("output", 0.002, "ok")
+
+def test_export(tmp_path):
+    """Test the summary is exported as JSON or Prometheus text."""
+    instrumentation = Instrumentation()
+    instrumentation.record("dns.query.A", 0.01)
+    instrumentation.record("dns.query.A", 0.02, "LifetimeTimeout")
+    instrumentation.export(str(tmp_path / "profile.json"))
+    instrumentation.export(str(tmp_path / "profile.prom"))
+    assert json.loads((tmp_path / "profile.json").read_text())["dns.query.A"]["count"] == 2
+    prometheus = (tmp_path / "profile.prom").read_text()
+    assert 'url_analyzer_stage_duration_seconds_count{stage="dns.query.A"} 2' in prometheus
+    assert ('url_analyzer_stage_outcomes_total{stage="dns.query.A",'
+            'outcome="LifetimeTimeout"} 1') in prometheus
+
+def test_pickles_empty():
+    """Test copies sent to worker processes start empty."""
+    instrumentation = Instrumentation(max_samples=5)
+    instrumentation.record("stage", 0.1)
+    copy = pickle.loads(pickle.dumps(instrumentation))
+    assert copy.max_samples == 5
+    assert copy.summary() == {}
+
+@patch('dns.resolver.Resolver')
+def test_dns_analyzer_instrumentation(mock_resolver):
+    """Test record queries are timed with their outcome."""
+    mock_answer = Mock()
+    mock_answer.address = "93.184.216.34"
+    resolver_instance = mock_resolver.return_value
+    resolver_instance.resolve.side_effect = [[mock_answer], dns.resolver.NoAnswer()]
+    instrumentation = Instrumentation()
+    cache = Mock(spec=DNSCache)
+    cache.get.return_value = None
+    analyzer = DNSAnalyzer("example.com", cache=cache, instrumentation=instrumentation)
+    analyzer.analyze(["A", "MX"])
+    summary = instrumentation.summary()
+    assert summary["dns.query.A"]["outcomes"] == {"ok": 1}
+    assert summary["dns.query.MX"]["outcomes"] == {"NoAnswer": 1}
+    assert summary["dns.analyze"]["count"] == 1
@@ -0,0 +1,81 @@
+import pytest
+from url_analyzer.utils.public_suffix import (
+    PublicSuffixList, compile_snapshot, get_default_list
+)
+
+RULES = """\
+// VERSION: test
+// ===BEGIN ICANN DOMAINS===
+com
+uk
+co.uk
+jp
+*.kawasaki.jp
+!city.kawasaki.jp
+рф
+// ===END ICANN DOMAINS===
+// ===BEGIN PRIVATE DOMAINS===
+github.io
+// ===END PRIVATE DOMAINS===
+"""
+
+@pytest.fixture
+def suffix_list():
+    return PublicSuffixList.from_lines(RULES.splitlines())
+
+@pytest.mark.parametrize("host, suffix, domain", [
+    ("example.com", "com", "example.com"),
+    ("a.b.example.co.uk", "co.uk", "example.co.uk"),
+    ("example.uk", "uk", "example.uk"),
+    ("foo.bar.kawasaki.jp", "bar.kawasaki.jp", "foo.bar.kawasaki.jp"),
+    ("www.city.kawasaki.jp", "kawasaki.jp", "city.kawasaki.jp"),
+    ("sub.example.unknown", "unknown", "example.unknown"),
+    ("www.example.xn--p1ai", "xn--p1ai", "example.xn--p1ai"),
+    ("www.example.рф", "рф", "example.рф"),
+])
+def test_registrable_domain(suffix_list, host, suffix, domain):
+    """Test public suffix and registrable domain extraction."""
+    assert suffix_list.public_suffix(host) == suffix
+    assert suffix_list.registrable_domain(host) == domain
+
+def test_suffix_and_addresses_returned_unchanged(suffix_list):
+    """Test public suffixes and IP addresses have no shorter domain."""
+    assert suffix_list.registrable_domain("co.uk") == "co.uk"
+    assert suffix_list.registrable_domain("localhost") == "localhost"
+    assert suffix_list.registrable_domain("192.168.0.1") == "192.168.0.1"
+
+def test_private_domains(suffix_list):
+    """Test the PRIVATE DOMAINS section is only honoured on request."""
+    assert suffix_list.registrable_domain("user.github.io") == "github.io"
+    with_private = PublicSuffixList.from_lines(RULES.splitlines(), include_private=True)
+    assert with_private.registrable_domain("user.github.io") == "user.github.io"
+
+def test_snapshot_round_trip(tmp_path, suffix_list):
+    """Test a saved snapshot answers like the compiled list."""
+    path = str(tmp_path / "psl.snapshot")
+    suffix_list.save_snapshot(path)
+    loaded = PublicSuffixList.load_snapshot(path)
+
+    assert loaded.version == "test"
+    assert loaded.registrable_domain("www.city.kawasaki.jp") == "city.kawasaki.jp"
+
+def test_load_snapshot_rejects_other_files(tmp_path):
+    """Test arbitrary pickles are not mistaken for snapshots."""
+    import pickle
+    path = tmp_path / "other.pickle"
+    path.write_bytes(pickle.dumps(["not", "a", "snapshot"]))
+    with pytest.raises(ValueError):
+        PublicSuffixList.load_snapshot(str(path))
+
+def test_bundled_list(tmp_path):
+    """Test the bundled list compiles and handles common ccTLDs."""
+    suffix_list = get_default_list()
+    assert suffix_list is get_default_list()
+    assert suffix_list.version
+    assert suffix_list.registrable_domain("www.example.com.au") == "example.com.au"
+    assert suffix_list.registrable_domain("shop.example.co.jp") == "example.co.jp"
+    assert suffix_list.registrable_domain("a.b.example.de") == "example.de"
+
+    path = str(tmp_path / "psl.snapshot")
+    compile_snapshot(path)
+    assert PublicSuffixList.load_snapshot(path).version == suffix_list.version